@@ -1,19 +1,13 @@
 import streamlit as st
-from src.embeddings import get_medical_embeddings
-from src.document_loader import MedicalDocumentLoader
-from src.vector_store import initialize_vector_store
-from src.chatbot import MedicalChatbot
+from src.knowledge_base import get_knowledge_base
 from datetime import datetime
 import os
+import uuid
 
-def initialize_chatbot():
-    with st.spinner('Initializing medical knowledge base...'):
-        embeddings = get_medical_embeddings()
-        loader = MedicalDocumentLoader("data/medical_docs")
-        documents = loader.load_documents()
-        vector_store = initialize_vector_store(embeddings)
-        vector_store.add_documents(documents)
-        return MedicalChatbot(vector_store)
+@st.cache_resource(show_spinner='Initializing medical knowledge base...')
+def load_knowledge_base():
+    # Built once per process and shared by every browser session
+    return get_knowledge_base("data/medical_docs")
 
 def format_chat_history(messages):
     history = []
@@ -32,15 +26,17 @@ def main():
     )
 
     # Initialize session state
+    knowledge_base = load_knowledge_base()
     if "chatbot" not in st.session_state:
-        st.session_state.chatbot = initialize_chatbot()
+        st.session_state.chatbot = knowledge_base.chatbot
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+    if "ingestion_job" not in st.session_state:
+        st.session_state.ingestion_job = None
     if "messages" not in st.session_state:
         st.session_state.messages = []
     if "show_history" not in st.session_state:
         st.session_state.show_history = False
-    if "awaiting_follow_up" not in st.session_state:
-        st.session_state.awaiting_follow_up = False
-        st.session_state.follow_up_questions = []
 
     # Sidebar
     with st.sidebar:
@@ -48,28 +44,44 @@ def main():
         st.title("OptiMediX AI")
         
         # File uploader for document uploads
-        uploaded_files = st.file_uploader("Upload Medical Documents", type=["pdf", "docx"], accept_multiple_files=True)
+        uploaded_files = st.file_uploader("Upload Medical Documents", type=["pdf"], accept_multiple_files=True)
         
         if st.button("Process Uploaded Documents"):
             if uploaded_files:
+                saved_paths = []
                 for uploaded_file in uploaded_files:
                     # Save the uploaded file to a temporary location
-                    with open(os.path.join("data/medical_docs", uploaded_file.name), "wb") as f:
+                    path = os.path.join("data/medical_docs", uploaded_file.name)
+                    with open(path, "wb") as f:
                         f.write(uploaded_file.getbuffer())
-                st.success("Documents uploaded and processed successfully.")
-                # Reinitialize the chatbot with the new documents
-                st.session_state.chatbot = initialize_chatbot()
+                    saved_paths.append(path)
+                # Index only the new files in the background; chat keeps working meanwhile
+                st.session_state.ingestion_job = knowledge_base.submit_ingestion(saved_paths)
             else:
                 st.warning("Please upload at least one document.")
 
+        if st.session_state.ingestion_job:
+            status = knowledge_base.job_status(st.session_state.ingestion_job)
+            if status["state"] == "running":
+                st.info("Indexing uploaded documents in the background...")
+            elif status["state"] == "done":
+                if status["stats"]["failed"]:
+                    failed = ", ".join(os.path.basename(failure["path"]) for failure in status["failures"])
+                    st.warning(f"{status['stats']['failed']} document(s) could not be processed: {failed}")
+                else:
+                    st.success("Documents uploaded and processed successfully.")
+                st.session_state.ingestion_job = None
+            elif status["state"] == "failed":
+                st.error(f"Document processing failed: {status['error']}")
+                st.session_state.ingestion_job = None
+
         # Chat History Controls
         st.markdown("### 📝 Chat History")
         st.session_state.show_history = st.toggle("Show Chat History", st.session_state.show_history)
         
         if st.button("Clear Chat History"):
+            st.session_state.chatbot.sessions.drop(st.session_state.session_id)
             st.session_state.messages = []
-            st.session_state.follow_up_questions = []
-            st.session_state.awaiting_follow_up = False
             st.rerun()
         
         # About Section
@@ -138,66 +150,24 @@ def main():
 
         # Assistant response
         with st.chat_message("assistant", avatar="🏥"):
-            with st.spinner('Analyzing medical knowledge base...'):
-                try:
-                    response = st.session_state.chatbot.chat(prompt)
-                    
-                    # Check if the chatbot is asking for follow-up questions
-                    if isinstance(response, list):  # Assuming response is a list of follow-up questions
-                        st.session_state.awaiting_follow_up = True
-                        st.session_state.follow_up_questions = response
-                        follow_up_message = "I found some information related to your query. Can you please clarify: " + " ".join(response)
-                        st.markdown(follow_up_message)
-                    else:
-                        st.markdown(response)
-                        st.session_state.messages.append({
-                            "role": "assistant",
-                            "content": response,
-                            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        })
-                except Exception as e:
-                    error_message = f"⚠️ I apologize, but I encountered an error: {str(e)}"
-                    st.error(error_message)
-                    st.session_state.messages.append({
-                        "role": "assistant",
-                        "content": error_message,
-                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    })
-
-    # Handle follow-up questions
-    if st.session_state.awaiting_follow_up:
-        follow_up_response = st.chat_input("Please provide your response to the follow-up questions...")
-        if follow_up_response:
-            # Process the follow-up response
-            st.session_state.messages.append({
-                "role": "user",
-                "content": follow_up_response,
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            })
-            with st.chat_message("user", avatar="🧑‍💻"):
-                st.markdown(follow_up_response)
-
-            # Get the final response from the chatbot based on the follow-up
-            with st.chat_message("assistant", avatar="🏥"):
-                with st.spinner('Analyzing your response...'):
-                    try:
-                        final_response = st.session_state.chatbot.chat(follow_up_response)
-                        st.markdown(final_response)
-                        st.session_state.messages.append({
-                            "role": "assistant",
-                            "content": final_response,
-                            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        })
-                        st.session_state.awaiting_follow_up = False  # Reset the follow-up state
-                        st.session_state.follow_up_questions = []  # Clear follow-up questions
-                    except Exception as e:
-                        error_message = f"⚠️ I apologize, but I encountered an error: {str(e)}"
-                        st.error(error_message)
-                        st.session_state.messages.append({
-                            "role": "assistant",
-                            "content": error_message,
-                            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        })
+            try:
+                # Render tokens as they arrive instead of waiting for the full answer
+                response = st.write_stream(st.session_state.chatbot.chat_stream(
+                    prompt, session_id=st.session_state.session_id
+                ))
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": response,
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                })
+            except Exception as e:
+                error_message = f"⚠️ I apologize, but I encountered an error: {str(e)}"
+                st.error(error_message)
+                st.session_state.messages.append({
+                    "role": "assistant",
+                    "content": error_message,
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                })
 
     # Footer
     st.markdown("""
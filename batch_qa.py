@@ -0,0 +1,52 @@
+import argparse
+from src.config import BATCH_CONCURRENCY, GEMINI_REQUESTS_PER_MINUTE
+from src.embeddings import get_medical_embeddings
+from src.document_loader import MedicalDocumentLoader
+from src.vector_store import initialize_lexical_index, initialize_vector_store
+from src.hybrid_retriever import build_retriever
+from src.chatbot import MedicalChatbot
+from src.session_store import SessionStore
+from src.retry import RateLimiter
+from src.batch_qa import BatchAnswerer, read_questions
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of questions (JSONL or CSV with a 'question' column)")
+    parser.add_argument("input", help="Questions as JSONL ({\"id\": ..., \"question\": ...}) or CSV")
+    parser.add_argument("--output", default="answers.jsonl", help="JSONL results; appended to when resuming")
+    parser.add_argument("--directory", default="data/medical_docs")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="Questions answered at once")
+    parser.add_argument("--batch-size", type=int, default=64, help="Questions embedded per Voyage call")
+    parser.add_argument("--rpm", type=float, default=GEMINI_REQUESTS_PER_MINUTE,
+                        help="Gemini requests per minute across all workers (0 = unlimited)")
+    parser.add_argument("--retries", type=int, default=5, help="Retries per Gemini call")
+    parser.add_argument("--no-resume", action="store_true", help="Overwrite the output instead of resuming")
+    parser.add_argument("--skip-sync", action="store_true", help="Do not sync the document directory first")
+    args = parser.parse_args()
+
+    embeddings = get_medical_embeddings()
+    vector_store = initialize_vector_store(embeddings)
+    lexical_index = initialize_lexical_index()
+    loader = MedicalDocumentLoader(args.directory)
+    if not args.skip_sync:
+        print(f"Knowledge base synced: {loader.sync(vector_store, lexical_index=lexical_index)}")
+
+    chatbot = MedicalChatbot(
+        vector_store,
+        retriever=build_retriever(vector_store, lexical_index),
+        # Batch sessions are single-turn and dropped right away; nothing to persist
+        session_store=SessionStore(max_sessions=args.concurrency * 4),
+        rate_limiter=RateLimiter(args.rpm),
+        generation_retries=args.retries,
+        # Nobody can answer clarifying questions in a batch, so every question gets a real answer
+        triage=False
+    )
+    if chatbot.answer_cache is not None:
+        chatbot.answer_cache.set_corpus_version(loader.corpus_version())
+
+    answerer = BatchAnswerer(chatbot, concurrency=args.concurrency, batch_size=args.batch_size)
+    stats = answerer.run(read_questions(args.input), args.output, resume=not args.no_resume)
+    print(f"Answered {stats['answered']} questions ({stats['failed']} failed, {stats['skipped']} already done) "
+          f"in {stats['seconds']:.1f}s ({stats['questions_per_sec']:.2f} questions/sec)")
+
+if __name__ == "__main__":
+    main()
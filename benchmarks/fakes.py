@@ -0,0 +1,169 @@
+"""
+Deterministic offline stand-ins for Voyage, Pinecone and Gemini
+
+Each fake can simulate network latency so benchmarks and load tests exercise the
+same concurrency behaviour as the real services without any API keys.
+"""
+import asyncio
+import hashlib
+import time
+from typing import Any, Iterator, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Hashed bag-of-words vectors: texts sharing words get similar embeddings
+    """
+
+    def __init__(self, dimension: int = 256, latency: float = 0.0):
+        self.dimension = dimension
+        self.latency = latency
+        self.calls = 0
+        self.model = "fake-embeddings"
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in text.lower().split():
+            digest = hashlib.md5(word.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dimension] += 1.0
+        vector[0] += 1e-3
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        # Like Voyage, many queries share one request
+        return self.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that answers after a fixed delay plus a per-token delay
+
+    The answer is derived from a hash of the prompt, so replays are deterministic.
+    """
+
+    latency: float = 0.0
+    token_latency: float = 0.0
+    answer_tokens: int = 40
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-medical-chat"
+
+    def _tokens(self, messages: List) -> List[str]:
+        prompt = "".join(str(message.content) for message in messages)
+        seed = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return [f"{seed[i % len(seed)]}{i} " for i in range(self.answer_tokens)]
+
+    def _generate(self, messages: List, stop: Optional[List[str]] = None, run_manager: Any = None,
+                  **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency + self.token_latency * self.answer_tokens)
+        content = "".join(self._tokens(messages))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    async def _agenerate(self, messages: List, stop: Optional[List[str]] = None, run_manager: Any = None,
+                         **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency + self.token_latency * self.answer_tokens)
+        content = "".join(self._tokens(messages))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _stream(self, messages: List, stop: Optional[List[str]] = None, run_manager: Any = None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for token in self._tokens(messages):
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+MEDICAL_PASSAGES = [
+    "Influenza presents with fever, myalgia, headache and a dry cough lasting several days.",
+    "Type 2 diabetes is managed with lifestyle changes, metformin and, when needed, insulin therapy.",
+    "Hypertension is diagnosed when blood pressure is persistently above 130/80 mmHg.",
+    "Amoxicillin is a penicillin antibiotic used for otitis media, sinusitis and pneumonia.",
+    "Asthma exacerbations are treated with inhaled short-acting beta agonists such as salbutamol.",
+    "Migraine headaches are often unilateral, pulsating and accompanied by photophobia and nausea.",
+    "Iron deficiency anaemia causes fatigue, pallor and reduced haemoglobin concentration.",
+    "Nurses should use open questions and active listening to build therapeutic communication.",
+    "Hypothyroidism presents with weight gain, cold intolerance and elevated TSH levels.",
+    "Warfarin requires INR monitoring and interacts with many antibiotics and foods.",
+]
+
+
+def synthetic_corpus(n_chunks: int) -> List[str]:
+    """
+    Deterministic corpus of medical-sounding chunks for index and retrieval benchmarks
+    """
+    return [
+        f"{MEDICAL_PASSAGES[i % len(MEDICAL_PASSAGES)]} Reference section {i}, page {i // 10}."
+        for i in range(n_chunks)
+    ]
+
+
+QUERY_SET = [
+    "What are the symptoms of influenza?",
+    "How is type 2 diabetes treated?",
+    "When is blood pressure considered hypertension?",
+    "What infections is amoxicillin used for?",
+    "How are asthma attacks managed?",
+    "What are typical migraine features?",
+    "What does iron deficiency anaemia cause?",
+    "How should nurses communicate with patients?",
+    "What are signs of hypothyroidism?",
+    "What does warfarin interact with?",
+]
+
+
+class FakePineconeIndex:
+    """
+    Stand-in for a pinecone.Index that only records upserts after a simulated delay
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.vectors = {}
+
+    def upsert(self, vectors, namespace: str = None):
+        if self.latency:
+            time.sleep(self.latency)
+        for vector_id, values, metadata in vectors:
+            self.vectors[vector_id] = (values, metadata)
+        return {"upserted_count": len(vectors)}
+
+
+def slow_vector_store(vector_store, latency: float):
+    """
+    Add a simulated network round trip to every similarity search of a vector store
+    """
+    if not latency:
+        return vector_store
+    search = vector_store.similarity_search_with_score_by_vector
+
+    def delayed_search(*args, **kwargs):
+        time.sleep(latency)
+        return search(*args, **kwargs)
+
+    vector_store.similarity_search_with_score_by_vector = delayed_search
+    return vector_store
@@ -0,0 +1,88 @@
+"""
+Drive many concurrent achat() sessions through one MedicalChatbot
+
+    python -m benchmarks.load_test --sessions 300 --turns 3
+    python -m benchmarks.load_test --live --sessions 20   # real Voyage/Pinecone/Gemini
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings, QUERY_SET, synthetic_corpus
+from src.chatbot import MedicalChatbot
+from src.config import GEMINI_MAX_CONCURRENCY
+from src.local_vector_store import LocalVectorStore
+from src.session_store import SQLiteSessionStore
+
+
+def build_offline_chatbot(args, directory: str) -> MedicalChatbot:
+    embeddings = FakeEmbeddings(latency=args.embed_latency)
+    vector_store = LocalVectorStore(os.path.join(directory, "index"), embeddings)
+    vector_store.add_texts(synthetic_corpus(args.chunks))
+    llm = FakeChatModel(latency=args.llm_latency, token_latency=args.token_latency)
+    sessions = SQLiteSessionStore(os.path.join(directory, "sessions.sqlite3"))
+    return MedicalChatbot(vector_store, llm=llm, session_store=sessions, max_concurrent_generations=args.concurrency)
+
+
+def build_live_chatbot(args) -> MedicalChatbot:
+    from src.embeddings import get_medical_embeddings
+    from src.vector_store import initialize_vector_store
+    vector_store = initialize_vector_store(get_medical_embeddings())
+    return MedicalChatbot(vector_store, max_concurrent_generations=args.concurrency)
+
+
+async def run_session(chatbot: MedicalChatbot, index: int, turns: int, latencies: list):
+    for turn in range(turns):
+        query = QUERY_SET[(index + turn) % len(QUERY_SET)]
+        started = time.perf_counter()
+        await chatbot.achat(query, session_id=f"session-{index}")
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(chatbot: MedicalChatbot, sessions: int, turns: int) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        run_session(chatbot, i, turns, latencies) for i in range(sessions)
+    ))
+    elapsed = time.perf_counter() - started
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies else (0.0, 0.0, 0.0)
+    return {
+        "sessions": sessions,
+        "turns": turns,
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "requests_per_sec": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_p50": float(p50),
+        "latency_p95": float(p95),
+        "latency_p99": float(p99),
+        "active_sessions": len(chatbot.sessions),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for MedicalChatbot.achat")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=GEMINI_MAX_CONCURRENCY,
+                        help="Maximum Gemini calls in flight")
+    parser.add_argument("--live", action="store_true", help="Use the configured real services")
+    parser.add_argument("--chunks", type=int, default=2000, help="Offline corpus size")
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--no-answer-cache", action="store_true")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        chatbot = build_live_chatbot(args) if args.live else build_offline_chatbot(args, directory)
+        if args.no_answer_cache:
+            chatbot.answer_cache = None
+        print(json.dumps(asyncio.run(run(chatbot, args.sessions, args.turns)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,298 @@
+"""
+Ingestion and query benchmarks against deterministic offline fakes
+
+    python -m benchmarks.run_benchmarks --output results.json
+    python -m benchmarks.run_benchmarks --compare results.json
+
+Every run writes one JSON document (commit, parameters, per-benchmark latency
+percentiles, throughput and peak traced memory) so results can be diffed across commits.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+import numpy as np
+from langchain_core.documents import Document
+from benchmarks.fakes import (
+    FakeChatModel,
+    FakeEmbeddings,
+    FakePineconeIndex,
+    QUERY_SET,
+    slow_vector_store,
+    synthetic_corpus,
+)
+from src.chatbot import MedicalChatbot
+from src.document_loader import MedicalDocumentLoader
+from src.indexer import BulkIndexer
+from src.local_vector_store import LocalVectorStore
+from src.session_store import SQLiteSessionStore
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    if not latencies:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "count": len(latencies),
+        "mean": float(np.mean(latencies)),
+        "p50": float(p50),
+        "p95": float(p95),
+        "p99": float(p99),
+    }
+
+
+def measure(fn: Callable[[], Dict], trace_memory: bool) -> Dict:
+    """
+    Run one benchmark, adding wall time and (optionally) peak traced Python memory
+    """
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = fn()
+    finally:
+        elapsed = time.perf_counter() - started
+        if trace_memory:
+            result_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    result["seconds"] = elapsed
+    if trace_memory:
+        result["peak_memory_bytes"] = result_peak
+    return result
+
+
+def make_chunks(n_chunks: int) -> List[Document]:
+    return [
+        Document(page_content=text, metadata={"source": f"synthetic-{i // 50}.pdf", "chunk_id": f"chunk-{i}"})
+        for i, text in enumerate(synthetic_corpus(n_chunks))
+    ]
+
+
+def bench_parse(args) -> Dict:
+    """
+    PDF parsing and chunking: serial load_documents() against the process-pool stream
+    """
+    serial_loader = MedicalDocumentLoader(args.docs)
+    started = time.perf_counter()
+    serial_chunks = len(serial_loader.load_documents())
+    serial_seconds = time.perf_counter() - started
+
+    pooled_loader = MedicalDocumentLoader(args.docs, max_workers=args.workers)
+    started = time.perf_counter()
+    pooled_chunks = sum(len(batch) for batch in pooled_loader.stream_documents())
+    pooled_seconds = time.perf_counter() - started
+
+    return {
+        "chunks": serial_chunks,
+        "serial_seconds": serial_seconds,
+        "pooled_seconds": pooled_seconds,
+        "pooled_chunks": pooled_chunks,
+        "chunks_per_sec": serial_chunks / serial_seconds if serial_seconds else 0.0,
+        "pooled_chunks_per_sec": pooled_chunks / pooled_seconds if pooled_seconds else 0.0,
+        "per_file_seconds": summarize([entry["seconds"] for entry in pooled_loader.parse_report]),
+        "failures": [entry for entry in pooled_loader.parse_report if entry["error"]],
+    }
+
+
+def bench_bulk_index(args) -> Dict:
+    """
+    Embedding plus upsert through the pipelined bulk indexer
+    """
+    embeddings = FakeEmbeddings(latency=args.embed_latency)
+    index = FakePineconeIndex(latency=args.upsert_latency)
+    indexer = BulkIndexer(embeddings, index, concurrency=args.concurrency)
+    stats = indexer.index_documents(make_chunks(args.chunks))
+    return {
+        "chunks": stats["chunks"],
+        "batches": stats["batches"],
+        "chunks_per_sec": stats["chunks_per_sec"],
+        "embedding_calls": embeddings.calls,
+    }
+
+
+def bench_local_upsert(args, directory: str) -> Dict:
+    """
+    Embedding plus upsert into the local vector store, in loader-sized batches
+    """
+    store = LocalVectorStore(directory, FakeEmbeddings(latency=args.embed_latency))
+    chunks = make_chunks(args.chunks)
+    latencies = []
+    for start in range(0, len(chunks), 100):
+        batch = chunks[start:start + 100]
+        started = time.perf_counter()
+        store.add_documents(batch, ids=[chunk.metadata["chunk_id"] for chunk in batch])
+        latencies.append(time.perf_counter() - started)
+    total = sum(latencies)
+    return {
+        "chunks": len(chunks),
+        "batch_latency": summarize(latencies),
+        "chunks_per_sec": len(chunks) / total if total else 0.0,
+    }
+
+
+def bench_query(args, directory: str) -> Dict:
+    """
+    MedicalChatbot.respond() over the fixed query set, one fresh session per query
+    """
+    embeddings = FakeEmbeddings(latency=args.embed_latency)
+    store = LocalVectorStore(os.path.join(directory, "index"), embeddings)
+    store.add_texts(synthetic_corpus(args.chunks))
+    slow_vector_store(store, args.search_latency)
+    llm = FakeChatModel(latency=args.llm_latency, token_latency=args.token_latency)
+    sessions = SQLiteSessionStore(os.path.join(directory, "sessions.sqlite3"))
+    chatbot = MedicalChatbot(store, llm=llm, session_store=sessions)
+    if not args.answer_cache:
+        chatbot.answer_cache = None
+
+    latencies = []
+    stages = {}
+    embedding_calls = embeddings.calls
+    for i in range(args.queries):
+        result = chatbot.respond(QUERY_SET[i % len(QUERY_SET)], session_id=f"bench-{i}")
+        latencies.append(result["timings"]["total"])
+        for stage, seconds in result["timings"].items():
+            stages.setdefault(stage, []).append(seconds)
+    total = sum(latencies)
+    return {
+        "queries": len(latencies),
+        "latency": summarize(latencies),
+        "stages": {stage: summarize(values) for stage, values in stages.items() if stage != "total"},
+        "queries_per_sec": len(latencies) / total if total else 0.0,
+        "embedding_calls_per_query": (embeddings.calls - embedding_calls) / max(len(latencies), 1),
+    }
+
+
+STARTUP_MODULES = ["src", "src.config", "src.vector_store", "src.chatbot", "src.document_loader"]
+
+
+def _import_time(module: str) -> Dict:
+    """
+    Import one module in a fresh interpreter under -X importtime
+
+    Returns the wall time of the import and its slowest imports by cumulative time.
+    """
+    code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True
+    )
+    slowest = []
+    for line in completed.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        slowest.append((int(parts[1]) / 1e6, parts[2].strip()))
+    slowest.sort(reverse=True)
+    return {
+        "seconds": float(completed.stdout.strip()),
+        "slowest_imports": {name: seconds for seconds, name in slowest[:10]},
+    }
+
+
+def bench_startup(args) -> Dict:
+    """
+    Cold import time of the entry-point modules, each in its own interpreter
+    """
+    modules = {}
+    for module in STARTUP_MODULES:
+        runs = [_import_time(module) for _ in range(args.startup_runs)]
+        modules[module] = {
+            "latency": summarize([run["seconds"] for run in runs]),
+            "slowest_imports": runs[-1]["slowest_imports"],
+        }
+    # The package import is what every script pays before doing any work
+    return {"latency": modules["src"]["latency"], "modules": modules}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict, baseline: Dict):
+    """
+    Print relative change of the headline numbers against a previous run
+    """
+    def pct(new, old):
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    print(f"Comparing {current.get('commit')} against {baseline.get('commit')}")
+    for name, result in current["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if not previous:
+            continue
+        for key in ("chunks_per_sec", "queries_per_sec", "peak_memory_bytes"):
+            if key in result and key in previous:
+                print(f"  {name}.{key}: {previous[key]:.4g} -> {result[key]:.4g} ({pct(result[key], previous[key])})")
+        for key in ("p50", "p95", "p99"):
+            if key in result.get("latency", {}) and key in previous.get("latency", {}):
+                new, old = result["latency"][key], previous["latency"][key]
+                print(f"  {name}.latency.{key}: {old * 1000:.2f}ms -> {new * 1000:.2f}ms ({pct(new, old)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OptiMediX ingestion and query benchmarks")
+    parser.add_argument("--docs", default="data/medical_docs", help="PDF directory for the parse benchmark")
+    parser.add_argument("--chunks", type=int, default=5000, help="Synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--concurrency", type=int, default=4, help="Bulk indexer concurrency")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Seconds per embedding call")
+    parser.add_argument("--upsert-latency", type=float, default=0.0, help="Seconds per upsert call")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="Seconds per vector search")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per Gemini call")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds per generated token")
+    parser.add_argument("--startup-runs", type=int, default=5, help="Fresh interpreters per module for startup")
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the semantic answer cache enabled")
+    parser.add_argument("--only", nargs="*", help="Run only these benchmarks")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc (it slows Python code)")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    parser.add_argument("--compare", help="Previous JSON results to compare against")
+    args = parser.parse_args()
+
+    trace_memory = not args.no_memory
+    with tempfile.TemporaryDirectory() as directory:
+        benchmarks = {
+            "parse": lambda: bench_parse(args),
+            "bulk_index": lambda: bench_bulk_index(args),
+            "local_upsert": lambda: bench_local_upsert(args, os.path.join(directory, "upsert")),
+            "query": lambda: bench_query(args, os.path.join(directory, "query")),
+            "startup": lambda: bench_startup(args),
+        }
+        results = {}
+        for name, fn in benchmarks.items():
+            if args.only and name not in args.only:
+                continue
+            results[name] = measure(fn, trace_memory)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "parameters": vars(args),
+        "benchmarks": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,8 +1,10 @@
-from pinecone import Pinecone
-from src.config import PINECONE_API_KEY, PINECONE_INDEX_NAME
+import os
+from src.config import INDEX_CHECKPOINT_PATH, INGESTION_MANIFEST_PATH, PINECONE_INDEX_NAME
+from src.ingestion_manifest import IngestionManifest
+from src.vector_store import forget_index_check, get_pinecone_client
 
 def delete_pinecone_index():
-    pc = Pinecone(api_key=PINECONE_API_KEY)
+    pc = get_pinecone_client()
     
     if PINECONE_INDEX_NAME in [index.name for index in pc.list_indexes()]:
         print(f"Deleting index: {PINECONE_INDEX_NAME}")
@@ -10,6 +12,14 @@ def delete_pinecone_index():
         print("Index deleted successfully")
     else:
         print("Index does not exist")
+    # The next start must check (and recreate) the index again
+    forget_index_check()
+    # ...and the next sync must embed every document into it, not report them unchanged
+    manifest = IngestionManifest(INGESTION_MANIFEST_PATH)
+    manifest.reset()
+    manifest.close()
+    if os.path.exists(INDEX_CHECKPOINT_PATH):
+        os.remove(INDEX_CHECKPOINT_PATH)
 
 if __name__ == "__main__":
-    delete_pinecone_index() 
\ No newline at end of file
+    delete_pinecone_index() 
@@ -1,24 +1,29 @@
 from src.embeddings import get_medical_embeddings
 from src.document_loader import MedicalDocumentLoader
-from src.vector_store import initialize_vector_store
+from src.vector_store import initialize_lexical_index, initialize_vector_store
+from src.hybrid_retriever import build_retriever
 from src.chatbot import MedicalChatbot
 
 def main():
     # Initialize embeddings
     embeddings = get_medical_embeddings()
     
-    # Load and process medical documents
-    loader = MedicalDocumentLoader("data/medical_docs")
-    documents = loader.load_documents()
-    
     # Initialize vector store
     vector_store = initialize_vector_store(embeddings)
+    lexical_index = initialize_lexical_index()
     
-    # Add documents to vector store
-    vector_store.add_documents(documents)
+    # Index only the medical documents that are new or changed since the last run
+    loader = MedicalDocumentLoader("data/medical_docs")
+    stats = loader.sync(vector_store, lexical_index=lexical_index)
+    print(f"Knowledge base synced: {stats}")
+    for entry in loader.parse_report:
+        if entry["error"]:
+            print(f"Skipped {entry['path']}: {entry['error']}")
     
     # Initialize chatbot
-    chatbot = MedicalChatbot(vector_store)
+    chatbot = MedicalChatbot(vector_store, retriever=build_retriever(vector_store, lexical_index))
+    if chatbot.answer_cache is not None:
+        chatbot.answer_cache.set_corpus_version(loader.corpus_version())
     
     # Interactive chat loop
     print("Medical Chatbot initialized. Type 'quit' to exit.")
@@ -27,8 +32,11 @@ def main():
         if query.lower() == 'quit':
             break
         
-        response = chatbot.chat(query)
-        print(f"Doctor Bot: {response}")
+        # Print tokens as Gemini produces them
+        print("Doctor Bot: ", end="", flush=True)
+        for token in chatbot.chat_stream(query):
+            print(token, end="", flush=True)
+        print()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,11 +1,29 @@
-from .chatbot import MedicalChatbot
-from .document_loader import MedicalDocumentLoader
-from .embeddings import get_medical_embeddings
-from .vector_store import initialize_vector_store
+import importlib
+
+# Submodules are imported on first attribute access, so `import src` (and
+# `from src.config import ...`) does not pull in LangChain, Gemini, Voyage and Pinecone
+_exports = {
+    'MedicalChatbot': '.chatbot',
+    'MedicalDocumentLoader': '.document_loader',
+    'get_medical_embeddings': '.embeddings',
+    'initialize_vector_store': '.vector_store',
+}
 
 __all__ = [
     'MedicalChatbot',
     'MedicalDocumentLoader',
     'get_medical_embeddings',
     'initialize_vector_store',
-] 
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    if name not in _exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_exports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional
+import numpy as np
+from src.text_utils import hash_text
+
+
+def source_key(documents: List) -> FrozenSet[str]:
+    """
+    Identify a retrieved context by the chunks it contains, independent of order
+    """
+    return frozenset(
+        doc.metadata.get("chunk_id") or hash_text(doc.page_content) for doc in documents
+    )
+
+
+class SemanticAnswerCache:
+    """
+    Answers keyed by query embedding, reused for near-identical questions
+
+    A lookup hits when a stored question is within the cosine similarity threshold
+    and the retrieved context is the same set of chunks. Entries expire after
+    ttl_seconds, the least recently used entry is evicted past max_entries, and
+    everything is dropped when the corpus version changes.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 3600, max_entries: int = 1000):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.corpus_version = None
+        self._entries = OrderedDict()
+        self._matrix = None
+        self._keys = []
+        self._next_key = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    def set_corpus_version(self, version: str):
+        """
+        Invalidate every entry if the ingested corpus has changed
+        """
+        with self._lock:
+            if version != self.corpus_version:
+                self._entries.clear()
+                self._matrix = None
+                self.corpus_version = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def lookup(self, query_vector: List[float], sources: FrozenSet[str]) -> Optional[Dict]:
+        with self._lock:
+            self._expire()
+            entry = self._best_match(query_vector, sources)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.seconds_saved += entry["generation_seconds"]
+            self._entries.move_to_end(entry["key"])
+            return entry
+
+    def store(self, query_vector: List[float], sources: FrozenSet[str], answer: str,
+              source_names: List[str], generation_seconds: float):
+        vector = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return
+        with self._lock:
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = {
+                "key": key,
+                "vector": vector / norm,
+                "sources": sources,
+                "answer": answer,
+                "source_names": source_names,
+                "generation_seconds": generation_seconds,
+                "created": time.time(),
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [key for key, entry in self._entries.items() if entry["created"] < cutoff]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _best_match(self, query_vector: List[float], sources: FrozenSet[str]) -> Optional[Dict]:
+        if not self._entries:
+            return None
+        if self._matrix is None:
+            self._keys = list(self._entries)
+            self._matrix = np.stack([self._entries[key]["vector"] for key in self._keys])
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return None
+        scores = self._matrix @ (query / norm)
+        for position in np.argsort(-scores):
+            if scores[position] < self.threshold:
+                break
+            entry = self._entries[self._keys[position]]
+            if entry["sources"] == sources:
+                return entry
+        return None
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "seconds_saved": self.seconds_saved,
+        }
\ No newline at end of file
@@ -0,0 +1,187 @@
+import csv
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Set
+from src.embeddings import embed_queries
+
+logger = logging.getLogger(__name__)
+
+
+def read_questions(path: str) -> Iterator[Dict]:
+    """
+    Yield {"id", "question", ...} items from a JSONL or CSV file
+
+    Items without an id are numbered by their position in the file, which stays
+    stable across runs as long as the file is only appended to.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for index, row in enumerate(rows):
+            question = (row.get("question") or "").strip()
+            if not question:
+                continue
+            item = dict(row)
+            item["id"] = str(row.get("id") or index)
+            item["question"] = question
+            yield item
+
+
+def completed_ids(output_path: str) -> Set[str]:
+    """
+    IDs already answered without error in a previous run's output
+
+    Records answered with triage questions instead of an answer are not counted,
+    so a run with triage turned off answers them.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut short by an interrupted run
+                continue
+            if record.get("error") is None and not record.get("triage"):
+                done.add(str(record["id"]))
+    return done
+
+
+def compact_output(output_path: str) -> int:
+    """
+    Rewrite the output with only the last record per ID, in first-seen order
+
+    A resumed run appends new records for IDs that failed before, so until this
+    runs the same ID can appear more than once; the later record wins. Lines cut
+    short by an interrupted run are dropped too. Returns how many lines were removed.
+    """
+    if not os.path.exists(output_path):
+        return 0
+    latest = {}
+    lines = 0
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            lines += 1
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            latest[str(record["id"])] = line if line.endswith("\n") else line + "\n"
+    removed = lines - len(latest)
+    if removed:
+        with open(output_path + ".tmp", "w", encoding="utf-8") as f:
+            f.writelines(latest.values())
+        os.replace(output_path + ".tmp", output_path)
+    return removed
+
+
+def _ends_mid_line(path: str) -> bool:
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return False
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+def _batches(items: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BatchAnswerer:
+    """
+    Answer a stream of questions through one MedicalChatbot, writing results as JSONL
+
+    Questions are embedded batch_size at a time in batched calls; retrieval and
+    generation for each batch then fan out over `concurrency` threads, with the
+    chatbot's rate limiter and retries guarding Gemini. Every result is appended
+    and flushed as soon as it is ready, so an interrupted run resumes by skipping
+    IDs already in the output. Failed items are written with their error and are
+    retried on the next run, as are items that got clarifying questions (give
+    the chatbot triage=False to answer every question directly). Once a run
+    finishes, the output is compacted to one record per ID.
+    """
+
+    def __init__(self, chatbot, concurrency: int = 8, batch_size: int = 64):
+        self.chatbot = chatbot
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+
+    def run(self, questions: Iterable[Dict], output_path: str, resume: bool = True) -> Dict:
+        done = completed_ids(output_path) if resume else set()
+        stats = {"answered": 0, "failed": 0, "skipped": 0, "compacted": 0, "seconds": 0.0}
+        started = time.perf_counter()
+
+        def pending():
+            for item in questions:
+                if item["id"] in done:
+                    stats["skipped"] += 1
+                    continue
+                yield item
+
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # A line cut short by an interrupted run must not swallow the first new record
+        broken_tail = resume and _ends_mid_line(output_path)
+        with open(output_path, "a" if resume else "w", encoding="utf-8") as output, \
+                ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="batch-qa") as executor:
+            if broken_tail:
+                output.write("\n")
+            for batch in _batches(pending(), self.batch_size):
+                embed_started = time.perf_counter()
+                try:
+                    vectors = embed_queries(self.chatbot.embeddings, [item["question"] for item in batch])
+                except Exception:
+                    # Fall back to per-question embedding inside respond()
+                    logger.warning("Batched query embedding failed, embedding one by one", exc_info=True)
+                    vectors = [None] * len(batch)
+                embed_seconds = (time.perf_counter() - embed_started) / len(batch)
+
+                futures = [
+                    executor.submit(self._answer, item, vector, embed_seconds)
+                    for item, vector in zip(batch, vectors)
+                ]
+                for future in as_completed(futures):
+                    record = future.result()
+                    output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    output.flush()
+                    stats["failed" if record["error"] else "answered"] += 1
+
+        stats["compacted"] = compact_output(output_path)
+        stats["seconds"] = time.perf_counter() - started
+        total = stats["answered"] + stats["failed"]
+        stats["questions_per_sec"] = total / stats["seconds"] if stats["seconds"] else 0.0
+        return stats
+
+    def _answer(self, item: Dict, vector, embed_seconds: float) -> Dict:
+        # A throwaway session per question keeps answers independent of one another
+        session_id = f"batch-{item['id']}"
+        result = self.chatbot.respond(item["question"], session_id=session_id, query_vector=vector)
+        self.chatbot.sessions.drop(session_id)
+        timings = dict(result["timings"])
+        timings["embed"] = embed_seconds
+        return {
+            "id": item["id"],
+            "question": item["question"],
+            "answer": result["answer"],
+            "sources": result["sources"],
+            "follow_up_questions": result["follow_up_questions"],
+            "triage": result["triage"],
+            "cached": result["cached"],
+            "error": result["error"],
+            "timings": timings,
+        }
@@ -1,16 +1,167 @@
-from langchain.chains import ConversationalRetrievalChain
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.memory import ConversationBufferWindowMemory
-from langchain.prompts import PromptTemplate
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from langchain_core.prompts import PromptTemplate
+from typing import Dict, Iterator, List, Optional
+from src.answer_cache import SemanticAnswerCache, source_key
+from src.context_budget import ContextPacker
+from src.hybrid_retriever import retrieve_with_vector
+from src.reranker import CrossEncoderScorer, Reranker
+from src.retry import RateLimiter, call_with_retries
+from src.text_utils import estimate_tokens
+from src.instrumentation import get_tracer
+from src.session_store import LLMSummarizer, SessionStore, SQLiteSessionStore, create_memory
+from src.triage import TriageEngine
+from src.config import (
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_TTL_SECONDS,
+    ANSWER_CACHE_MAX_ENTRIES,
+    GEMINI_MAX_CONCURRENCY,
+    CONTEXT_PACKING_ENABLED,
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_DUPLICATE_THRESHOLD,
+    RERANK_ENABLED,
+    RERANK_MODEL,
+    RERANK_CANDIDATES,
+    RERANK_THRESHOLD,
+    RERANK_MAX_K,
+    RERANK_MIN_K,
+    RERANK_BATCH_SIZE,
+    RERANK_LATENCY_BUDGET,
+    SESSION_STORE_BACKEND,
+    SESSION_STORE_PATH,
+    SESSION_HISTORY_TOKENS,
+    SESSION_SUMMARY_TOKENS,
+    SESSION_SUMMARIZER,
+    SESSION_TTL_SECONDS,
+    TRIAGE_ENABLED,
+    TRIAGE_RULES_PATH,
+)
+
+logger = logging.getLogger(__name__)
+
+NO_CONTEXT_MESSAGE = "I couldn't find any relevant information. Can you provide more details?"
+ERROR_MESSAGE = "I apologize, but I encountered an error processing your query. Please try again."
+CLARIFICATION_PREFIX = "To give you a better answer, can you please clarify: "
+
+# ConversationalRetrievalChain's condense prompt, inlined so importing the chatbot
+# does not pull in langchain.chains
+CONDENSE_QUESTION_PROMPT = PromptTemplate.from_template(
+    "Given the following conversation and a follow up question, rephrase the follow up question "
+    "to be a standalone question, in its original language.\n\n"
+    "Chat History:\n{chat_history}\nFollow Up Input: {question}\nStandalone question:"
+)
+
+def format_chat_history(messages: List) -> str:
+    """
+    Render memory messages the way ConversationalRetrievalChain does for its prompts
+    """
+    lines = []
+    for message in messages:
+        if message.type == "system":
+            # Running summary of turns folded out of a persistent session
+            lines.append(f"Summary of earlier conversation:\n{message.content}")
+            continue
+        role = "Human" if message.type == "human" else "Assistant"
+        lines.append(f"{role}: {message.content}")
+    return "\n".join(lines)
+
+class StageTimer:
+    """
+    Wall-clock seconds spent in each stage of answering one query
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            with get_tracer().span(name):
+                yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - started
+
+    def finish(self) -> Dict[str, float]:
+        self.timings["total"] = time.perf_counter() - self._started
+        return self.timings
+
+class Turn:
+    """
+    State of one query as it moves through the pipeline shared by respond, chat_stream and arespond
+    """
+
+    def __init__(self, query: str, memory, defer_memory: bool = False):
+        self.query = query
+        self.question = query
+        self.memory = memory
+        # With defer_memory the answer to remember is left in exchange for the caller to save
+        self.defer_memory = defer_memory
+        self.exchange = None
+        self.history = []
+        self.chat_history = ""
+        self.context = []
+        self.cache_key = None
+        self.timer = StageTimer()
+        self.result = {"answer": None, "sources": [], "follow_up_questions": [], "cached": False,
+                       "context": None, "triage": None, "error": None}
 
 class MedicalChatbot:
-    def __init__(self, vector_store):
-        self.memory = ConversationBufferWindowMemory(
-            memory_key="chat_history",
-            return_messages=True,
-            output_key="answer",
-            k=5  # Keep last 5 conversations
+    def __init__(self, vector_store, answer_cache: SemanticAnswerCache = None, llm=None,
+                 session_store: SessionStore = None, max_concurrent_generations: int = GEMINI_MAX_CONCURRENCY,
+                 retriever=None, context_packer: ContextPacker = None, reranker: Reranker = None,
+                 rate_limiter: RateLimiter = None, generation_retries: int = 0,
+                 triage_engine: TriageEngine = None, triage: bool = True):
+        self.embeddings = vector_store.embeddings
+        # triage=False turns clarifying questions off whatever the config says, e.g. for
+        # single-turn batch answering where nobody can reply to them
+        if triage_engine is None and triage and TRIAGE_ENABLED:
+            triage_engine = TriageEngine.from_file(TRIAGE_RULES_PATH)
+        self.triage_engine = triage_engine if triage else None
+        if reranker is None and RERANK_ENABLED:
+            reranker = Reranker(
+                scorer=CrossEncoderScorer(RERANK_MODEL) if RERANK_MODEL else None,
+                threshold=RERANK_THRESHOLD,
+                max_k=RERANK_MAX_K,
+                min_k=RERANK_MIN_K,
+                batch_size=RERANK_BATCH_SIZE,
+                latency_budget=RERANK_LATENCY_BUDGET
+            )
+        self.reranker = reranker
+        # The reranker needs a wider candidate pool than the prompt will use
+        self.retriever = retriever or vector_store.as_retriever(
+            search_kwargs={"k": RERANK_CANDIDATES if reranker is not None else 8}
         )
+        if answer_cache is None and ANSWER_CACHE_ENABLED:
+            answer_cache = SemanticAnswerCache(
+                threshold=ANSWER_CACHE_THRESHOLD,
+                ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+                max_entries=ANSWER_CACHE_MAX_ENTRIES
+            )
+        self.answer_cache = answer_cache
+
+        if context_packer is None and CONTEXT_PACKING_ENABLED:
+            context_packer = ContextPacker(
+                max_tokens=CONTEXT_TOKEN_BUDGET,
+                duplicate_threshold=CONTEXT_DUPLICATE_THRESHOLD
+            )
+        self.context_packer = context_packer
+
+        # Memory for callers without a session ID, created on first use
+        self.memory = None
+
+        self.max_concurrent_generations = max_concurrent_generations
+        # Optional pacing and retries for respond()'s Gemini call, e.g. for batch workloads
+        self.rate_limiter = rate_limiter
+        self.generation_retries = generation_retries
+        self._generation_slots = None
+        self._generation_slots_loop = None
         
         self.initial_prompt = """You are an expert medical AI assistant. Use the following pieces of context to provide accurate, well-reasoned medical information. Always cite your sources and explain your reasoning.
         
@@ -31,66 +182,436 @@ class MedicalChatbot:
             input_variables=["context", "chat_history", "question"]
         )
         
-        self.chain = ConversationalRetrievalChain.from_llm(
-            llm=ChatGoogleGenerativeAI(
-                model="gemini-pro",
-                temperature=0.1,
-                convert_system_message_to_human=True,
-                max_output_tokens=2048,
-            ),
-            retriever=vector_store.as_retriever(
-                search_kwargs={"k": 8}
-            ),
-            memory=self.memory,
-            return_source_documents=True,
-            verbose=True,
-            combine_docs_chain_kwargs={"prompt": self.qa_prompt}
-        )
+        # The Gemini client is built on first use, so startup does not wait for it
+        self._llm = llm
+        self._llm_lock = threading.Lock()
+
+        # Conversation memories for callers that pass a session ID
+        self.sessions = session_store if session_store is not None else self._build_session_store()
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            with self._llm_lock:
+                if self._llm is None:
+                    from langchain_google_genai import ChatGoogleGenerativeAI
+                    self._llm = ChatGoogleGenerativeAI(
+                        model="gemini-pro",
+                        temperature=0.1,
+                        convert_system_message_to_human=True,
+                        max_output_tokens=2048,
+                    )
+        return self._llm
+
+    @llm.setter
+    def llm(self, llm):
+        self._llm = llm
 
     def chat(self, query: str) -> str:
         """
         Process user query and return medical advice
         """
+        return self.respond(query)["answer"]
+
+    def respond(self, query: str, session_id: str = None, query_vector: List[float] = None) -> Dict:
+        """
+        Answer a query through explicit triage -> condense -> retrieve -> generate stages
+
+        A query that triggers a triage rule is answered with clarifying questions
+        before anything else runs; result["triage"] names the rules that fired.
+        Returns the answer with its sources, any follow-up questions, whether it came
+        from the answer cache, the seconds spent in each stage and, when the context
+        was packed, how many prompt tokens packing saved.
+        A query_vector embedded beforehand (e.g. in a batch) is used for retrieval
+        and the answer cache instead of embedding the query again.
+        """
+        with get_tracer().request("chat", session_id=session_id):
+            turn = self._start_turn(query, session_id)
+            try:
+                prompt = self._prepare(turn, query_vector)
+                if prompt is None:
+                    return turn.result
+                with turn.timer.stage("generate"):
+                    response = self._generate(prompt)
+                self._finish_turn(turn, prompt, response.content, response)
+                return turn.result
+            except Exception as e:
+                return self._fail(turn, e)
+            finally:
+                turn.result["timings"] = turn.timer.finish()
+
+    def chat_stream(self, query: str, session_id: str = None, query_vector: List[float] = None) -> Iterator[str]:
+        """
+        Process user query and yield the answer as Gemini generates it
+
+        Runs the same stages as respond(), but streams the generated tokens, followed
+        by the sources. With a session_id the memory comes from the session store.
+        """
+        # Every step of the stream runs in a context of its own, so the request's trace
+        # is active while its stages run but does not leak into the caller between yields
+        context = contextvars.copy_context()
+        stream = self._chat_stream(query, session_id, query_vector)
         try:
-            # First, get relevant context from the vector store
-            context = self.chain.retriever.retrieve(query)
-            if not context:
-                return "I couldn't find any relevant information. Can you provide more details?"
-
-            # Ask follow-up questions based on the context
-            follow_up_questions = self.generate_follow_up_questions(query, context)
-            if follow_up_questions:
-                return "I found some information related to your query. Can you please clarify: " + " ".join(follow_up_questions)
-
-            # If no follow-up questions, proceed to generate an answer
-            response = self.chain.invoke({"question": query})
-            sources = [doc.metadata.get('source', 'Unknown') for doc in response.get('source_documents', [])]
-            answer = response["answer"]
-            
-            # Add source attribution if available
-            if sources:
-                answer += "\n\nSources consulted: " + ", ".join(set(sources))
-            
-            return answer
-        except Exception as e:
-            print(f"Error processing query: {str(e)}")
-            return "I apologize, but I encountered an error processing your query. Please try again."
-
-    def generate_follow_up_questions(self, query, context):
-        # Analyze the query and context to generate relevant follow-up questions
-        questions = []
-        
-        # Example logic for generating follow-up questions
-        if "pain" in query.lower():
-            questions.append("Can you describe the location of the pain?")
-            questions.append("How long have you been experiencing this pain?")
-            questions.append("Is the pain constant or does it come and go?")
-            questions.append("Have you noticed any other symptoms, such as nausea or fever?")
-        
-        if "cough" in query.lower():
-            questions.append("How long have you had the cough?")
-            questions.append("Is it dry or productive (producing mucus)?")
-            questions.append("Do you have any other symptoms, like fever or shortness of breath?")
-        
-        # Add more conditions and questions as needed
-        return questions 
\ No newline at end of file
+            while True:
+                try:
+                    part = context.run(next, stream)
+                except StopIteration:
+                    return
+                yield part
+        finally:
+            context.run(stream.close)
+
+    def _chat_stream(self, query: str, session_id: str = None, query_vector: List[float] = None) -> Iterator[str]:
+        with get_tracer().request("chat_stream", session_id=session_id):
+            turn = self._start_turn(query, session_id)
+            try:
+                prompt = self._prepare(turn, query_vector)
+                if prompt is None:
+                    yield turn.result["answer"]
+                    return
+
+                parts = []
+                with turn.timer.stage("generate"):
+                    started = time.perf_counter()
+                    for chunk in self.llm.stream(prompt):
+                        if chunk.content:
+                            if not parts:
+                                turn.timer.timings["first_token"] = time.perf_counter() - started
+                                get_tracer().set_attribute("first_token_seconds", turn.timer.timings["first_token"])
+                            parts.append(chunk.content)
+                            yield chunk.content
+
+                streamed = "".join(parts)
+                answer = self._finish_turn(turn, prompt, streamed)
+                if answer != streamed:
+                    yield answer[len(streamed):]
+            except Exception as e:
+                yield self._fail(turn, e)["answer"]
+            finally:
+                turn.timer.finish()
+
+    async def achat(self, query: str, session_id: str = "default") -> str:
+        """
+        Process user query for one session without blocking the event loop
+        """
+        return (await self.arespond(query, session_id))["answer"]
+
+    async def arespond(self, query: str, session_id: str = "default", query_vector: List[float] = None) -> Dict:
+        """
+        Async respond(): same stages and result, for serving many sessions concurrently
+
+        The LLM client, retriever and answer cache are shared by every session; only
+        the conversation memory is per session. At most max_concurrent_generations
+        Gemini calls are in flight at once across all sessions.
+        """
+        with get_tracer().request("achat", session_id=session_id):
+            turn = self._start_turn(query, session_id, defer_memory=True)
+            try:
+                prompt = await self._aprepare(turn, query_vector)
+                if prompt is not None:
+                    with turn.timer.stage("generate"):
+                        async with self._generation_limiter():
+                            response = await self.llm.ainvoke(prompt)
+                    self._finish_turn(turn, prompt, response.content, response)
+                if turn.exchange is not None:
+                    # Saving may fold old turns into an LLM-written summary, so keep it off the event loop
+                    await asyncio.to_thread(self._save_exchange, turn)
+                return turn.result
+            except Exception as e:
+                return self._fail(turn, e)
+            finally:
+                turn.result["timings"] = turn.timer.finish()
+
+    def _stages(self, turn: Turn, query_vector: List[float] = None):
+        """
+        Triage -> condense -> retrieve -> rerank -> cache lookup -> pack, shared by every chat path
+
+        A generator that yields each blocking call as a tuple ("condense", prompt),
+        ("retrieve", question, query_vector) or ("embed", query) and is sent back the
+        result, so _prepare can make the calls directly and _aprepare can await them.
+        Returns the prompt to generate from, or None once turn.result holds the answer.
+        """
+        if self._clarified(turn):
+            return None
+
+        if turn.history:
+            # Rewrite follow-up questions into standalone ones before searching
+            with turn.timer.stage("condense"):
+                turn.question = yield ("condense", self._condense_prompt(turn.chat_history, turn.query))
+            # The vector was for the original wording, not the condensed question
+            query_vector = None
+
+        with turn.timer.stage("retrieve"):
+            context = yield ("retrieve", turn.question, query_vector)
+        if not self._select_context(turn, context):
+            return None
+
+        if self._uses_cache(turn):
+            with turn.timer.stage("cache_lookup"):
+                if query_vector is None:
+                    query_vector = yield ("embed", turn.query)
+                if self._serve_cached(turn, query_vector):
+                    return None
+
+        return self._prepare_prompt(turn)
+
+    def _prepare(self, turn: Turn, query_vector: List[float] = None) -> Optional[str]:
+        """
+        Run the stages, making each blocking call they ask for
+        """
+        stages = self._stages(turn, query_vector)
+        try:
+            call = next(stages)
+            while True:
+                try:
+                    result = self._call(*call)
+                except Exception as e:
+                    # Raised inside the stage that asked, so its timer and span close as usual
+                    call = stages.throw(e)
+                else:
+                    call = stages.send(result)
+        except StopIteration as done:
+            return done.value
+
+    async def _aprepare(self, turn: Turn, query_vector: List[float] = None) -> Optional[str]:
+        """
+        Run the stages, awaiting each call they ask for
+        """
+        stages = self._stages(turn, query_vector)
+        try:
+            call = next(stages)
+            while True:
+                try:
+                    result = await self._acall(*call)
+                except Exception as e:
+                    call = stages.throw(e)
+                else:
+                    call = stages.send(result)
+        except StopIteration as done:
+            return done.value
+
+    def _call(self, kind: str, *args):
+        if kind == "condense":
+            return self.llm.invoke(args[0]).content
+        if kind == "retrieve":
+            return self._retrieve(*args)
+        return self.embeddings.embed_query(args[0])
+
+    async def _acall(self, kind: str, *args):
+        if kind == "condense":
+            async with self._generation_limiter():
+                return (await self.llm.ainvoke(args[0])).content
+        if kind == "retrieve":
+            question, query_vector = args
+            if query_vector is not None:
+                return await asyncio.to_thread(self._retrieve, question, query_vector)
+            return await self.retriever.ainvoke(question)
+        return await self.embeddings.aembed_query(args[0])
+
+    def _start_turn(self, query: str, session_id: str = None, defer_memory: bool = False) -> Turn:
+        return Turn(query, self._memory_for(session_id), defer_memory)
+
+    def _remember(self, turn: Turn, answer: str):
+        turn.exchange = answer
+        if not turn.defer_memory:
+            self._save_exchange(turn)
+
+    @staticmethod
+    def _save_exchange(turn: Turn):
+        turn.memory.save_context({"question": turn.query}, {"answer": turn.exchange})
+
+    def _clarified(self, turn: Turn) -> bool:
+        """
+        Load the history, then answer with clarifying questions if the query fires a triage rule
+
+        Symptom mentions are clarified without paying for condense or retrieval.
+        """
+        turn.history = turn.memory.chat_memory.messages
+        turn.chat_history = format_chat_history(turn.history)
+        with turn.timer.stage("triage"):
+            triage = self._triage(turn.query, turn.history)
+        if triage is None:
+            return False
+        turn.result.update(follow_up_questions=triage["questions"], triage=triage,
+                           answer=self._clarify(triage))
+        # Remembered so the reply is condensed together with the original question
+        self._remember(turn, turn.result["answer"])
+        return True
+
+    def _select_context(self, turn: Turn, context: List) -> bool:
+        """
+        Rerank the retrieved chunks into turn.context; False (with the answer set) when nothing is left
+        """
+        get_tracer().count("retrieved_docs", len(context))
+        if context and self.reranker is not None:
+            with turn.timer.stage("rerank"):
+                context = self._rerank(turn.question, context)
+        turn.context = context
+        if not context:
+            turn.result["answer"] = NO_CONTEXT_MESSAGE
+            return False
+        return True
+
+    def _retrieve(self, question: str, query_vector: List[float] = None) -> List:
+        if query_vector is not None:
+            return retrieve_with_vector(self.retriever, question, query_vector)
+        return self.retriever.invoke(question)
+
+    def _uses_cache(self, turn: Turn) -> bool:
+        # Later turns depend on the chat history, so they are never served from the cache
+        return self.answer_cache is not None and not turn.history
+
+    def _serve_cached(self, turn: Turn, query_vector: List[float]) -> bool:
+        """
+        Reuse the answer to a near-identical opening question over the same context
+        """
+        cached, turn.cache_key = self._cache_lookup(query_vector, turn.context)
+        tracer = get_tracer()
+        tracer.set_attribute("answer_cache_hit", cached is not None)
+        if cached is None:
+            tracer.count("answer_cache_misses")
+            return False
+        tracer.count("answer_cache_hits")
+        tracer.count("answer_cache_seconds_saved", cached["generation_seconds"])
+        self._remember(turn, cached["answer"])
+        turn.result.update(answer=cached["answer"], sources=cached["source_names"], cached=True)
+        return True
+
+    def _prepare_prompt(self, turn: Turn) -> str:
+        with turn.timer.stage("pack"):
+            turn.context, turn.result["context"] = self._pack_context(turn.context)
+        return self._build_prompt(turn.question, turn.context, turn.chat_history)
+
+    def _finish_turn(self, turn: Turn, prompt: str, completion: str, response=None) -> str:
+        """
+        Count tokens, attach sources, remember the exchange and cache the answer; returns the answer
+        """
+        tracer = get_tracer()
+        for name, value in self._token_counts(prompt, completion, response).items():
+            tracer.count(name, value)
+        answer, sources = self._attach_sources(completion, turn.context)
+        self._remember(turn, answer)
+        self._cache_store(turn.cache_key, answer, sources, turn.timer.timings["generate"])
+        turn.result.update(answer=answer, sources=sorted(set(sources)))
+        return answer
+
+    @staticmethod
+    def _fail(turn: Turn, error: Exception) -> Dict:
+        logger.exception("Error processing query")
+        turn.result["answer"] = ERROR_MESSAGE
+        turn.result["error"] = f"{type(error).__name__}: {error}"
+        get_tracer().set_attribute("error", turn.result["error"])
+        return turn.result
+
+    def swap_retriever(self, retriever):
+        """
+        Point every chat path at a new retriever, e.g. after a background ingestion job
+        """
+        self.retriever = retriever
+
+    def _build_session_store(self):
+        if SESSION_STORE_BACKEND == "memory":
+            return SessionStore(k=5)
+        if SESSION_STORE_BACKEND != "sqlite":
+            raise ValueError(f"Unknown SESSION_STORE_BACKEND: {SESSION_STORE_BACKEND}")
+        return SQLiteSessionStore(
+            SESSION_STORE_PATH,
+            history_tokens=SESSION_HISTORY_TOKENS,
+            summary_tokens=SESSION_SUMMARY_TOKENS,
+            # A factory, so the Gemini client is still only built on first use
+            summarizer=LLMSummarizer(factory=lambda: self.llm) if SESSION_SUMMARIZER == "llm" else None,
+            ttl_seconds=SESSION_TTL_SECONDS or None
+        )
+
+    def _memory_for(self, session_id: str = None):
+        if session_id is not None:
+            return self.sessions.get(session_id)
+        if self.memory is None:
+            self.memory = create_memory(k=5)  # Keep last 5 conversations
+        return self.memory
+
+    @staticmethod
+    def _condense_prompt(chat_history: str, query: str) -> str:
+        return CONDENSE_QUESTION_PROMPT.format(chat_history=chat_history, question=query)
+
+    def _triage(self, query: str, history: List) -> Optional[Dict]:
+        """
+        The triage rules a query fires, unless it is the reply to our own clarifying questions
+        """
+        if self.triage_engine is None:
+            return None
+        if history and history[-1].type == "ai" and history[-1].content.startswith(CLARIFICATION_PREFIX):
+            return None
+        triage = self.triage_engine.triage(query)
+        if triage is not None:
+            get_tracer().set_attribute("triage_rules", ",".join(triage["rules"]))
+        return triage
+
+    @staticmethod
+    def _clarify(triage: Dict) -> str:
+        return CLARIFICATION_PREFIX + " ".join(triage["questions"])
+
+    def _generate(self, prompt: str):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        if self.generation_retries:
+            return call_with_retries(self.llm.invoke, prompt, max_retries=self.generation_retries)
+        return self.llm.invoke(prompt)
+
+    def _generation_limiter(self) -> asyncio.Semaphore:
+        # A semaphore belongs to the event loop it was first used on, so make one per loop
+        loop = asyncio.get_running_loop()
+        if self._generation_slots is None or self._generation_slots_loop is not loop:
+            self._generation_slots = asyncio.Semaphore(self.max_concurrent_generations)
+            self._generation_slots_loop = loop
+        return self._generation_slots
+
+    def _rerank(self, question: str, context: List) -> List:
+        reranked, report = self.reranker.rerank(question, context)
+        get_tracer().count("reranked_docs", report["kept"])
+        return reranked
+
+    def _pack_context(self, context: List):
+        """
+        Merge, deduplicate and budget the retrieved chunks; returns them with the packing report
+        """
+        if self.context_packer is None:
+            return context, None
+        packed, report = self.context_packer.pack(context)
+        get_tracer().count("context_tokens_saved", report["tokens_saved"])
+        return packed, report
+
+    def _build_prompt(self, question: str, context: List, chat_history: str) -> str:
+        return self.qa_prompt.format(
+            context="\n\n".join(doc.page_content for doc in context),
+            chat_history=chat_history,
+            question=question
+        )
+
+    @staticmethod
+    def _attach_sources(answer: str, documents: List):
+        sources = [doc.metadata.get('source', 'Unknown') for doc in documents]
+        # Add source attribution if available
+        if sources:
+            answer += "\n\nSources consulted: " + ", ".join(set(sources))
+        return answer, sources
+
+    @staticmethod
+    def _token_counts(prompt: str, completion: str, response=None) -> Dict[str, int]:
+        """
+        Token usage reported by the model, falling back to an estimate from the text
+        """
+        usage = getattr(response, "usage_metadata", None) or {}
+        return {
+            "prompt_tokens": usage.get("input_tokens") or estimate_tokens(prompt),
+            "completion_tokens": usage.get("output_tokens") or estimate_tokens(completion),
+        }
+
+    def _cache_lookup(self, query_vector: List[float], context: List):
+        cache_key = (query_vector, source_key(context))
+        return self.answer_cache.lookup(*cache_key), cache_key
+
+    def _cache_store(self, cache_key, answer: str, sources: List[str], generation_seconds: float):
+        if cache_key is not None:
+            query_vector, context_key = cache_key
+            self.answer_cache.store(query_vector, context_key, answer, sorted(set(sources)), generation_seconds)
@@ -0,0 +1,347 @@
+import json
+import mmap
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+from src.hybrid_retriever import search_by_vector
+from src.text_utils import hash_text
+from src.instrumentation import get_tracer
+
+TEXT_FILE = "chunks.txt"
+INDEX_FILE = "chunks.sqlite3"
+# compact() writes generation n + 1 of the text file next to generation n
+_GENERATION_FILE = "chunks.{}.txt"
+
+# Metadata small enough to keep on every vector; everything else lives in the chunk store
+VECTOR_METADATA_KEYS = ("chunk_id", "chunk_hash", "source", "page")
+
+# SQLite's default limit on bound parameters is 999
+_LOOKUP_BATCH_SIZE = 500
+
+
+def slim_metadata(metadata: Dict) -> Dict:
+    """
+    The part of a chunk's metadata stored with its vector: IDs, hash, source and page
+    """
+    return {key: metadata[key] for key in VECTOR_METADATA_KEYS if metadata.get(key) is not None}
+
+
+class ChunkStore:
+    """
+    Local home of chunk text and metadata, keyed by chunk ID
+
+    Texts are appended to a single UTF-8 file that is memory-mapped for reads; a
+    SQLite table maps each chunk ID to its (offset, length) in that file plus its
+    source, page, hash and full metadata. Deleting a chunk only drops its index row;
+    compact() reclaims the bytes, and maintain() runs it once compact_ratio of the
+    file is garbage. A crash between writing text and committing the index leaves
+    unreferenced bytes at the end of the file, which are harmless.
+
+    compact() writes a new generation of the text file and switches to it in the
+    same transaction that rewrites the offsets, so a crash at any point leaves the
+    index pointing at a complete file; the other generation is removed on open.
+    """
+
+    def __init__(self, directory: str, compact_ratio: float = 0.3):
+        self.directory = directory
+        self.compact_ratio = compact_ratio
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._map = None
+        self.conn = sqlite3.connect(os.path.join(directory, INDEX_FILE), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                source TEXT,
+                page INTEGER,
+                chunk_hash TEXT NOT NULL,
+                metadata TEXT NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS generation (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                value INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO generation (id, value) VALUES (0, 0);
+            """
+        )
+        self.conn.commit()
+        self._generation = self.conn.execute("SELECT value FROM generation WHERE id = 0").fetchone()[0]
+        self._text_path = self._generation_path(self._generation)
+        self._remove_stale_generations()
+        self._file = open(self._text_path, "ab")
+
+    def _generation_path(self, generation: int) -> str:
+        # Generation 0 keeps the original name, so existing stores open unchanged
+        name = TEXT_FILE if generation == 0 else _GENERATION_FILE.format(generation)
+        return os.path.join(self.directory, name)
+
+    def _remove_stale_generations(self):
+        """
+        Delete text files left by a compaction that crashed before or after switching generations
+        """
+        for generation in (self._generation - 1, self._generation + 1):
+            path = self._generation_path(generation) if generation >= 0 else None
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    def add_documents(self, documents: Iterable[Document], ids: Optional[List[str]] = None) -> List[str]:
+        """
+        Store chunks, skipping those already stored with the same text
+        """
+        documents = list(documents)
+        if ids is None:
+            ids = [doc.metadata.get("chunk_id") or hash_text(doc.page_content)[:32] for doc in documents]
+        with self._lock:
+            known = self._hashes(ids)
+            rows = []
+            for chunk_id, doc in zip(ids, documents):
+                chunk_hash = doc.metadata.get("chunk_hash") or hash_text(doc.page_content)
+                if known.get(chunk_id) == chunk_hash:
+                    continue
+                data = doc.page_content.encode("utf-8")
+                offset = self._file.tell()
+                self._file.write(data)
+                rows.append((chunk_id, offset, len(data), doc.metadata.get("source"), doc.metadata.get("page"),
+                             chunk_hash, json.dumps(doc.metadata, default=str)))
+                known[chunk_id] = chunk_hash
+            if rows:
+                # Text reaches the file before the index points at it
+                self._file.flush()
+                with self.conn:
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO chunks (chunk_id, offset, length, source, page, chunk_hash, metadata) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        rows
+                    )
+        return ids
+
+    def _hashes(self, ids: Sequence[str]) -> Dict[str, str]:
+        hashes = {}
+        for start in range(0, len(ids), _LOOKUP_BATCH_SIZE):
+            batch = ids[start:start + _LOOKUP_BATCH_SIZE]
+            hashes.update(self.conn.execute(
+                f"SELECT chunk_id, chunk_hash FROM chunks WHERE chunk_id IN ({','.join('?' * len(batch))})", batch
+            ).fetchall())
+        return hashes
+
+    def get(self, ids: Sequence[str]) -> Dict[str, Document]:
+        """
+        Stored chunks by ID; unknown IDs are left out
+        """
+        ids = list(dict.fromkeys(ids))
+        found = {}
+        with self._lock:
+            for start in range(0, len(ids), _LOOKUP_BATCH_SIZE):
+                batch = ids[start:start + _LOOKUP_BATCH_SIZE]
+                rows = self.conn.execute(
+                    f"SELECT chunk_id, offset, length, metadata FROM chunks WHERE chunk_id IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                for chunk_id, offset, length, metadata in rows:
+                    found[chunk_id] = Document(page_content=self._read(offset, length), metadata=json.loads(metadata))
+        return found
+
+    def _read(self, offset: int, length: int) -> str:
+        if length == 0:
+            return ""
+        if self._map is None or offset + length > len(self._map):
+            # The file grew since it was mapped
+            if self._map is not None:
+                self._map.close()
+            with open(self._text_path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        # Decode straight from the mapping, without an intermediate bytes copy
+        with memoryview(self._map) as view, view[offset:offset + length] as text:
+            return str(text, "utf-8")
+
+    def hydrate(self, documents: List[Document]) -> List[Document]:
+        """
+        Swap vector search hits for their stored text and full metadata
+
+        Hits the store does not know (e.g. vectors written before it existed) are
+        returned as they came.
+        """
+        ids = [doc.metadata.get("chunk_id") for doc in documents]
+        with get_tracer().span("hydrate", chunks=len(documents)):
+            stored = self.get([chunk_id for chunk_id in ids if chunk_id])
+        return [stored.get(chunk_id, doc) for chunk_id, doc in zip(ids, documents)]
+
+    def delete(self, ids: Sequence[str]):
+        ids = list(ids)
+        with self._lock, self.conn:
+            for start in range(0, len(ids), _LOOKUP_BATCH_SIZE):
+                batch = ids[start:start + _LOOKUP_BATCH_SIZE]
+                self.conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({','.join('?' * len(batch))})", batch)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM chunks WHERE chunk_id = ?", (chunk_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def garbage_ratio(self) -> float:
+        """
+        Fraction of the text file no longer referenced by any chunk
+        """
+        with self._lock:
+            self._file.flush()
+            size = os.path.getsize(self._text_path)
+            live = self.conn.execute("SELECT COALESCE(SUM(length), 0) FROM chunks").fetchone()[0]
+        return (size - live) / size if size else 0.0
+
+    def maintain(self) -> bool:
+        """
+        Compact once compact_ratio of the text file is garbage; returns whether it did
+        """
+        if self.garbage_ratio() <= self.compact_ratio:
+            return False
+        self.compact()
+        return True
+
+    def compact(self):
+        """
+        Rewrite the text file without deleted or superseded chunks
+        """
+        with self._lock:
+            rows = self.conn.execute("SELECT chunk_id, offset, length FROM chunks ORDER BY offset").fetchall()
+            generation = self._generation + 1
+            path = self._generation_path(generation)
+            offsets = []
+            with open(path, "wb") as f:
+                for chunk_id, offset, length in rows:
+                    offsets.append((f.tell(), chunk_id))
+                    if length:
+                        f.write(self._read(offset, length).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            # The new offsets and the switch to the new file commit together
+            with self.conn:
+                self.conn.executemany("UPDATE chunks SET offset = ? WHERE chunk_id = ?", offsets)
+                self.conn.execute("UPDATE generation SET value = ? WHERE id = 0", (generation,))
+            self._file.close()
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            old_path = self._text_path
+            self._generation = generation
+            self._text_path = path
+            self._file = open(path, "ab")
+            os.remove(old_path)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self.conn.close()
+
+
+class ChunkStoreVectorStore(VectorStore):
+    """
+    A vector store whose vectors carry only IDs and small metadata, with text from a ChunkStore
+
+    Searches go to the wrapped store and their hits are hydrated from the chunk
+    store, so queries no longer ship chunk text back over the network. Writes put
+    the chunks in the chunk store first and then upsert the vectors; with an
+    indexer (a BulkIndexer sharing the chunk store) the vectors are upserted
+    without their text.
+    """
+
+    def __init__(self, vector_store, chunk_store: ChunkStore, indexer=None):
+        self.vector_store = vector_store
+        self.chunk_store = chunk_store
+        self.indexer = indexer
+
+    @property
+    def embeddings(self):
+        return self.vector_store.embeddings
+
+    @property
+    def identity(self) -> Optional[str]:
+        return getattr(self.vector_store, "identity", None)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding, metadatas: Optional[List[dict]] = None,
+                   chunk_store: ChunkStore = None, vector_store_cls=None, ids: Optional[List[str]] = None,
+                   **kwargs: Any) -> "ChunkStoreVectorStore":
+        """
+        Build the wrapped store with vector_store_cls.from_texts (given the remaining kwargs) and wrap it
+
+        The chunks go to chunk_store with their full metadata; the wrapped store gets
+        only the slim metadata.
+        """
+        if chunk_store is None or vector_store_cls is None:
+            raise ValueError("ChunkStoreVectorStore.from_texts requires a chunk_store and a vector_store_cls")
+        texts = list(texts)
+        metadatas = [dict(metadata) for metadata in metadatas] if metadatas else [{} for _ in texts]
+        if ids is None:
+            ids = [metadata.get("chunk_id") or hash_text(text)[:32] for text, metadata in zip(texts, metadatas)]
+        for chunk_id, metadata in zip(ids, metadatas):
+            metadata.setdefault("chunk_id", chunk_id)
+        chunk_store.add_documents([Document(page_content=text, metadata=metadata)
+                                   for text, metadata in zip(texts, metadatas)], ids=ids)
+        vector_store = vector_store_cls.from_texts(
+            texts, embedding, metadatas=[slim_metadata(metadata) for metadata in metadatas], ids=ids, **kwargs
+        )
+        return cls(vector_store, chunk_store)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        metadatas = [dict(metadata) for metadata in metadatas] if metadatas else [{} for _ in texts]
+        if ids is None:
+            ids = [metadata.get("chunk_id") or hash_text(text)[:32] for text, metadata in zip(texts, metadatas)]
+        for chunk_id, metadata in zip(ids, metadatas):
+            metadata.setdefault("chunk_id", chunk_id)
+        documents = [Document(page_content=text, metadata=metadata) for text, metadata in zip(texts, metadatas)]
+        if self.indexer is not None:
+            self.indexer.index_documents(documents)
+            return ids
+        self.chunk_store.add_documents(documents, ids=ids)
+        return self.vector_store.add_texts(texts, metadatas=[slim_metadata(m) for m in metadatas], ids=ids, **kwargs)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        result = self.vector_store.delete(ids=ids, **kwargs)
+        if ids:
+            self.chunk_store.delete(ids)
+            checkpoint = getattr(self.indexer, "checkpoint", None)
+            if checkpoint is not None:
+                checkpoint.discard(ids)
+        return result
+
+    def maintain(self):
+        """
+        Compact the chunk store, and the wrapped store if it supports it, past their thresholds
+        """
+        self.chunk_store.maintain()
+        maintain = getattr(self.vector_store, "maintain", None)
+        if maintain is not None:
+            maintain()
+
+    def get_by_ids(self, ids: Sequence[str]) -> List[Document]:
+        stored = self.chunk_store.get(ids)
+        return [stored[chunk_id] for chunk_id in ids if chunk_id in stored]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.chunk_store.hydrate(self.vector_store.similarity_search(query, k=k, **kwargs))
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        results = self.vector_store.similarity_search_with_score(query, k=k, **kwargs)
+        documents = self.chunk_store.hydrate([doc for doc, _ in results])
+        return [(doc, score) for doc, (_, score) in zip(documents, results)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.chunk_store.hydrate(search_by_vector(self.vector_store, embedding, k=k, **kwargs))
+
+    def _select_relevance_score_fn(self):
+        return self.vector_store._select_relevance_score_fn()
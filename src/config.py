@@ -7,4 +7,103 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_ENV = os.getenv("PINECONE_ENV")
 VOYAGE_API_KEY = os.getenv("VOYAGE_API_KEY")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-PINECONE_INDEX_NAME = "medical-knowledge" 
\ No newline at end of file
+PINECONE_INDEX_NAME = "medical-knowledge"
+PINECONE_NAMESPACE = "medical_data"
+EMBEDDING_DIMENSION = 1536
+
+# Vector store backend: "pinecone" (serverless) or "local" (in-process NumPy index on disk)
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone")
+
+# Local state kept between runs (ingestion manifest, caches, local indexes)
+CACHE_DIR = os.getenv("OPTIMEDIX_CACHE_DIR", ".cache")
+INGESTION_MANIFEST_PATH = os.path.join(CACHE_DIR, "ingestion_manifest.sqlite3")
+
+# A confirmed Pinecone index is remembered this many seconds, so startup skips list_indexes()
+PINECONE_INDEX_CHECK_PATH = os.path.join(CACHE_DIR, "pinecone_index.json")
+PINECONE_INDEX_CHECK_TTL = float(os.getenv("PINECONE_INDEX_CHECK_TTL", "86400"))
+
+# Embedding cache: vectors for text already embedded are served from disk
+EMBEDDING_CACHE_PATH = os.path.join(CACHE_DIR, "embedding_cache.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+
+# PDF parsing: worker processes and how many files may be parsed but not yet consumed
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+INGEST_MAX_IN_FLIGHT = int(os.getenv("INGEST_MAX_IN_FLIGHT", "8"))
+
+# Bulk indexing: Voyage request limits and how many batches are embedded/upserted at once
+VOYAGE_MAX_BATCH_TEXTS = 128
+VOYAGE_MAX_BATCH_TOKENS = 120000
+INDEX_CONCURRENCY = int(os.getenv("INDEX_CONCURRENCY", "4"))
+INDEX_CHECKPOINT_PATH = os.path.join(CACHE_DIR, "index_checkpoint.txt")
+
+# Local vector index: "flat" (exact cosine) or "ivf" (clustered, for large corpora)
+LOCAL_INDEX_DIR = os.path.join(CACHE_DIR, "local_index")
+LOCAL_INDEX_TYPE = os.getenv("LOCAL_INDEX_TYPE", "flat")
+LOCAL_INDEX_NPROBE = int(os.getenv("LOCAL_INDEX_NPROBE", "8"))
+LOCAL_INDEX_QUANTIZE = os.getenv("LOCAL_INDEX_QUANTIZE", "false").lower() == "true"
+# Fraction of dead rows that triggers a compaction, and of rows added since the last IVF build that triggers a retrain
+LOCAL_INDEX_COMPACT_RATIO = float(os.getenv("LOCAL_INDEX_COMPACT_RATIO", "0.2"))
+LOCAL_INDEX_RETRAIN_RATIO = float(os.getenv("LOCAL_INDEX_RETRAIN_RATIO", "0.2"))
+
+# Chunk store: Pinecone vectors carry only IDs and small metadata; text is read from a local
+# memory-mapped file keyed by chunk ID
+CHUNK_STORE_ENABLED = os.getenv("CHUNK_STORE_ENABLED", "true").lower() == "true"
+CHUNK_STORE_DIR = os.path.join(CACHE_DIR, "chunk_store")
+# Fraction of the chunk text file left unreferenced by deletes and updates that triggers a compaction
+CHUNK_STORE_COMPACT_RATIO = float(os.getenv("CHUNK_STORE_COMPACT_RATIO", "0.3"))
+
+# Triage: symptom terms mapped to clarifying questions, asked before any retrieval
+TRIAGE_ENABLED = os.getenv("TRIAGE_ENABLED", "true").lower() == "true"
+TRIAGE_RULES_PATH = os.getenv(
+    "TRIAGE_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "triage_rules.json")
+)
+
+# Semantic answer cache: reuse answers to near-identical questions over the same context
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+# Concurrent serving: Gemini calls allowed in flight at once across all sessions
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+
+# Instrumentation: "none", "jsonl" (one trace per line) or "prometheus" (/metrics on METRICS_PORT)
+METRICS_SINK = os.getenv("METRICS_SINK", "none")
+METRICS_SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", "1.0"))
+METRICS_JSONL_PATH = os.getenv("METRICS_JSONL_PATH", os.path.join(CACHE_DIR, "traces.jsonl"))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0")) or None
+
+# Hybrid retrieval: BM25 over the same chunks, fused with vector search (reciprocal rank fusion).
+# Better precision from the fused ranking lets fewer chunks go into each prompt.
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+LEXICAL_INDEX_PATH = os.path.join(CACHE_DIR, "lexical_index.sqlite3")
+RETRIEVAL_K = int(os.getenv("RETRIEVAL_K", "6" if HYBRID_SEARCH_ENABLED else "8"))
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", "20"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+
+# Context packing: merge overlapping chunks, drop near-duplicates and cap the prompt context
+CONTEXT_PACKING_ENABLED = os.getenv("CONTEXT_PACKING_ENABLED", "true").lower() == "true"
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+CONTEXT_DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.85"))
+# Reranking: over-fetch candidates, rescore them locally and keep only those above the threshold.
+# RERANK_MODEL names a sentence-transformers cross-encoder; empty uses the lexical-overlap scorer.
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "30"))
+RERANK_THRESHOLD = float(os.getenv("RERANK_THRESHOLD", "0.3"))
+RERANK_MAX_K = int(os.getenv("RERANK_MAX_K", "6"))
+RERANK_MIN_K = int(os.getenv("RERANK_MIN_K", "2"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_LATENCY_BUDGET = float(os.getenv("RERANK_LATENCY_BUDGET", "0.15"))
+# Session memory: "sqlite" persists histories with running summaries, "memory" keeps the last 5 turns in process.
+# SESSION_SUMMARIZER "extractive" folds old turns without a model call; "llm" asks Gemini to rewrite the summary.
+SESSION_STORE_BACKEND = os.getenv("SESSION_STORE_BACKEND", "sqlite")
+SESSION_STORE_PATH = os.path.join(CACHE_DIR, "sessions.sqlite3")
+SESSION_HISTORY_TOKENS = int(os.getenv("SESSION_HISTORY_TOKENS", "1000"))
+SESSION_SUMMARY_TOKENS = int(os.getenv("SESSION_SUMMARY_TOKENS", "300"))
+SESSION_SUMMARIZER = os.getenv("SESSION_SUMMARIZER", "extractive")
+# Persisted sessions idle for longer than this are deleted (0 keeps them forever)
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(30 * 24 * 3600)))
+# Batch question answering: Gemini requests per minute across all workers (0 = unlimited)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "300"))
\ No newline at end of file
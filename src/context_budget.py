@@ -0,0 +1,126 @@
+from typing import Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from src.text_utils import estimate_tokens
+
+# Shortest shared run of characters treated as splitter overlap rather than coincidence
+MIN_OVERLAP_CHARS = 20
+
+
+def _overlap(left: str, right: str) -> int:
+    """
+    Length of the longest suffix of left that is also a prefix of right
+    """
+    for size in range(min(len(left), len(right)), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _merge_text(first: str, second: str) -> Optional[str]:
+    """
+    Join two chunks cut from the same page with chunk_overlap, or None if they do not touch
+    """
+    if second in first:
+        return first
+    if first in second:
+        return second
+    size = _overlap(first, second)
+    if size:
+        return first + second[size:]
+    size = _overlap(second, first)
+    if size:
+        return second + first[size:]
+    return None
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = text.lower().split()
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _containment(candidate: set, kept: set) -> float:
+    """
+    Share of the candidate's shingles already present in a kept piece
+    """
+    if not candidate:
+        return 0.0
+    return len(candidate & kept) / len(candidate)
+
+
+class ContextPacker:
+    """
+    Post-retrieval stage that shrinks the context sent to Gemini
+
+    Overlapping chunks from the same source and page are stitched back together,
+    pieces whose word shingles mostly appear in an already kept piece are dropped
+    as near-duplicates, and what is left is packed into max_tokens in retrieval
+    order, so the most relevant text is kept when the budget runs out.
+    """
+
+    def __init__(self, max_tokens: int = 1200, duplicate_threshold: float = 0.85):
+        self.max_tokens = max_tokens
+        self.duplicate_threshold = duplicate_threshold
+
+    def pack(self, documents: List[Document]) -> Tuple[List[Document], Dict[str, int]]:
+        """
+        Return the packed documents and a report of what was merged, dropped and saved
+        """
+        report = {
+            "chunks_in": len(documents),
+            "tokens_in": sum(estimate_tokens(doc.page_content) for doc in documents),
+            "merged": 0,
+            "duplicates": 0,
+            "over_budget": 0,
+        }
+
+        # Merge within each (source, page) group; a group ranks where its best chunk ranked
+        pieces: List[Dict] = []
+        for doc in documents:
+            group = (doc.metadata.get("source"), doc.metadata.get("page"))
+            text = doc.page_content
+            merged = False
+            for piece in pieces:
+                if piece["group"] != group:
+                    continue
+                joined = _merge_text(piece["text"], text)
+                if joined is not None:
+                    piece["text"] = joined
+                    piece["chunk_ids"].append(doc.metadata.get("chunk_id"))
+                    report["merged"] += 1
+                    merged = True
+                    break
+            if not merged:
+                pieces.append({"group": group, "text": text, "metadata": doc.metadata,
+                               "chunk_ids": [doc.metadata.get("chunk_id")]})
+
+        packed = []
+        kept_shingles = []
+        used = 0
+        for piece in pieces:
+            shingles = _shingles(piece["text"])
+            if any(_containment(shingles, other) >= self.duplicate_threshold for other in kept_shingles):
+                report["duplicates"] += 1
+                continue
+            tokens = estimate_tokens(piece["text"])
+            if used + tokens > self.max_tokens and packed:
+                # Smaller, less relevant pieces further down may still fit
+                report["over_budget"] += 1
+                continue
+            text = piece["text"]
+            if tokens > self.max_tokens:
+                # A single oversized first piece is trimmed rather than dropped
+                text = text[:self.max_tokens * 4]
+                tokens = estimate_tokens(text)
+            kept_shingles.append(shingles)
+            used += tokens
+            metadata = dict(piece["metadata"])
+            if len(piece["chunk_ids"]) > 1:
+                metadata["merged_chunk_ids"] = [chunk_id for chunk_id in piece["chunk_ids"] if chunk_id]
+            packed.append(Document(page_content=text, metadata=metadata))
+
+        report["chunks_out"] = len(packed)
+        report["tokens_out"] = used
+        report["tokens_saved"] = report["tokens_in"] - used
+        return packed, report
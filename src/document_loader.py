@@ -1,17 +1,69 @@
+import glob
+import multiprocessing
 import os
-from typing import List
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional
 from langchain_community.document_loaders import PyPDFLoader, DirectoryLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from src.config import INGESTION_MANIFEST_PATH, INGEST_WORKERS, INGEST_MAX_IN_FLIGHT
+from src.ingestion_manifest import IngestionManifest, hash_file, make_chunk_id
+from src.instrumentation import get_tracer
+from src.text_utils import hash_text
+
+# Pinecone accepts at most 1000 IDs per delete request
+DELETE_BATCH_SIZE = 1000
+
+# Workers are started from a clean process rather than forked: the app syncs from threads
+# (Streamlit, the KnowledgeBase job), and a fork can copy a lock another thread is holding
+PARSE_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+def build_text_splitter():
+    return RecursiveCharacterTextSplitter(
+        chunk_size=500,
+        chunk_overlap=100,
+        length_function=len,
+        separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""]
+    )
+
+def split_pdf(path: str, text_splitter) -> List:
+    """
+    Parse and split a single PDF, tagging each chunk with a deterministic ID
+    """
+    chunks = text_splitter.split_documents(PyPDFLoader(path).load())
+    occurrences = {}
+    for chunk in chunks:
+        chunk_hash = hash_text(chunk.page_content)
+        occurrence = occurrences.get(chunk_hash, 0)
+        occurrences[chunk_hash] = occurrence + 1
+        chunk.metadata["chunk_hash"] = chunk_hash
+        chunk.metadata["chunk_id"] = make_chunk_id(path, chunk_hash, occurrence)
+    return chunks
+
+def _parse_pdf_worker(path: str) -> Dict:
+    """
+    Process-pool entry point; errors are returned rather than raised so one bad PDF cannot fail the run
+    """
+    started = time.perf_counter()
+    try:
+        chunks = split_pdf(path, build_text_splitter())
+        error = None
+    except Exception as e:
+        chunks = []
+        error = f"{type(e).__name__}: {e}"
+    return {"path": path, "chunks": chunks, "seconds": time.perf_counter() - started, "error": error}
 
 class MedicalDocumentLoader:
-    def __init__(self, directory_path: str):
+    def __init__(self, directory_path: str, manifest_path: str = INGESTION_MANIFEST_PATH,
+                 max_workers: int = INGEST_WORKERS, max_in_flight: int = INGEST_MAX_IN_FLIGHT):
         self.directory_path = directory_path
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=500,
-            chunk_overlap=100,
-            length_function=len,
-            separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""]
-        )
+        self.manifest_path = manifest_path
+        self.max_workers = max_workers
+        self.max_in_flight = max_in_flight
+        self.text_splitter = build_text_splitter()
+        # One entry per parsed file: path, seconds, chunk count and error (None on success)
+        self.parse_report = []
 
     def load_documents(self) -> List:
         """
@@ -32,4 +84,352 @@ class MedicalDocumentLoader:
         if not documents:
             raise ValueError(f"No PDF documents found in {self.directory_path}")
             
-        return self.text_splitter.split_documents(documents) 
\ No newline at end of file
+        return self.text_splitter.split_documents(documents)
+
+    def list_pdf_files(self) -> List[str]:
+        """
+        Return the PDF paths under the directory, in a stable order
+        """
+        pattern = os.path.join(self.directory_path, "**", "*.pdf")
+        return sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+
+    def load_file(self, path: str) -> List:
+        """
+        Parse and split a single PDF, tagging each chunk with a deterministic ID
+        """
+        return split_pdf(path, self.text_splitter)
+
+    def corpus_version(self) -> str:
+        """
+        Fingerprint of the indexed corpus, for invalidating caches built on top of it
+        """
+        manifest = IngestionManifest(self.manifest_path)
+        try:
+            return manifest.corpus_version()
+        finally:
+            manifest.close()
+
+    def stream_documents(self, paths: Optional[List[str]] = None) -> Iterator[List]:
+        """
+        Parse PDFs in a process pool and yield each file's chunks as soon as it is ready
+
+        At most max_in_flight files are parsed or waiting to be consumed at any time,
+        so memory is bounded by that window rather than by the size of the corpus.
+        Files that fail to parse are recorded in parse_report and skipped.
+        """
+        for result in self._parse_files(paths if paths is not None else self.list_pdf_files()):
+            if result["chunks"]:
+                yield result["chunks"]
+
+    def _parse_files(self, paths: List[str]) -> Iterator[Dict]:
+        self.parse_report = []
+        if self.max_workers <= 1:
+            for path in paths:
+                yield self._record_parse(_parse_pdf_worker(path))
+            return
+
+        pending = iter(paths)
+        in_flight = set()
+        with ProcessPoolExecutor(max_workers=self.max_workers,
+                                 mp_context=multiprocessing.get_context(PARSE_START_METHOD)) as executor:
+            while True:
+                while len(in_flight) < max(self.max_in_flight, 1):
+                    path = next(pending, None)
+                    if path is None:
+                        break
+                    in_flight.add(executor.submit(_parse_pdf_worker, path))
+                if not in_flight:
+                    return
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield self._record_parse(future.result())
+
+    def _record_parse(self, result: Dict) -> Dict:
+        get_tracer().record_span("parse_pdf", result["seconds"], path=result["path"], chunks=len(result["chunks"]))
+        self.parse_report.append({
+            "path": result["path"],
+            "seconds": result["seconds"],
+            "chunks": len(result["chunks"]),
+            "error": result["error"],
+        })
+        return result
+
+    def sync(self, vector_store, manifest: IngestionManifest = None, indexer=None,
+             paths: Optional[List[str]] = None, lexical_index=None) -> Dict[str, int]:
+        """
+        Bring the vector store in line with the directory, touching only what changed
+
+        New or modified PDFs are parsed, embedded and upserted; chunks of deleted
+        PDFs are removed from the vector store. Unchanged files cost nothing.
+        Changed files are parsed in the process pool and upserted as each one finishes.
+        With a BulkIndexer, new chunks from all files are fed through its concurrent
+        embed/upsert pipeline instead of vector_store.add_documents; each file is
+        recorded in the manifest as soon as its last chunk is upserted, so memory stays
+        bounded by the parse window and an interrupted run keeps its progress.
+        Passing paths restricts the sync to those files (e.g. fresh uploads) and
+        skips the scan for deleted files.
+        A LexicalIndex is kept in step with the vector store; if it is empty while the
+        manifest is not (e.g. it was just introduced), every file is re-parsed once to
+        fill it, without re-embedding anything. The same goes for the chunk store of a
+        ChunkStoreVectorStore. If the vector store itself is empty, or is not the one the
+        manifest was recorded against, everything is re-embedded into it.
+        """
+        if not os.path.exists(self.directory_path):
+            os.makedirs(self.directory_path)
+            raise Warning(f"Created empty directory at {self.directory_path}. Please add PDF documents.")
+
+        own_manifest = manifest is None
+        if own_manifest:
+            manifest = IngestionManifest(self.manifest_path)
+
+        stats = {
+            "added": 0,
+            "updated": 0,
+            "removed": 0,
+            "unchanged": 0,
+            "failed": 0,
+            "chunks_upserted": 0,
+            "chunks_deleted": 0,
+        }
+        partial = paths is not None
+        tracer = get_tracer()
+        with tracer.request("ingest", directory=self.directory_path, partial=partial):
+            try:
+                if not partial:
+                    paths = self.list_pdf_files()
+                self._check_target(vector_store, manifest, lexical_index, indexer)
+                chunk_store = getattr(vector_store, "chunk_store", None)
+                rebuild = bool(manifest.paths()) and (
+                    (lexical_index is not None and len(lexical_index) == 0)
+                    or (chunk_store is not None and len(chunk_store) == 0)
+                )
+                changed = {}
+                for path in paths:
+                    pending = self._check_file(manifest, path, force=rebuild)
+                    if pending is None:
+                        stats["unchanged"] += 1
+                    else:
+                        changed[path] = pending
+
+                if indexer is None:
+                    for plan in self._plan_changes(manifest, changed, stats):
+                        self._store_chunks(vector_store, plan, lexical_index)
+                        if plan["fresh"]:
+                            with tracer.span("upsert", chunks=len(plan["fresh"])):
+                                vector_store.add_documents(
+                                    plan["fresh"], ids=[chunk.metadata["chunk_id"] for chunk in plan["fresh"]]
+                                )
+                        self._commit_file(vector_store, manifest, self._file_record(plan), stats, lexical_index)
+                else:
+                    self._bulk_index(vector_store, manifest, changed, stats, indexer, lexical_index)
+
+                if not partial:
+                    # Drop vectors belonging to files that no longer exist
+                    for path in set(manifest.paths()) - set(paths):
+                        stale_ids = manifest.chunk_ids(path)
+                        self._delete_vectors(vector_store, stale_ids, indexer)
+                        if lexical_index is not None:
+                            lexical_index.delete(stale_ids)
+                        # Only forgotten once deleted, so a failed delete is retried on the next sync
+                        manifest.remove_file(path)
+                        stats["removed"] += 1
+                        stats["chunks_deleted"] += len(stale_ids)
+
+                self._maintain(vector_store, stats)
+                if not partial and not paths:
+                    raise ValueError(f"No PDF documents found in {self.directory_path}")
+            finally:
+                for name, value in stats.items():
+                    tracer.count(name, value)
+                if own_manifest:
+                    manifest.close()
+
+        return stats
+
+    @staticmethod
+    def _check_target(vector_store, manifest: IngestionManifest, lexical_index=None, indexer=None):
+        """
+        Forget the manifest if it describes another vector store, or one that has since been emptied
+        """
+        identity = getattr(vector_store, "identity", None)
+        recorded = manifest.target()
+        store = getattr(vector_store, "vector_store", vector_store)
+        indexed = {path: manifest.chunk_ids(path) for path in manifest.paths()}
+        moved = identity is not None and recorded is not None and recorded != identity
+        emptied = hasattr(store, "__len__") and len(store) == 0 and any(indexed.values())
+        if indexed and (moved or emptied):
+            if lexical_index is not None:
+                # Rebuilt from the files that still exist, so removed ones don't linger in it
+                for ids in indexed.values():
+                    lexical_index.delete(ids)
+            checkpoint = getattr(indexer, "checkpoint", None)
+            if checkpoint is not None:
+                # Its upserts went to the other store
+                checkpoint.clear()
+            manifest.reset(identity)
+        elif identity is not None and recorded != identity:
+            manifest.set_target(identity)
+
+    @staticmethod
+    def _maintain(vector_store, stats: Dict[str, int]):
+        """
+        Let a store that supports it (e.g. LocalVectorStore) compact or retrain after a change
+        """
+        maintain = getattr(vector_store, "maintain", None)
+        if maintain is None or not (stats["chunks_upserted"] or stats["chunks_deleted"]):
+            return
+        with get_tracer().span("maintain"):
+            maintain()
+
+    @staticmethod
+    def _check_file(manifest: IngestionManifest, path: str, force: bool = False) -> Optional[Dict]:
+        """
+        Return what is needed to re-index a file, or None if it is unchanged (unless force)
+        """
+        stat = os.stat(path)
+        record = manifest.get_file(path)
+
+        # Same size and mtime as last time: trust the recorded hash and skip reading the file
+        if not force and record and record["mtime"] == stat.st_mtime and record["size"] == stat.st_size:
+            return None
+
+        content_hash = hash_file(path)
+        if not force and record and record["content_hash"] == content_hash:
+            manifest.touch_file(path, stat.st_mtime, stat.st_size)
+            return None
+
+        return {"record": record, "content_hash": content_hash, "mtime": stat.st_mtime, "size": stat.st_size}
+
+    def _plan_changes(self, manifest: IngestionManifest, changed: Dict[str, Dict],
+                      stats: Dict[str, int]) -> Iterator[Dict]:
+        """
+        Parse changed files and work out which chunks to upsert and which to delete
+        """
+        for result in self._parse_files(list(changed)):
+            if result["error"]:
+                # Left out of the manifest so the next sync retries it
+                stats["failed"] += 1
+                continue
+            path = result["path"]
+            chunks = result["chunks"]
+            pending = changed[path]
+            old_ids = set(manifest.chunk_ids(path)) if pending["record"] else set()
+            new_ids = {chunk.metadata["chunk_id"] for chunk in chunks}
+            # Chunks whose text did not move keep their ID and are not re-embedded
+            yield {
+                "path": path,
+                "chunks": chunks,
+                "pending": pending,
+                "fresh": [chunk for chunk in chunks if chunk.metadata["chunk_id"] not in old_ids],
+                "stale_ids": list(old_ids - new_ids),
+            }
+
+    def _bulk_index(self, vector_store, manifest: IngestionManifest, changed: Dict[str, Dict],
+                    stats: Dict[str, int], indexer, lexical_index=None):
+        """
+        Feed fresh chunks through the BulkIndexer, committing each file once all of its chunks are upserted
+
+        Only the manifest record (IDs and hashes) of a file waiting on the pipeline is
+        kept; its chunks are released as soon as they are handed to the indexer.
+        """
+        waiting = {}
+        remaining = {}
+        owner = {}
+        ready = []
+        lock = threading.Lock()
+
+        def on_indexed(ids: List[str]):
+            # Called from the indexer's upsert workers
+            with lock:
+                for chunk_id in ids:
+                    path = owner.pop(chunk_id, None)
+                    if path is None:
+                        continue
+                    remaining[path].discard(chunk_id)
+                    if not remaining[path]:
+                        del remaining[path]
+                        ready.append(path)
+
+        def commit_ready():
+            with lock:
+                paths = ready[:]
+                del ready[:]
+            for path in paths:
+                self._commit_file(vector_store, manifest, waiting.pop(path), stats, lexical_index, indexer)
+
+        def fresh_chunks():
+            for plan in self._plan_changes(manifest, changed, stats):
+                self._store_chunks(vector_store, plan, lexical_index)
+                path = plan["path"]
+                waiting[path] = self._file_record(plan)
+                with lock:
+                    if plan["fresh"]:
+                        remaining[path] = {chunk.metadata["chunk_id"] for chunk in plan["fresh"]}
+                        owner.update((chunk_id, path) for chunk_id in remaining[path])
+                    else:
+                        ready.append(path)
+                commit_ready()
+                yield from plan["fresh"]
+
+        try:
+            with get_tracer().span("bulk_index"):
+                indexer.index_documents(fresh_chunks(), on_indexed=on_indexed)
+        finally:
+            # Files completed before a failure are kept
+            commit_ready()
+
+    @staticmethod
+    def _store_chunks(vector_store, plan: Dict, lexical_index=None):
+        """
+        Put a file's chunks in the local stores that sit beside the vectors
+        """
+        chunk_store = getattr(vector_store, "chunk_store", None)
+        if chunk_store is not None:
+            # Fresh chunks are stored again before their upsert; this backfills the unchanged ones
+            chunk_store.add_documents(plan["chunks"])
+        if lexical_index is not None:
+            # Indexing every chunk of the file (not only fresh ones) also backfills a new index
+            with get_tracer().span("lexical_index", chunks=len(plan["chunks"])):
+                lexical_index.add_documents(plan["chunks"])
+
+    @staticmethod
+    def _file_record(plan: Dict) -> Dict:
+        """
+        What _commit_file needs from a plan, without the chunks themselves
+        """
+        return {
+            "path": plan["path"],
+            "pending": plan["pending"],
+            "chunks": [(chunk.metadata["chunk_id"], index, chunk.metadata["chunk_hash"])
+                       for index, chunk in enumerate(plan["chunks"])],
+            "fresh": len(plan["fresh"]),
+            "stale_ids": plan["stale_ids"],
+        }
+
+    def _commit_file(self, vector_store, manifest: IngestionManifest, record: Dict, stats: Dict[str, int],
+                     lexical_index=None, indexer=None):
+        """
+        Remove a file's stale vectors and record it in the manifest once its new chunks are stored
+        """
+        pending = record["pending"]
+        self._delete_vectors(vector_store, record["stale_ids"], indexer)
+        if lexical_index is not None:
+            lexical_index.delete(record["stale_ids"])
+        manifest.record_file(record["path"], pending["content_hash"], pending["mtime"], pending["size"],
+                             record["chunks"])
+
+        stats["updated" if pending["record"] else "added"] += 1
+        stats["chunks_upserted"] += record["fresh"]
+        stats["chunks_deleted"] += len(record["stale_ids"])
+
+    @staticmethod
+    def _delete_vectors(vector_store, ids: List[str], indexer=None):
+        if not ids:
+            return
+        checkpoint = getattr(indexer, "checkpoint", None)
+        if checkpoint is not None:
+            # A deleted chunk that comes back later must be upserted again
+            checkpoint.discard(ids)
+        with get_tracer().span("delete", chunks=len(ids)):
+            for start in range(0, len(ids), DELETE_BATCH_SIZE):
+                vector_store.delete(ids=ids[start:start + DELETE_BATCH_SIZE])
\ No newline at end of file
@@ -0,0 +1,209 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+from langchain_core.embeddings import Embeddings
+from src.instrumentation import get_tracer
+
+
+def normalize_text(text: str) -> str:
+    """
+    Collapse whitespace so trivially different copies of a text share a cache entry
+    """
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """
+    Size-bounded SQLite store of float32 vectors with least-recently-used eviction
+
+    The entry count is read once on open and kept up to date in memory, so writes
+    do not count the table. Hits are collected and their last_used times written
+    touch_batch_size at a time (and before any eviction), not on every lookup.
+    """
+
+    def __init__(self, path: str, max_entries: int = 500000, touch_batch_size: int = 256):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_batch_size = touch_batch_size
+        self.hits = 0
+        self.misses = 0
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS embeddings_by_last_used ON embeddings (last_used);
+            """
+        )
+        self.conn.commit()
+        self._count = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, kind: str, text: str) -> str:
+        payload = f"{model}\x00{kind}\x00{normalize_text(text)}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """
+        Return the cached vectors for whichever keys are present
+        """
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique_keys), 500):
+                batch = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+            if found:
+                now = time.time()
+                self._touched.update((key, now) for key in found)
+                if len(self._touched) >= self.touch_batch_size:
+                    with self.conn:
+                        self._flush_touched()
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        now = time.time()
+        with self._lock, self.conn:
+            # A key already present keeps its vector (same model, same text) and is only touched
+            inserted = self.conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+            ).rowcount
+            self._count += inserted
+            if inserted < len(items):
+                self._touched.update((key, now) for key in items)
+            if self._count > self.max_entries:
+                self._evict()
+
+    def _flush_touched(self):
+        if self._touched:
+            self.conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(last_used, key) for key, last_used in self._touched.items()]
+            )
+            self._touched = {}
+
+    def _evict(self):
+        # Recency must be current before choosing what to drop
+        self._flush_touched()
+        deleted = self.conn.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (self._count - self.max_entries,)
+        ).rowcount
+        self._count -= deleted
+
+    def __len__(self) -> int:
+        return self._count
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self),
+        }
+
+    def close(self):
+        with self._lock:
+            with self.conn:
+                self._flush_touched()
+            self.conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain embeddings wrapper that only sends unseen texts to the underlying model
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_name: Optional[str] = None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name or getattr(embeddings, "model", type(embeddings).__name__)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.cache.make_key(self.model_name, "document", text) for text in texts]
+        found = self.cache.get_many(keys)
+        hits = sum(1 for key in keys if key in found)
+        tracer = get_tracer()
+        tracer.count("embedding_cache_hits", hits)
+        tracer.count("embedding_cache_misses", len(keys) - hits)
+
+        # Embed each missing text once, even if it appears several times in the batch
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Batched embed_query(): cached queries are served locally, the rest go out together
+        """
+        keys = [self.cache.make_key(self.model_name, "query", text) for text in texts]
+        found = self.cache.get_many(keys)
+        hits = sum(1 for key in keys if key in found)
+        tracer = get_tracer()
+        tracer.count("embedding_cache_hits", hits)
+        tracer.count("embedding_cache_misses", len(keys) - hits)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            batched = getattr(self.embeddings, "embed_queries", None)
+            texts_to_embed = list(missing.values())
+            if batched is not None:
+                vectors = batched(texts_to_embed)
+            else:
+                vectors = [self.embeddings.embed_query(text) for text in texts_to_embed]
+            computed = dict(zip(missing.keys(), vectors))
+            self.cache.put_many(computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self.cache.make_key(self.model_name, "query", text)
+        found = self.cache.get_many([key])
+        tracer = get_tracer()
+        if key in found:
+            tracer.count("embedding_cache_hits")
+            return found[key]
+        tracer.count("embedding_cache_misses")
+        vector = self.embeddings.embed_query(text)
+        self.cache.put_many({key: vector})
+        return vector
\ No newline at end of file
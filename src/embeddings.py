@@ -1,14 +1,113 @@
-from voyageai import Client
-from langchain_voyageai import VoyageAIEmbeddings
-from src.config import VOYAGE_API_KEY
+import sys
+import threading
+from typing import Callable, List
+from langchain_core.embeddings import Embeddings
+from src.config import VOYAGE_API_KEY, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES, VOYAGE_MAX_BATCH_TEXTS
+from src.embedding_cache import CachedEmbeddings, EmbeddingCache
+from src.text_utils import estimate_tokens
+from src.instrumentation import get_tracer
 
-def get_medical_embeddings():
+EMBEDDING_MODEL = "voyage-large-2"
+
+class LazyEmbeddings(Embeddings):
+    """
+    Builds the wrapped embeddings client on first use rather than at startup
+    """
+
+    def __init__(self, factory: Callable[[], Embeddings], model: str):
+        self._factory = factory
+        self._embeddings = None
+        self._lock = threading.Lock()
+        self.model = model
+
+    @property
+    def embeddings(self) -> Embeddings:
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    self._embeddings = self._factory()
+        return self._embeddings
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return embed_queries(self.embeddings, texts)
+
+class TracedEmbeddings(Embeddings):
+    """
+    Records a span and estimated token count for every call that reaches the embedding API
+    """
+
+    def __init__(self, embeddings: Embeddings, name: str = "voyage"):
+        self.embeddings = embeddings
+        self.name = name
+        self.model = getattr(embeddings, "model", name)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        tracer = get_tracer()
+        tokens = sum(estimate_tokens(text) for text in texts)
+        tracer.count("embedding_tokens", tokens)
+        with tracer.span(f"{self.name}.embed_documents", texts=len(texts), tokens=tokens):
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        tracer = get_tracer()
+        tracer.count("embedding_tokens", estimate_tokens(text))
+        with tracer.span(f"{self.name}.embed_query"):
+            return self.embeddings.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        tracer = get_tracer()
+        tokens = sum(estimate_tokens(text) for text in texts)
+        tracer.count("embedding_tokens", tokens)
+        with tracer.span(f"{self.name}.embed_queries", texts=len(texts), tokens=tokens):
+            return embed_queries(self.embeddings, texts)
+
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """
+    Embed many search queries, in as few requests as the model allows
+
+    LangChain only has a single-query method; for Voyage the queries are sent in
+    batches of VOYAGE_MAX_BATCH_TEXTS with input_type="query" instead.
+    """
+    batched = getattr(embeddings, "embed_queries", None)
+    if batched is not None:
+        return batched(texts)
+    # Only a Voyage model can be a VoyageAIEmbeddings, and building one imports the module
+    voyage = sys.modules.get("langchain_voyageai")
+    if voyage is not None and isinstance(embeddings, voyage.VoyageAIEmbeddings):
+        from voyageai import Client
+        client = Client(api_key=VOYAGE_API_KEY)
+        vectors = []
+        for start in range(0, len(texts), VOYAGE_MAX_BATCH_TEXTS):
+            vectors.extend(client.embed(
+                texts[start:start + VOYAGE_MAX_BATCH_TEXTS], model=embeddings.model, input_type="query"
+            ).embeddings)
+        return vectors
+    return [embeddings.embed_query(text) for text in texts]
+
+def get_medical_embeddings(use_cache: bool = True):
     """
     Initialize Voyage AI embeddings model specifically trained on medical data
+
+    With use_cache, texts and queries embedded before are served from the local
+    embedding cache instead of calling Voyage again. The Voyage client itself is
+    only created on the first call that reaches it.
     """
-    embeddings = VoyageAIEmbeddings(
+    embeddings = TracedEmbeddings(LazyEmbeddings(_build_voyage_embeddings, EMBEDDING_MODEL))
+    if not use_cache:
+        return embeddings
+    cache = EmbeddingCache(EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES)
+    return CachedEmbeddings(embeddings, cache, model_name=EMBEDDING_MODEL)
+
+def _build_voyage_embeddings():
+    from langchain_voyageai import VoyageAIEmbeddings
+    return VoyageAIEmbeddings(
         voyage_api_key=VOYAGE_API_KEY,
-        model="voyage-large-2",
+        model=EMBEDDING_MODEL,
         show_progress_bar=True
-    )
-    return embeddings 
\ No newline at end of file
+    )
\ No newline at end of file
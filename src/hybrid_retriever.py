@@ -0,0 +1,116 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStoreRetriever
+from src.config import RETRIEVAL_K, HYBRID_FETCH_K, HYBRID_RRF_K, RERANK_ENABLED, RERANK_CANDIDATES
+from src.text_utils import hash_text
+from src.instrumentation import get_tracer
+
+# Lexical searches are local SQLite reads, so a few threads serve every session
+_lexical_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lexical-search")
+
+
+def _document_key(doc: Document) -> str:
+    return doc.metadata.get("chunk_id") or hash_text(doc.page_content)
+
+
+def search_by_vector(vector_store, embedding: List[float], k: int, **kwargs) -> List[Document]:
+    """
+    Vector search with a query embedding computed elsewhere, e.g. in a batched embedding call
+    """
+    # LangChain's Pinecone wrapper implements only the scored variant
+    if hasattr(vector_store, "similarity_search_by_vector_with_score"):
+        return [doc for doc, _ in vector_store.similarity_search_by_vector_with_score(embedding, k=k, **kwargs)]
+    return vector_store.similarity_search_by_vector(embedding, k=k, **kwargs)
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int, rrf_k: int = 60) -> List[Document]:
+    """
+    Merge ranked lists by summing 1 / (rrf_k + rank); a chunk found by both searches rises to the top
+    """
+    scores: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = _document_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            # Prefer the vector store's copy, which carries the stored metadata
+            documents.setdefault(key, doc)
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [documents[key] for key in best]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Dense + BM25 retrieval fused with reciprocal rank fusion
+
+    The vector store and the lexical index are each asked for fetch_k candidates
+    in parallel; the fused top k is returned. Exact terms such as drug names and
+    ICD codes that the embeddings miss are still found by the lexical side.
+    """
+
+    vector_store: Any
+    lexical_index: Any
+    k: int = RETRIEVAL_K
+    fetch_k: int = HYBRID_FETCH_K
+    rrf_k: int = HYBRID_RRF_K
+
+    def _lexical_search(self, query: str) -> List[Document]:
+        with get_tracer().span("lexical_search"):
+            return [doc for doc, _ in self.lexical_index.search(query, k=self.fetch_k)]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.retrieve_by_vector(query, None)
+
+    def retrieve_by_vector(self, query: str, embedding: List[float] = None) -> List[Document]:
+        """
+        Hybrid retrieval reusing an already computed query embedding when one is given
+        """
+        context = contextvars.copy_context()
+        lexical = _lexical_pool.submit(context.run, self._lexical_search, query)
+        with get_tracer().span("vector_search"):
+            if embedding is None:
+                dense = self.vector_store.similarity_search(query, k=self.fetch_k)
+            else:
+                dense = search_by_vector(self.vector_store, embedding, k=self.fetch_k)
+        return reciprocal_rank_fusion([dense, lexical.result()], self.k, self.rrf_k)
+
+    async def _aget_relevant_documents(self, query: str, *,
+                                       run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        dense, lexical = await asyncio.gather(
+            self.vector_store.asimilarity_search(query, k=self.fetch_k),
+            loop.run_in_executor(_lexical_pool, context.run, self._lexical_search, query),
+        )
+        return reciprocal_rank_fusion([dense, lexical], self.k, self.rrf_k)
+
+
+def build_retriever(vector_store, lexical_index=None, k: int = None) -> BaseRetriever:
+    """
+    Hybrid retriever when a lexical index is available, plain vector search otherwise
+
+    With reranking enabled, k defaults to RERANK_CANDIDATES so the reranker has
+    enough candidates to choose from.
+    """
+    if k is None:
+        k = RERANK_CANDIDATES if RERANK_ENABLED else RETRIEVAL_K
+    if lexical_index is None:
+        return vector_store.as_retriever(search_kwargs={"k": k})
+    return HybridRetriever(vector_store=vector_store, lexical_index=lexical_index, k=k,
+                           fetch_k=max(HYBRID_FETCH_K, k))
+
+
+def retrieve_with_vector(retriever: BaseRetriever, query: str, embedding: List[float]) -> List[Document]:
+    """
+    Run a retriever without embedding the query again, where the retriever allows it
+    """
+    if isinstance(retriever, HybridRetriever):
+        return retriever.retrieve_by_vector(query, embedding)
+    if isinstance(retriever, VectorStoreRetriever) and retriever.search_type == "similarity":
+        return search_by_vector(retriever.vectorstore, embedding, **retriever.search_kwargs)
+    return retriever.invoke(query)
@@ -0,0 +1,232 @@
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from src.config import (
+    PINECONE_NAMESPACE,
+    VOYAGE_MAX_BATCH_TEXTS,
+    VOYAGE_MAX_BATCH_TOKENS,
+    INDEX_CONCURRENCY,
+)
+from src.chunk_store import slim_metadata
+from src.text_utils import estimate_tokens, hash_text
+from src.retry import call_with_retries
+
+# Pinecone recommends upserts of at most ~100 vectors per request
+UPSERT_BATCH_SIZE = 100
+
+_DONE = object()
+
+
+def chunk_id(chunk) -> str:
+    return chunk.metadata.get("chunk_id") or hash_text(chunk.page_content)[:32]
+
+
+def batch_chunks(chunks: Iterable, max_texts: int = VOYAGE_MAX_BATCH_TEXTS,
+                 max_tokens: int = VOYAGE_MAX_BATCH_TOKENS) -> Iterator[List]:
+    """
+    Group chunks into batches that respect both the per-request text and token limits
+    """
+    batch = []
+    batch_tokens = 0
+    for chunk in chunks:
+        tokens = estimate_tokens(chunk.page_content)
+        if batch and (len(batch) >= max_texts or batch_tokens + tokens > max_tokens):
+            yield batch
+            batch = []
+            batch_tokens = 0
+        batch.append(chunk)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+class IndexCheckpoint:
+    """
+    Append-only file of chunk IDs that are already upserted, so an interrupted run can resume
+
+    It only describes the run in progress: BulkIndexer clears it once a run completes,
+    and IDs whose vectors are deleted meanwhile are discarded (written as "-<id>").
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith("-"):
+                        self.done.discard(line[1:])
+                    elif line:
+                        self.done.add(line)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def mark(self, ids: List[str]):
+        with self._lock:
+            self._file.write("".join(f"{i}\n" for i in ids))
+            self._file.flush()
+            self.done.update(ids)
+
+    def discard(self, ids: List[str]):
+        """
+        Forget IDs whose vectors were deleted, so they are upserted again if they come back
+        """
+        with self._lock:
+            gone = [i for i in ids if i in self.done]
+            if gone:
+                self._file.write("".join(f"-{i}\n" for i in gone))
+                self._file.flush()
+                self.done.difference_update(gone)
+
+    def clear(self):
+        with self._lock:
+            self._file.close()
+            self._file = open(self.path, "w", encoding="utf-8")
+            self.done = set()
+
+    def close(self):
+        self._file.close()
+
+
+class BulkIndexer:
+    """
+    Pipelined ingestion: token-aware batches are embedded and upserted concurrently
+
+    Batches flow through two bounded queues (to embed, to upsert), so a slow stage
+    applies backpressure instead of letting work pile up in memory.
+    With a ChunkStore, each batch's text and metadata are written there before its
+    vectors are upserted with only IDs and small metadata.
+    """
+
+    def __init__(self, embeddings, index, namespace: str = PINECONE_NAMESPACE,
+                 concurrency: int = INDEX_CONCURRENCY, checkpoint: Optional[IndexCheckpoint] = None,
+                 text_key: str = "text", max_retries: int = 5, chunk_store=None):
+        self.embeddings = embeddings
+        self.index = index
+        self.namespace = namespace
+        self.concurrency = max(concurrency, 1)
+        self.checkpoint = checkpoint
+        self.text_key = text_key
+        self.max_retries = max_retries
+        self.chunk_store = chunk_store
+        self.last_stats = None
+
+    def index_documents(self, chunks: Iterable, on_indexed: Optional[Callable[[List[str]], None]] = None) -> Dict[str, float]:
+        """
+        Embed and upsert chunks, returning throughput statistics
+
+        on_indexed, if given, is called with the IDs of every upserted batch (from the
+        upsert workers) and of chunks skipped because the checkpoint already has them.
+        """
+        started = time.perf_counter()
+        stats = {"chunks": 0, "batches": 0, "skipped": 0}
+        stats_lock = threading.Lock()
+        errors = []
+        embed_queue = queue.Queue(maxsize=self.concurrency * 2)
+        upsert_queue = queue.Queue(maxsize=self.concurrency * 2)
+
+        def embed_worker():
+            while True:
+                batch = embed_queue.get()
+                if batch is _DONE:
+                    return
+                if errors:
+                    continue
+                try:
+                    vectors = call_with_retries(
+                        self.embeddings.embed_documents,
+                        [chunk.page_content for chunk in batch],
+                        max_retries=self.max_retries
+                    )
+                    upsert_queue.put((batch, vectors))
+                except Exception as e:
+                    errors.append(e)
+
+        def upsert_worker():
+            while True:
+                item = upsert_queue.get()
+                if item is _DONE:
+                    return
+                if errors:
+                    continue
+                batch, vectors = item
+                try:
+                    self._upsert(batch, vectors)
+                    with stats_lock:
+                        stats["chunks"] += len(batch)
+                        stats["batches"] += 1
+                    if on_indexed is not None:
+                        on_indexed([chunk_id(chunk) for chunk in batch])
+                except Exception as e:
+                    errors.append(e)
+
+        embedders = [threading.Thread(target=embed_worker, daemon=True) for _ in range(self.concurrency)]
+        upserters = [threading.Thread(target=upsert_worker, daemon=True) for _ in range(self.concurrency)]
+        for worker in embedders + upserters:
+            worker.start()
+
+        try:
+            for batch in batch_chunks(self._pending(chunks, stats, on_indexed)):
+                if errors:
+                    break
+                # Blocks while the embedders are saturated
+                embed_queue.put(batch)
+        finally:
+            for _ in embedders:
+                embed_queue.put(_DONE)
+            for worker in embedders:
+                worker.join()
+            for _ in upserters:
+                upsert_queue.put(_DONE)
+            for worker in upserters:
+                worker.join()
+
+        if errors:
+            raise errors[0]
+        if self.checkpoint is not None:
+            # Everything is upserted; a later run must not skip chunks on the strength of this one
+            self.checkpoint.clear()
+
+        elapsed = time.perf_counter() - started
+        stats["seconds"] = elapsed
+        stats["chunks_per_sec"] = stats["chunks"] / elapsed if elapsed > 0 else 0.0
+        self.last_stats = stats
+        return stats
+
+    def _pending(self, chunks: Iterable, stats: Dict, on_indexed=None) -> Iterator:
+        for chunk in chunks:
+            if self.checkpoint is not None and chunk_id(chunk) in self.checkpoint.done:
+                stats["skipped"] += 1
+                if on_indexed is not None:
+                    on_indexed([chunk_id(chunk)])
+                continue
+            yield chunk
+
+    def _upsert(self, batch: List, vectors: List[List[float]]):
+        records = []
+        if self.chunk_store is not None:
+            self.chunk_store.add_documents(batch, ids=[chunk_id(chunk) for chunk in batch])
+        for chunk, vector in zip(batch, vectors):
+            if self.chunk_store is None:
+                metadata = dict(chunk.metadata)
+                metadata[self.text_key] = chunk.page_content
+            else:
+                # The text key stays (empty) so LangChain's Pinecone wrapper still returns the match
+                metadata = slim_metadata(chunk.metadata)
+                metadata[self.text_key] = ""
+            records.append((chunk_id(chunk), vector, metadata))
+        for start in range(0, len(records), UPSERT_BATCH_SIZE):
+            call_with_retries(
+                self.index.upsert,
+                vectors=records[start:start + UPSERT_BATCH_SIZE],
+                namespace=self.namespace,
+                max_retries=self.max_retries
+            )
+        if self.checkpoint is not None:
+            self.checkpoint.mark([record[0] for record in records])
\ No newline at end of file
@@ -0,0 +1,159 @@
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+def hash_file(path: str, block_size: int = 1 << 20) -> str:
+    """
+    Return the SHA-256 of a file's contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_chunk_id(source: str, chunk_hash: str, occurrence: int = 0) -> str:
+    """
+    Build a deterministic vector ID so re-upserting the same chunk is idempotent
+
+    The ID depends on the chunk's text, not its position, so an edit near the top
+    of a file does not change the IDs of the chunks after it. occurrence tells
+    apart identical chunks within the same file.
+    """
+    key = f"{source}:{chunk_hash}:{occurrence}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+class IngestionManifest:
+    """
+    SQLite record of which files and chunks are already in the vector store
+
+    The manifest also records which store it describes (its target), so a sync
+    into a different or recreated store can tell that nothing is in it yet.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL,
+                chunk_count INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                chunk_hash TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS chunks_by_path ON chunks (path);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self.conn.commit()
+
+    def get_file(self, path: str) -> Optional[Dict]:
+        row = self.conn.execute(
+            "SELECT content_hash, mtime, size, chunk_count FROM files WHERE path = ?",
+            (path,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"content_hash": row[0], "mtime": row[1], "size": row[2], "chunk_count": row[3]}
+
+    def paths(self) -> List[str]:
+        return [row[0] for row in self.conn.execute("SELECT path FROM files ORDER BY path")]
+
+    def chunk_ids(self, path: str) -> List[str]:
+        return [
+            row[0] for row in self.conn.execute(
+                "SELECT chunk_id FROM chunks WHERE path = ? ORDER BY chunk_index", (path,)
+            )
+        ]
+
+    def touch_file(self, path: str, mtime: float, size: int):
+        """
+        Refresh the stat fields of a file whose contents did not change
+        """
+        with self.conn:
+            self.conn.execute(
+                "UPDATE files SET mtime = ?, size = ? WHERE path = ?", (mtime, size, path)
+            )
+
+    def record_file(self, path: str, content_hash: str, mtime: float, size: int,
+                    chunks: List[Tuple[str, int, str]]):
+        """
+        Replace the manifest entry for a file with its current chunks
+
+        chunks is a list of (chunk_id, chunk_index, chunk_hash)
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM chunks WHERE path = ?", (path,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO chunks (chunk_id, path, chunk_index, chunk_hash) VALUES (?, ?, ?, ?)",
+                [(chunk_id, path, index, chunk_hash) for chunk_id, index, chunk_hash in chunks]
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (path, content_hash, mtime, size, chunk_count, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (path, content_hash, mtime, size, len(chunks), time.time())
+            )
+
+    def remove_file(self, path: str):
+        """
+        Drop a file from the manifest; call only once its vectors are deleted
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM chunks WHERE path = ?", (path,))
+            self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def target(self) -> Optional[str]:
+        """
+        Identity of the vector store the manifest describes, or None if not yet recorded
+        """
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'target'").fetchone()
+        return row[0] if row else None
+
+    def set_target(self, target: str):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('target', ?)", (target,))
+
+    def reset(self, target: Optional[str] = None):
+        """
+        Forget every file, e.g. once the vector store they were indexed into is gone
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM chunks")
+            self.conn.execute("DELETE FROM files")
+            self.conn.execute("DELETE FROM meta WHERE key = 'target'")
+            if target is not None:
+                self.conn.execute("INSERT INTO meta (key, value) VALUES ('target', ?)", (target,))
+
+    def corpus_version(self) -> str:
+        """
+        Hash of every indexed file's content hash; changes whenever the corpus does
+        """
+        digest = hashlib.sha256()
+        for path, content_hash in self.conn.execute(
+            "SELECT path, content_hash FROM files ORDER BY path"
+        ):
+            digest.update(f"{path}:{content_hash}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    def close(self):
+        self.conn.close()
\ No newline at end of file
@@ -0,0 +1,254 @@
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from src.config import METRICS_SINK, METRICS_SAMPLE_RATE, METRICS_JSONL_PATH, METRICS_PORT
+
+_current_trace = ContextVar("optimedix_trace", default=None)
+
+# Upper bounds (seconds) of the Prometheus latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Trace:
+    """
+    Timing spans, attributes and counters collected for one request
+    """
+
+    def __init__(self, name: str, attributes: Dict):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+        self.attributes = dict(attributes)
+        self.counters = {}
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, started: float, duration: float, attributes: Dict):
+        with self._lock:
+            self.spans.append({
+                "name": name,
+                "offset": started - self._started,
+                "duration": duration,
+                "attributes": attributes,
+            })
+
+    def count(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "counters": self.counters,
+            "spans": self.spans,
+        }
+
+
+class NullSink:
+    def export(self, trace: Dict):
+        pass
+
+
+class JsonlSink:
+    """
+    Append each finished trace to a JSON-lines file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, trace: Dict):
+        line = json.dumps(trace, default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+class PrometheusSink:
+    """
+    Aggregate traces into latency histograms and counters in Prometheus text format
+    """
+
+    def __init__(self, prefix: str = "optimedix"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def export(self, trace: Dict):
+        with self._lock:
+            self._observe(trace["name"], trace["duration"])
+            for span in trace["spans"]:
+                self._observe(span["name"], span["duration"])
+            self._counters[("requests", trace["name"])] = self._counters.get(("requests", trace["name"]), 0) + 1
+            for name, value in trace["counters"].items():
+                self._counters[(name, trace["name"])] = self._counters.get((name, trace["name"]), 0) + value
+
+    def _observe(self, name: str, seconds: float):
+        histogram = self._histograms.setdefault(name, {"buckets": [0] * len(LATENCY_BUCKETS), "count": 0, "sum": 0.0})
+        histogram["count"] += 1
+        histogram["sum"] += seconds
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.prefix}_span_seconds Duration of sampled requests and their stages",
+            f"# TYPE {self.prefix}_span_seconds histogram",
+        ]
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                for bound, count in zip(LATENCY_BUCKETS, histogram["buckets"]):
+                    lines.append(f'{self.prefix}_span_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+                lines.append(f'{self.prefix}_span_seconds_bucket{{span="{name}",le="+Inf"}} {histogram["count"]}')
+                lines.append(f'{self.prefix}_span_seconds_count{{span="{name}"}} {histogram["count"]}')
+                lines.append(f'{self.prefix}_span_seconds_sum{{span="{name}"}} {histogram["sum"]}')
+            lines.append(f"# TYPE {self.prefix}_events_total counter")
+            for (name, request), value in sorted(self._counters.items()):
+                lines.append(f'{self.prefix}_events_total{{event="{name}",request="{request}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """
+        Expose render() at /metrics from a background thread
+        """
+        sink = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = sink.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+        return server
+
+
+class Tracer:
+    """
+    Entry point for instrumentation: request() opens a sampled trace, span() times a stage
+
+    Spans, counters and attributes attach to the request active in the current
+    context, so embeddings and vector store calls made on behalf of a chat() land
+    in the same trace. Outside a sampled request they cost one context lookup.
+    """
+
+    def __init__(self, sink=None, sample_rate: float = 1.0):
+        self.sink = sink or NullSink()
+        self.sample_rate = sample_rate
+
+    @contextmanager
+    def request(self, name: str, **attributes):
+        if _current_trace.get() is not None or random.random() >= self.sample_rate:
+            # Nested requests fold into the outer trace; unsampled ones record nothing
+            yield _current_trace.get()
+            return
+        trace = Trace(name, attributes)
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        except Exception as e:
+            trace.attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_trace.reset(token)
+            trace.duration = time.perf_counter() - trace._started
+            self.sink.export(trace.to_dict())
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        trace = _current_trace.get()
+        if trace is None:
+            yield attributes
+            return
+        started = time.perf_counter()
+        try:
+            yield attributes
+        finally:
+            trace.add_span(name, started, time.perf_counter() - started, attributes)
+
+    def record_span(self, name: str, duration: float, **attributes):
+        """
+        Record a span timed elsewhere, e.g. in a worker process
+        """
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(name, time.perf_counter() - duration, duration, attributes)
+
+    def count(self, name: str, value: float = 1):
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.count(name, value)
+
+    def set_attribute(self, name: str, value):
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.attributes[name] = value
+
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def build_sink(kind: str, jsonl_path: str = None, port: Optional[int] = None):
+    if kind == "jsonl":
+        return JsonlSink(jsonl_path)
+    if kind == "prometheus":
+        sink = PrometheusSink()
+        if port:
+            sink.serve(port)
+        return sink
+    if kind in ("none", "", None):
+        return NullSink()
+    raise ValueError(f"Unknown METRICS_SINK: {kind}")
+
+
+def get_tracer() -> Tracer:
+    """
+    Process-wide tracer configured from METRICS_SINK / METRICS_SAMPLE_RATE
+    """
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                sink = build_sink(METRICS_SINK, METRICS_JSONL_PATH, METRICS_PORT)
+                sample_rate = METRICS_SAMPLE_RATE if METRICS_SINK not in ("none", "") else 0.0
+                _tracer = Tracer(sink, sample_rate)
+    return _tracer
+
+
+def set_tracer(tracer: Tracer):
+    """
+    Replace the process-wide tracer, e.g. to capture traces in benchmarks
+    """
+    global _tracer
+    _tracer = tracer
\ No newline at end of file
@@ -0,0 +1,89 @@
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List
+from src.embeddings import get_medical_embeddings
+from src.document_loader import MedicalDocumentLoader
+from src.hybrid_retriever import build_retriever
+from src.vector_store import initialize_lexical_index, initialize_vector_store
+from src.chatbot import MedicalChatbot
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def get_knowledge_base(directory_path: str = "data/medical_docs") -> "KnowledgeBase":
+    """
+    Return the process-wide knowledge base for a document directory, initializing it once
+    """
+    with _registry_lock:
+        knowledge_base = _registry.get(directory_path)
+        if knowledge_base is None:
+            knowledge_base = KnowledgeBase(directory_path)
+            knowledge_base.initialize()
+            _registry[directory_path] = knowledge_base
+        return knowledge_base
+
+
+class KnowledgeBase:
+    """
+    One embeddings client, vector store and chatbot shared by every session in the process
+
+    Uploaded documents are indexed by a background job that syncs only those files;
+    when it finishes the chatbot is switched to a fresh retriever and its answer
+    cache is invalidated, without interrupting sessions that are mid-conversation.
+    """
+
+    def __init__(self, directory_path: str):
+        self.directory_path = directory_path
+        self.loader = MedicalDocumentLoader(directory_path)
+        self.embeddings = None
+        self.vector_store = None
+        self.lexical_index = None
+        self.chatbot = None
+        # A single worker keeps ingestion jobs from racing on the manifest
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingestion")
+        self._jobs = {}
+
+    def initialize(self):
+        self.embeddings = get_medical_embeddings()
+        self.vector_store = initialize_vector_store(self.embeddings)
+        self.lexical_index = initialize_lexical_index()
+        self.loader.sync(self.vector_store, lexical_index=self.lexical_index)
+        self.chatbot = MedicalChatbot(self.vector_store, retriever=self._build_retriever())
+        self._refresh_answer_cache()
+
+    def submit_ingestion(self, paths: List[str]) -> str:
+        """
+        Index the given files in the background and return a job ID to poll
+        """
+        job_id = uuid.uuid4().hex
+        self._jobs[job_id] = self._executor.submit(self._ingest, list(paths))
+        return job_id
+
+    def job_status(self, job_id: str) -> Dict:
+        future: Future = self._jobs.get(job_id)
+        if future is None:
+            return {"state": "unknown"}
+        if not future.done():
+            return {"state": "running"}
+        error = future.exception()
+        if error is not None:
+            return {"state": "failed", "error": str(error)}
+        return {"state": "done", **future.result()}
+
+    def _ingest(self, paths: List[str]) -> Dict:
+        stats = self.loader.sync(self.vector_store, paths=paths, lexical_index=self.lexical_index)
+        # Read before the next job replaces it; the single ingestion worker runs jobs one at a time
+        failures = [{"path": entry["path"], "error": entry["error"]}
+                    for entry in self.loader.parse_report if entry["error"]]
+        self.chatbot.swap_retriever(self._build_retriever())
+        self._refresh_answer_cache()
+        return {"stats": stats, "failures": failures}
+
+    def _build_retriever(self):
+        return build_retriever(self.vector_store, self.lexical_index)
+
+    def _refresh_answer_cache(self):
+        if self.chatbot.answer_cache is not None:
+            self.chatbot.answer_cache.set_corpus_version(self.loader.corpus_version())
\ No newline at end of file
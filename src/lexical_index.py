@@ -0,0 +1,173 @@
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+from langchain_core.documents import Document
+from src.text_utils import hash_text
+
+# Keeps drug doses, ICD codes and abbreviations whole: "e11.9", "covid-19", "130/80"
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by can do does for from has have how i in is it its of on or "
+    "should that the their there these this to was were what when where which who why will "
+    "with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase terms for BM25; compound tokens are also indexed by their parts
+    """
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(part for part in re.split(r"[.\-/]", token) if part and part not in STOPWORDS)
+    return terms
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over chunks, persisted in SQLite
+
+    Postings are (term, doc, tf) rows in a WITHOUT ROWID table keyed by term, so a
+    query term is one range scan. Chunks are numbered internally to keep postings
+    small; their text is stored zlib-compressed so lexical-only hits can be returned
+    as Documents. Adding a chunk ID that is already indexed replaces it.
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS docs (
+                doc INTEGER PRIMARY KEY,
+                chunk_id TEXT NOT NULL UNIQUE,
+                length INTEGER NOT NULL,
+                text BLOB NOT NULL,
+                metadata TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                doc INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, doc)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS totals (
+                id INTEGER PRIMARY KEY CHECK (id = 0),
+                docs INTEGER NOT NULL,
+                length INTEGER NOT NULL
+            );
+            INSERT OR IGNORE INTO totals (id, docs, length) VALUES (0, 0, 0);
+            """
+        )
+        self.conn.commit()
+
+    def add_documents(self, documents: Iterable[Document], ids: Optional[List[str]] = None):
+        documents = list(documents)
+        if ids is None:
+            ids = [doc.metadata.get("chunk_id") or hash_text(doc.page_content) for doc in documents]
+        with self._lock, self.conn:
+            self._delete(ids)
+            for chunk_id, doc in zip(ids, documents):
+                counts = Counter(tokenize(doc.page_content))
+                length = sum(counts.values())
+                cursor = self.conn.execute(
+                    "INSERT INTO docs (chunk_id, length, text, metadata) VALUES (?, ?, ?, ?)",
+                    (chunk_id, length, zlib.compress(doc.page_content.encode("utf-8")),
+                     json.dumps(doc.metadata, default=str))
+                )
+                self.conn.executemany(
+                    "INSERT INTO postings (term, doc, tf) VALUES (?, ?, ?)",
+                    [(term, cursor.lastrowid, tf) for term, tf in counts.items()]
+                )
+                self.conn.execute(
+                    "UPDATE totals SET docs = docs + 1, length = length + ? WHERE id = 0", (length,)
+                )
+
+    def delete(self, ids: List[str]):
+        with self._lock, self.conn:
+            self._delete(ids)
+
+    def _delete(self, ids: List[str]):
+        for chunk_id in ids:
+            row = self.conn.execute("SELECT doc, length, text FROM docs WHERE chunk_id = ?", (chunk_id,)).fetchone()
+            if row is None:
+                continue
+            doc, length, blob = row
+            # The postings of a chunk are found from its own terms; no reverse index is kept
+            terms = set(tokenize(zlib.decompress(blob).decode("utf-8")))
+            self.conn.executemany("DELETE FROM postings WHERE term = ? AND doc = ?", [(term, doc) for term in terms])
+            self.conn.execute("DELETE FROM docs WHERE doc = ?", (doc,))
+            self.conn.execute("UPDATE totals SET docs = docs - 1, length = length - ? WHERE id = 0", (length,))
+
+    def search(self, query: str, k: int = 20) -> List[Tuple[Document, float]]:
+        """
+        Top-k chunks by BM25 score, best first
+        """
+        terms = set(tokenize(query))
+        if not terms or k <= 0:
+            return []
+        with self._lock:
+            n_docs, total_length = self.conn.execute("SELECT docs, length FROM totals WHERE id = 0").fetchone()
+            if not n_docs:
+                return []
+            postings = {
+                term: self.conn.execute("SELECT doc, tf FROM postings WHERE term = ?", (term,)).fetchall()
+                for term in terms
+            }
+            candidates = {doc for rows in postings.values() for doc, _ in rows}
+            lengths = self._lengths(candidates)
+
+            average_length = total_length / n_docs
+            scores: Dict[int, float] = {}
+            for rows in postings.values():
+                if not rows:
+                    continue
+                idf = math.log(1 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+                for doc, tf in rows:
+                    norm = self.k1 * (1 - self.b + self.b * lengths[doc] / average_length)
+                    scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            results = []
+            for doc, score in best:
+                blob, metadata = self.conn.execute("SELECT text, metadata FROM docs WHERE doc = ?", (doc,)).fetchone()
+                document = Document(page_content=zlib.decompress(blob).decode("utf-8"), metadata=json.loads(metadata))
+                results.append((document, score))
+            return results
+
+    def _lengths(self, docs) -> Dict[int, int]:
+        lengths = {}
+        docs = list(docs)
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(docs), 500):
+            batch = docs[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            lengths.update(self.conn.execute(
+                f"SELECT doc, length FROM docs WHERE doc IN ({placeholders})", batch
+            ).fetchall())
+        return lengths
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT docs FROM totals WHERE id = 0").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,412 @@
+import json
+import os
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+VECTORS_FILE = "vectors.f32"
+RECORDS_FILE = "records.jsonl"
+IVF_FILE = "ivf.npz"
+STORE_ID_FILE = "store.id"
+# Names the live generation of the three files above; compaction writes the next one and then switches this
+GENERATION_FILE = "generation"
+
+
+def _generation_name(name: str, generation: int) -> str:
+    # Generation 0 keeps the original names, so existing stores open unchanged
+    if generation == 0:
+        return name
+    stem, extension = os.path.splitext(name)
+    return f"{stem}.{generation}{extension}"
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k largest scores, best first, without sorting the whole array
+    """
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process cosine-similarity index persisted as an append-only directory
+
+    vectors.f32 holds unit-normalised float32 rows and is memory-mapped on load;
+    records.jsonl holds one line per row (id, text, metadata) plus delete tombstones.
+    Compaction writes them afresh as a new generation (vectors.1.f32, ...) and
+    commits by rewriting the one-line generation file.
+    Search is an exact matrix-vector product by default. index_type="ivf" clusters
+    the rows with k-means and only scans the nprobe closest clusters; quantize=True
+    additionally scores candidates against an int8 copy of the vectors and re-scores
+    the best few exactly.
+
+    maintain() compacts the files once compact_ratio of the rows are dead and
+    retrains the IVF clusters once retrain_ratio of the rows were added since the
+    last build.
+    """
+
+    def __init__(self, directory: str, embedding, index_type: str = "flat", nprobe: int = 8,
+                 quantize: bool = False, compact_ratio: float = 0.2, retrain_ratio: float = 0.2):
+        self.directory = directory
+        self._embedding = embedding
+        self.index_type = index_type
+        self.nprobe = nprobe
+        self.quantize = quantize
+        self.compact_ratio = compact_ratio
+        self.retrain_ratio = retrain_ratio
+        self._lock = threading.Lock()
+        self._dimension = None
+        self._segments = []
+        self._matrix = None
+        self._ids = []
+        self._texts = []
+        self._metadatas = []
+        # Grown in chunks, so only the first len(self._ids) entries are meaningful
+        self._alive = np.zeros(0, dtype=bool)
+        self._row_by_id = {}
+        self._centroids = None
+        self._assignments = None
+        self._ivf_rows = 0
+        self._quantized = None
+        os.makedirs(directory, exist_ok=True)
+        self._store_id = self._read_store_id()
+        self._generation = self._read_generation()
+        self._remove_stale_generations()
+        self._load()
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    @property
+    def identity(self) -> str:
+        """
+        Names this store in the ingestion manifest; a recreated directory gets a new one
+        """
+        return f"local:{self._store_id}"
+
+    def _read_store_id(self) -> str:
+        path = os.path.join(self.directory, STORE_ID_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            store_id = uuid.uuid4().hex
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(store_id)
+            return store_id
+
+    @classmethod
+    def load(cls, directory: str, embedding, **kwargs) -> "LocalVectorStore":
+        return cls(directory, embedding, **kwargs)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding, metadatas: Optional[List[dict]] = None,
+                   directory: str = None, ids: Optional[List[str]] = None, **kwargs) -> "LocalVectorStore":
+        if directory is None:
+            raise ValueError("LocalVectorStore.from_texts requires a directory to persist to")
+        store = cls(directory, embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+    def _read_generation(self) -> int:
+        try:
+            with open(os.path.join(self.directory, GENERATION_FILE), "r", encoding="utf-8") as f:
+                return int(f.read().strip())
+        except FileNotFoundError:
+            return 0
+
+    def _path(self, name: str, generation: Optional[int] = None) -> str:
+        generation = self._generation if generation is None else generation
+        return os.path.join(self.directory, _generation_name(name, generation))
+
+    def _remove_stale_generations(self):
+        """
+        Delete files left by a compaction that crashed before or after switching generations
+        """
+        for generation in (self._generation - 1, self._generation + 1):
+            if generation < 0:
+                continue
+            for name in (VECTORS_FILE, RECORDS_FILE, IVF_FILE):
+                path = self._path(name, generation)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _load(self):
+        vectors_path = self._path(VECTORS_FILE)
+        records_path = self._path(RECORDS_FILE)
+        if not os.path.exists(records_path):
+            return
+
+        with open(records_path, "r", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                if "delete" in record:
+                    row = self._row_by_id.pop(record["delete"], None)
+                    if row is not None:
+                        self._alive[row] = False
+                    continue
+                self._append_record(record["id"], record["text"], record["metadata"])
+                self._dimension = record.get("dim", self._dimension)
+
+        if self._ids and self._dimension:
+            rows = len(self._ids)
+            # Vectors are written before their records, so a crash can leave orphan rows at the end
+            expected = rows * self._dimension * np.dtype(np.float32).itemsize
+            if os.path.getsize(vectors_path) > expected:
+                with open(vectors_path, "r+b") as f:
+                    f.truncate(expected)
+            # Zero-copy view of the vectors
+            self._segments = [np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dimension))]
+
+        ivf_path = self._path(IVF_FILE)
+        if self.index_type == "ivf" and os.path.exists(ivf_path):
+            data = np.load(ivf_path)
+            self._centroids = data["centroids"]
+            self._assignments = data["assignments"]
+            self._ivf_rows = int(self._assignments.shape[0])
+
+    def _append_record(self, chunk_id: str, text: str, metadata: Dict):
+        previous = self._row_by_id.get(chunk_id)
+        if previous is not None:
+            self._alive[previous] = False
+        row = len(self._ids)
+        if row == self._alive.shape[0]:
+            self._alive = np.concatenate([self._alive, np.zeros(max(row, 1024), dtype=bool)])
+        self._alive[row] = True
+        self._row_by_id[chunk_id] = row
+        self._ids.append(chunk_id)
+        self._texts.append(text)
+        self._metadatas.append(metadata)
+
+    def _get_matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            if not self._segments:
+                self._matrix = np.zeros((0, self._dimension or 0), dtype=np.float32)
+            elif len(self._segments) == 1:
+                self._matrix = self._segments[0]
+            else:
+                self._matrix = np.concatenate(self._segments)
+                self._segments = [self._matrix]
+        return self._matrix
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = list(ids) if ids else [uuid.uuid4().hex for _ in texts]
+        vectors = _normalize(np.asarray(self._embedding.embed_documents(texts), dtype=np.float32))
+
+        with self._lock:
+            if self._dimension is None:
+                self._dimension = vectors.shape[1]
+            elif vectors.shape[1] != self._dimension:
+                raise ValueError(f"Expected {self._dimension}-dimensional vectors, got {vectors.shape[1]}")
+
+            with open(self._path(VECTORS_FILE), "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._path(RECORDS_FILE), "a", encoding="utf-8") as f:
+                for chunk_id, text, metadata in zip(ids, texts, metadatas):
+                    f.write(json.dumps({"id": chunk_id, "text": text, "metadata": metadata,
+                                        "dim": self._dimension}) + "\n")
+                    self._append_record(chunk_id, text, metadata)
+
+            self._segments.append(vectors)
+            self._matrix = None
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+        with self._lock:
+            with open(self._path(RECORDS_FILE), "a", encoding="utf-8") as f:
+                for chunk_id in ids:
+                    row = self._row_by_id.pop(chunk_id, None)
+                    if row is not None:
+                        self._alive[row] = False
+                        f.write(json.dumps({"delete": chunk_id}) + "\n")
+        return True
+
+    def __len__(self) -> int:
+        return len(self._row_by_id)
+
+    @property
+    def has_ivf(self) -> bool:
+        return self._centroids is not None
+
+    def build_ivf(self, n_lists: Optional[int] = None, iterations: int = 10, seed: int = 0):
+        """
+        Cluster the current rows with k-means and persist the inverted lists
+
+        Rows added after the build are still searched exhaustively until the next build.
+        """
+        with self._lock:
+            matrix = np.asarray(self._get_matrix())
+            rows = matrix.shape[0]
+            if rows == 0:
+                return
+            n_lists = n_lists or max(1, int(np.sqrt(rows)))
+            rng = np.random.default_rng(seed)
+            centroids = matrix[rng.choice(rows, size=min(n_lists, rows), replace=False)].copy()
+            for _ in range(iterations):
+                assignments = np.argmax(matrix @ centroids.T, axis=1)
+                for cluster in range(centroids.shape[0]):
+                    members = matrix[assignments == cluster]
+                    if len(members):
+                        centroids[cluster] = members.mean(axis=0)
+                centroids = _normalize(centroids)
+            self._centroids = centroids
+            self._assignments = np.argmax(matrix @ centroids.T, axis=1).astype(np.int32)
+            self._ivf_rows = rows
+            self._quantized = None
+            np.savez(self._path(IVF_FILE), centroids=self._centroids,
+                     assignments=self._assignments)
+
+    def _candidate_rows(self, query: np.ndarray, rows: int) -> Optional[np.ndarray]:
+        """
+        Rows worth scoring for an IVF search, or None to scan everything
+        """
+        if self.index_type != "ivf" or self._centroids is None:
+            return None
+        nearest = _top_k(self._centroids @ query, self.nprobe)
+        candidates = np.nonzero(np.isin(self._assignments, nearest))[0]
+        tail = np.arange(self._ivf_rows, rows)
+        return np.concatenate([candidates, tail])
+
+    def _mask(self, rows: Optional[np.ndarray], total: int, filter: Optional[Dict]) -> np.ndarray:
+        """
+        Which of the given rows (or of all rows) are alive and pass the filter
+        """
+        alive = self._alive[:total]
+        mask = alive if rows is None else alive[rows]
+        if filter:
+            ids = range(total) if rows is None else rows
+            mask = mask & np.array([
+                all(self._metadatas[row].get(key) == value for key, value in filter.items()) for row in ids
+            ], dtype=bool)
+        return mask
+
+    def _score(self, matrix: np.ndarray, rows: Optional[np.ndarray], query: np.ndarray, k: int,
+               mask: np.ndarray) -> Tuple:
+        if not self.quantize:
+            subset = matrix if rows is None else matrix[rows]
+            return np.where(mask, subset @ query, -np.inf), rows
+
+        # Coarse int8 pass over the candidates, then exact re-scoring of the best few.
+        # Dead and filtered-out rows are masked first so they cannot crowd the shortlist.
+        if self._quantized is None or self._quantized.shape[0] != matrix.shape[0]:
+            self._quantized = np.clip(np.round(np.asarray(matrix) * 127), -127, 127).astype(np.int8)
+        coarse_rows = np.arange(matrix.shape[0]) if rows is None else rows
+        coarse = np.where(mask, self._quantized[coarse_rows].astype(np.float32) @ (query * 127), -np.inf)
+        best = _top_k(coarse, k * 4)
+        shortlist = coarse_rows[best[np.isfinite(coarse[best])]]
+        return matrix[shortlist] @ query, shortlist
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4,
+                                               filter: Optional[Dict] = None) -> List[Tuple[Document, float]]:
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        with self._lock:
+            matrix = self._get_matrix()
+            rows = matrix.shape[0]
+            if rows == 0:
+                return []
+            candidates = self._candidate_rows(query, rows)
+            mask = self._mask(candidates, rows, filter)
+            scores, row_ids = self._score(matrix, candidates, query, k, mask)
+            results = []
+            for position in _top_k(scores, k):
+                if not np.isfinite(scores[position]):
+                    break
+                row = int(position if row_ids is None else row_ids[position])
+                metadata = dict(self._metadatas[row])
+                metadata.setdefault("chunk_id", self._ids[row])
+                results.append((Document(page_content=self._texts[row], metadata=metadata), float(scores[position])))
+        return results
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, kwargs.get("filter"))]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(
+            self._embedding.embed_query(query), k, kwargs.get("filter")
+        )
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] mapped to [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    def maintain(self) -> Dict[str, bool]:
+        """
+        Compact and retrain the IVF clusters when the thresholds are passed
+
+        Returns what was done, so callers can report it.
+        """
+        rows = len(self._ids)
+        done = {"compacted": False, "retrained": False}
+        if rows and (rows - len(self._row_by_id)) / rows > self.compact_ratio:
+            # Compaction renumbers the rows, which also invalidates the IVF lists
+            self.compact()
+            done["compacted"] = True
+        rows = len(self._ids)
+        if self.index_type == "ivf" and rows and (
+                self._centroids is None or (rows - self._ivf_rows) / rows > self.retrain_ratio):
+            self.build_ivf()
+            done["retrained"] = True
+        return done
+
+    def compact(self):
+        """
+        Rewrite the files without deleted or superseded rows
+        """
+        with self._lock:
+            matrix = np.asarray(self._get_matrix())
+            keep = np.flatnonzero(self._alive[:len(self._ids)])
+            vectors = matrix[keep] if len(keep) else np.zeros((0, self._dimension or 0), dtype=np.float32)
+            records = [(self._ids[row], self._texts[row], self._metadatas[row]) for row in keep]
+
+            generation = self._generation + 1
+            with open(self._path(VECTORS_FILE, generation), "wb") as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self._path(RECORDS_FILE, generation), "w", encoding="utf-8") as f:
+                for chunk_id, text, metadata in records:
+                    f.write(json.dumps({"id": chunk_id, "text": text, "metadata": metadata,
+                                        "dim": self._dimension}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            # Switching the generation file is the commit; until then the old files stay authoritative
+            pointer = os.path.join(self.directory, GENERATION_FILE)
+            with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+                f.write(str(generation))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(pointer + ".tmp", pointer)
+            self._generation = generation
+            self._segments = []
+            self._matrix = None
+            self._remove_stale_generations()
+
+            self._ids, self._texts, self._metadatas, self._row_by_id = [], [], [], {}
+            self._alive = np.zeros(0, dtype=bool)
+            self._centroids = self._assignments = self._quantized = None
+            self._ivf_rows = 0
+            self._load()
\ No newline at end of file
@@ -0,0 +1,95 @@
+import time
+from typing import Dict, List, Tuple
+from langchain_core.documents import Document
+from src.lexical_index import tokenize
+
+
+class LexicalOverlapScorer:
+    """
+    Dependency-free relevance score in [0, 1]: how much of the query a chunk covers
+
+    Mostly the share of distinct query terms found in the chunk, with a bonus for
+    query word pairs that appear next to each other, so "chest pain" beats a chunk
+    that mentions "chest" and "pain" in unrelated sentences.
+    """
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        query_terms = tokenize(query)
+        terms = set(query_terms)
+        pairs = set(zip(query_terms, query_terms[1:]))
+        if not terms:
+            return [0.0] * len(texts)
+        scores = []
+        for text in texts:
+            text_terms = tokenize(text)
+            coverage = len(terms & set(text_terms)) / len(terms)
+            if pairs:
+                adjacency = len(pairs & set(zip(text_terms, text_terms[1:]))) / len(pairs)
+                scores.append(0.8 * coverage + 0.2 * adjacency)
+            else:
+                scores.append(coverage)
+        return scores
+
+
+class CrossEncoderScorer:
+    """
+    Local cross-encoder (sentence-transformers), run on CPU; scores are sigmoid probabilities
+    """
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"):
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            raise ImportError(
+                "RERANK_MODEL requires the sentence-transformers package; "
+                "install it or leave RERANK_MODEL empty to use the lexical scorer"
+            ) from e
+        self.model = CrossEncoder(model_name, device="cpu")
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        return [float(score) for score in self.model.predict([(query, text) for text in texts])]
+
+
+class Reranker:
+    """
+    Rescore over-fetched candidates and keep only the ones that clear a threshold
+
+    Candidates are scored in batches of batch_size in retrieval order. Once
+    latency_budget seconds are spent, the remaining candidates are not scored and
+    are only used to fill up to min_k. The result holds between min_k and max_k
+    chunks, best first, so easy questions get a short prompt.
+    """
+
+    def __init__(self, scorer=None, threshold: float = 0.3, max_k: int = 6, min_k: int = 2,
+                 batch_size: int = 16, latency_budget: float = 0.15):
+        self.scorer = scorer or LexicalOverlapScorer()
+        self.threshold = threshold
+        self.max_k = max_k
+        self.min_k = min_k
+        self.batch_size = batch_size
+        self.latency_budget = latency_budget
+
+    def rerank(self, query: str, documents: List[Document]) -> Tuple[List[Document], Dict]:
+        started = time.perf_counter()
+        scored = []
+        for start in range(0, len(documents), self.batch_size):
+            if start and time.perf_counter() - started > self.latency_budget:
+                break
+            batch = documents[start:start + self.batch_size]
+            scores = self.scorer.score(query, [doc.page_content for doc in batch])
+            scored.extend(zip(scores, range(start, start + len(batch))))
+
+        # Ties keep retrieval order
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        keep = [index for score, index in scored if score >= self.threshold][:self.max_k]
+        if len(keep) < self.min_k:
+            ranked = [index for _, index in scored] + list(range(len(scored), len(documents)))
+            keep += [index for index in ranked if index not in keep][:self.min_k - len(keep)]
+
+        report = {
+            "candidates": len(documents),
+            "scored": len(scored),
+            "kept": len(keep),
+            "seconds": time.perf_counter() - started,
+        }
+        return [documents[index] for index in keep], report
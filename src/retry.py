@@ -0,0 +1,88 @@
+import random
+import threading
+import time
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Best-effort detection of throttling errors from the Voyage, Pinecone and Gemini clients
+    """
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in ("ratelimit", "rate limit", "429", "resource_exhausted", "quota"))
+
+
+def _status_code(error: Exception):
+    """
+    HTTP status carried by a client exception, under whichever attribute its library uses
+    """
+    for source in (error, getattr(error, "response", None)):
+        for name in ("status_code", "http_status", "status", "code"):
+            value = getattr(source, name, None)
+            if isinstance(value, int) and 100 <= value < 600:
+                return value
+    return None
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Whether retrying may help: throttling, server-side (5xx) failures, timeouts and dropped connections
+
+    Everything else (bad credentials, malformed requests, dimension mismatches) fails
+    the same way on every attempt.
+    """
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    if isinstance(error, (ConnectionError, TimeoutError)) or is_rate_limit_error(error):
+        return True
+    text = type(error).__name__.lower()
+    return any(marker in text for marker in ("timeout", "connection", "unavailable", "servererror", "tryagain"))
+
+
+def backoff_delay(attempt: int, base_delay: float = 1.0, max_delay: float = 30.0) -> float:
+    """
+    Exponential backoff with full jitter, so concurrent workers do not retry in lockstep
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def call_with_retries(fn, *args, max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 30.0, **kwargs):
+    """
+    Call fn, retrying transient errors with jittered backoff until max_retries is exhausted
+
+    Rate-limit errors wait at least base_delay before the next attempt; errors that
+    are not transient are raised at once.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == max_retries or not is_transient_error(e):
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            if is_rate_limit_error(e):
+                delay = max(delay, base_delay)
+            time.sleep(delay)
+
+class RateLimiter:
+    """
+    Thread-safe pacing of calls to at most rate_per_minute, shared by every worker
+
+    Calls are spaced evenly rather than allowed in bursts, which is what per-minute
+    API quotas tolerate best.
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
@@ -0,0 +1,301 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Sequence, Tuple
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from src.text_utils import estimate_tokens
+
+
+def create_memory(k: int = 5) -> "ConversationBufferWindowMemory":
+    # langchain.memory takes about a second to import; only the in-process store needs it
+    from langchain.memory import ConversationBufferWindowMemory
+    return ConversationBufferWindowMemory(
+        memory_key="chat_history",
+        return_messages=True,
+        output_key="answer",
+        k=k  # Keep last k conversations
+    )
+
+
+class SessionStore:
+    """
+    Per-session conversation memories, so one chatbot can serve many users
+
+    The least recently active session is dropped once max_sessions is exceeded.
+    """
+
+    def __init__(self, max_sessions: int = 10000, k: int = 5):
+        self.max_sessions = max_sessions
+        self.k = k
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> "ConversationBufferWindowMemory":
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is None:
+                memory = create_memory(self.k)
+                self._sessions[session_id] = memory
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            return memory
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+def _clip(text: str, max_chars: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars].rsplit(" ", 1)[0] + "..."
+
+
+def extractive_summary(summary: str, turns: Sequence[Tuple[str, str]], max_tokens: int) -> str:
+    """
+    Fold turns into the running summary without a model call
+
+    Each turn becomes one line with the question and the opening of the answer;
+    the oldest lines are dropped once the summary exceeds max_tokens.
+    """
+    lines = summary.splitlines() if summary else []
+    for question, answer in turns:
+        lines.append(f"- Asked: {_clip(question, 200)} Answered: {_clip(answer, 240)}")
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class LLMSummarizer:
+    """
+    Running summary written by the chat model; one extra call each time turns are folded
+
+    Given a factory instead of a model, the model is only built when the first
+    summary is written.
+    """
+
+    prompt = """Update the running summary of a conversation between a user and a medical assistant.
+Keep the patient details, symptoms, conditions and advice that later questions may refer to.
+Answer with the updated summary only, in at most {max_words} words.
+
+Current summary:
+{summary}
+
+New turns:
+{turns}"""
+
+    def __init__(self, llm=None, factory: Optional[Callable] = None):
+        self._llm = llm
+        self._factory = factory
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            self._llm = self._factory()
+        return self._llm
+
+    def __call__(self, summary: str, turns: Sequence[Tuple[str, str]], max_tokens: int) -> str:
+        rendered = "\n".join(f"Human: {question}\nAssistant: {answer}" for question, answer in turns)
+        response = self.llm.invoke(self.prompt.format(
+            summary=summary or "(none)", turns=rendered, max_words=max(int(max_tokens * 0.75), 20)
+        ))
+        # Enforce the budget even if the model overruns it
+        return response.content.strip()[:max_tokens * 4]
+
+
+class SessionHistory(BaseChatMessageHistory):
+    """
+    A session's running summary plus its most recent turns, as LangChain messages
+
+    The summary comes first as a system message, followed by the verbatim turns
+    that fit in the store's token budget.
+    """
+
+    def __init__(self, store: "SQLiteSessionStore", session_id: str, summary: str,
+                 turns: List[Tuple[str, str, int]]):
+        self.store = store
+        self.session_id = session_id
+        self.summary = summary
+        self.turns = turns
+        self._lock = threading.Lock()
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        with self._lock:
+            messages = [SystemMessage(content=self.summary)] if self.summary else []
+            for question, answer, _ in self.turns:
+                messages.append(HumanMessage(content=question))
+                messages.append(AIMessage(content=answer))
+            return messages
+
+    def add_messages(self, messages: Sequence[BaseMessage]):
+        question = None
+        for message in messages:
+            if message.type == "human":
+                question = message.content
+            elif message.type == "ai" and question is not None:
+                self.add_turn(question, message.content)
+                question = None
+
+    def add_turn(self, question: str, answer: str):
+        with self._lock:
+            self.store.append_turn(self, question, answer)
+
+    def clear(self):
+        self.store.drop(self.session_id)
+
+
+class PersistentSessionMemory:
+    """
+    The subset of the LangChain memory interface MedicalChatbot uses, over a SessionHistory
+    """
+
+    def __init__(self, history: SessionHistory):
+        self.chat_memory = history
+
+    def save_context(self, inputs: dict, outputs: dict):
+        self.chat_memory.add_turn(inputs["question"], outputs["answer"])
+
+    def clear(self):
+        self.chat_memory.clear()
+
+
+class SQLiteSessionStore:
+    """
+    Session histories persisted in SQLite, loaded lazily by ID
+
+    Each session keeps a running summary and its recent turns. When the recent
+    turns exceed history_tokens, the oldest are folded into the summary (capped at
+    summary_tokens) by the summarizer, so the history sent with every prompt stays
+    flat however long the conversation runs. Sessions survive restarts; only the
+    max_sessions most recently active ones are held in memory. Sessions idle for
+    longer than ttl_seconds are deleted on open and at most every prune_interval
+    seconds after that.
+    """
+
+    def __init__(self, path: str, max_sessions: int = 10000, history_tokens: int = 1000,
+                 summary_tokens: int = 300, summarizer: Optional[Callable] = None,
+                 ttl_seconds: Optional[float] = None, prune_interval: float = 3600):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.summarizer = summarizer or extractive_summary
+        self.ttl_seconds = ttl_seconds
+        self.prune_interval = prune_interval
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._pruned_at = 0.0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS turns (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                tokens INTEGER NOT NULL,
+                PRIMARY KEY (session_id, seq)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at);
+            """
+        )
+        self.conn.commit()
+        self.prune()
+
+    def get(self, session_id: str) -> PersistentSessionMemory:
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is None:
+                memory = PersistentSessionMemory(self._load(session_id))
+                self._sessions[session_id] = memory
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            return memory
+
+    def _load(self, session_id: str) -> SessionHistory:
+        row = self.conn.execute("SELECT summary FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        turns = self.conn.execute(
+            "SELECT question, answer, tokens FROM turns WHERE session_id = ? ORDER BY seq", (session_id,)
+        ).fetchall()
+        return SessionHistory(self, session_id, row[0] if row else "", [tuple(turn) for turn in turns])
+
+    def append_turn(self, history: SessionHistory, question: str, answer: str):
+        """
+        Record a turn, folding the oldest turns into the summary once over budget
+        """
+        history.turns.append((question, answer, estimate_tokens(question) + estimate_tokens(answer)))
+        folded = []
+        # The newest turn always stays verbatim, so a follow-up can refer back to it
+        while len(history.turns) > 1 and sum(turn[2] for turn in history.turns) > self.history_tokens:
+            folded.append(history.turns.pop(0))
+        if folded:
+            history.summary = self.summarizer(
+                history.summary, [(q, a) for q, a, _ in folded], self.summary_tokens
+            )
+
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, summary, updated_at) VALUES (?, ?, ?)",
+                (history.session_id, history.summary, now)
+            )
+            self.conn.execute("DELETE FROM turns WHERE session_id = ?", (history.session_id,))
+            self.conn.executemany(
+                "INSERT INTO turns (session_id, seq, question, answer, tokens) VALUES (?, ?, ?, ?, ?)",
+                [(history.session_id, seq, q, a, tokens) for seq, (q, a, tokens) in enumerate(history.turns)]
+            )
+        if now - self._pruned_at > self.prune_interval:
+            self.prune(now)
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """
+        Delete sessions idle for longer than ttl_seconds; returns how many were deleted
+        """
+        now = time.time() if now is None else now
+        self._pruned_at = now
+        if self.ttl_seconds is None:
+            return 0
+        cutoff = now - self.ttl_seconds
+        with self._lock, self.conn:
+            expired = [row[0] for row in self.conn.execute(
+                "SELECT session_id FROM sessions WHERE updated_at < ?", (cutoff,)
+            )]
+            self.conn.execute(
+                "DELETE FROM turns WHERE session_id IN (SELECT session_id FROM sessions WHERE updated_at < ?)",
+                (cutoff,)
+            )
+            self.conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,))
+            for session_id in expired:
+                self._sessions.pop(session_id, None)
+        return len(expired)
+
+    def drop(self, session_id: str):
+        with self._lock, self.conn:
+            self._sessions.pop(session_id, None)
+            self.conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self.conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,15 @@
+import hashlib
+
+
+def hash_text(text: str) -> str:
+    """
+    Return the SHA-256 of a chunk's text
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (about four characters per token) used to size embedding requests and prompts
+    """
+    return len(text) // 4 + 1
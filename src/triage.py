@@ -0,0 +1,130 @@
+import json
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+
+class TermMatcher:
+    """
+    Aho-Corasick automaton over a fixed vocabulary of lower-cased terms
+
+    One pass over the text finds every occurrence of every term, in time linear
+    in the text length plus the number of matches, however many terms there are.
+    Only whole-word occurrences are reported, so "pain" does not match "Spain".
+    """
+
+    def __init__(self, terms: List[str]):
+        self.terms = terms
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        for index, term in enumerate(terms):
+            state = 0
+            for char in term:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(index)
+
+        # Breadth-first, so a state's failure link is resolved before its children's
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find(self, text: str) -> List[Tuple[int, int]]:
+        """
+        (start, term index) of every whole-word match in text, which must already be normalised
+        """
+        matches = []
+        state = 0
+        for end, char in enumerate(text, start=1):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for index in self._output[state]:
+                start = end - len(self.terms[index])
+                if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    matches.append((start, index))
+        return matches
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+class TriageEngine:
+    """
+    Clarifying questions for symptom mentions, driven by a table of rules
+
+    Each rule has an id, the terms that trigger it and the questions to ask. All
+    terms are compiled into one TermMatcher, so a query is checked against the
+    whole vocabulary in a single pass and before any retrieval is paid for.
+    Rules fire in the order they are listed.
+
+    Only personal reports are triaged: with personal_cues, a query must contain
+    one of them ("i", "my", "suffering from", ...), and a query opening with one
+    of informational_prefixes ("what", "how", ...) is never triaged, so "What is
+    the treatment for migraine?" goes straight to retrieval.
+    """
+
+    def __init__(self, rules: List[Dict], personal_cues: Optional[List[str]] = None,
+                 informational_prefixes: Optional[List[str]] = None):
+        self.rules = rules
+        self.cue_matcher = TermMatcher([normalize(cue) for cue in personal_cues]) if personal_cues else None
+        self.informational_prefixes = frozenset(normalize(prefix) for prefix in informational_prefixes or [])
+        terms = []
+        self._term_rules = []
+        for position, rule in enumerate(rules):
+            if not rule.get("id") or not rule.get("terms") or not rule.get("questions"):
+                raise ValueError(f"Triage rule {position} needs an id, terms and questions")
+            for term in rule["terms"]:
+                terms.append(normalize(term))
+                self._term_rules.append(position)
+        self.matcher = TermMatcher(terms)
+
+    @classmethod
+    def from_file(cls, path: str) -> "TriageEngine":
+        with open(path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        return cls(config["rules"], config.get("personal_cues"), config.get("informational_prefixes"))
+
+    def is_personal(self, text: str) -> bool:
+        """
+        Whether normalised text reads as a report about the asker rather than a general question
+        """
+        words = text.split(" ", 1)
+        if words[0].strip("?,.!") in self.informational_prefixes:
+            return False
+        return self.cue_matcher is None or bool(self.cue_matcher.find(text))
+
+    def triage(self, query: str) -> Optional[Dict]:
+        """
+        The rules a query triggers, the terms that triggered them and their questions, or None
+        """
+        text = normalize(query)
+        if not self.is_personal(text):
+            return None
+        fired = {}
+        for _, index in self.matcher.find(text):
+            fired.setdefault(self._term_rules[index], self.matcher.terms[index])
+        if not fired:
+            return None
+        questions = []
+        for position in sorted(fired):
+            questions.extend(question for question in self.rules[position]["questions"] if question not in questions)
+        return {
+            "rules": [self.rules[position]["id"] for position in sorted(fired)],
+            "terms": [fired[position] for position in sorted(fired)],
+            "questions": questions,
+        }
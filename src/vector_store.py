@@ -1,29 +1,158 @@
-from pinecone import Pinecone, ServerlessSpec
-from langchain_community.vectorstores import Pinecone as LangchainPinecone
-from src.config import PINECONE_API_KEY, PINECONE_ENV, PINECONE_INDEX_NAME
+import json
+import os
+import threading
+import time
+from src.config import (
+    PINECONE_API_KEY,
+    PINECONE_ENV,
+    PINECONE_INDEX_NAME,
+    PINECONE_NAMESPACE,
+    EMBEDDING_DIMENSION,
+    VECTOR_STORE_BACKEND,
+    LOCAL_INDEX_DIR,
+    LOCAL_INDEX_TYPE,
+    LOCAL_INDEX_NPROBE,
+    LOCAL_INDEX_QUANTIZE,
+    LOCAL_INDEX_COMPACT_RATIO,
+    LOCAL_INDEX_RETRAIN_RATIO,
+    HYBRID_SEARCH_ENABLED,
+    LEXICAL_INDEX_PATH,
+    PINECONE_INDEX_CHECK_PATH,
+    PINECONE_INDEX_CHECK_TTL,
+    CHUNK_STORE_ENABLED,
+    CHUNK_STORE_DIR,
+    CHUNK_STORE_COMPACT_RATIO,
+)
 
-def initialize_vector_store(embeddings):
+_pinecone_client = None
+_pinecone_lock = threading.Lock()
+
+def get_pinecone_client():
     """
-    Initialize Pinecone vector store with medical embeddings
+    Process-wide Pinecone client, created (and the module imported) on first use
     """
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-    
-    # Create index if it doesn't exist
+    global _pinecone_client
+    if _pinecone_client is None:
+        with _pinecone_lock:
+            if _pinecone_client is None:
+                from pinecone import Pinecone
+                _pinecone_client = Pinecone(api_key=PINECONE_API_KEY)
+    return _pinecone_client
+
+def _index_known_to_exist() -> bool:
+    try:
+        with open(PINECONE_INDEX_CHECK_PATH, "r", encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return record.get("index") == PINECONE_INDEX_NAME and time.time() - record.get("checked_at", 0) < PINECONE_INDEX_CHECK_TTL
+
+def _remember_index_exists():
+    directory = os.path.dirname(PINECONE_INDEX_CHECK_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(PINECONE_INDEX_CHECK_PATH, "w", encoding="utf-8") as f:
+        json.dump({"index": PINECONE_INDEX_NAME, "checked_at": time.time()}, f)
+
+def forget_index_check():
+    """
+    Drop the cached existence check, e.g. after deleting the index
+    """
+    try:
+        os.remove(PINECONE_INDEX_CHECK_PATH)
+    except FileNotFoundError:
+        pass
+
+def _ensure_index(pc):
+    """
+    Create the Pinecone index if it doesn't exist
+
+    A successful check is remembered on disk for PINECONE_INDEX_CHECK_TTL seconds,
+    so restarts skip the list_indexes() round trip.
+    """
+    if _index_known_to_exist():
+        return
+    from pinecone import ServerlessSpec
     active_indexes = pc.list_indexes()
     if PINECONE_INDEX_NAME not in [index.name for index in active_indexes]:
         pc.create_index(
             name=PINECONE_INDEX_NAME,
-            dimension=1536,
+            dimension=EMBEDDING_DIMENSION,
             metric="cosine",
             spec=ServerlessSpec(
                 cloud="aws",
                 region="us-east-1"
             )
         )
-    
-    return LangchainPinecone.from_existing_index(
-        index_name=PINECONE_INDEX_NAME,
-        embedding=embeddings,
-        namespace="medical_data",
-        text_key="text"
-    ) 
\ No newline at end of file
+    _remember_index_exists()
+
+def get_pinecone_index():
+    """
+    Return the raw Pinecone index handle, for bulk upserts that bypass LangChain
+    """
+    pc = get_pinecone_client()
+    _ensure_index(pc)
+    return pc.Index(PINECONE_INDEX_NAME)
+
+def pinecone_identity() -> str:
+    """
+    How the ingestion manifest names the configured Pinecone index and namespace
+    """
+    return f"pinecone:{PINECONE_INDEX_NAME}/{PINECONE_NAMESPACE}"
+
+def initialize_local_vector_store(embeddings, directory: str = LOCAL_INDEX_DIR):
+    """
+    Open (or create) the on-disk NumPy index; no network round trip per query
+    """
+    # Imported here (like the store modules below) so scripts such as delete_index.py stay light
+    from src.local_vector_store import LocalVectorStore
+    store = LocalVectorStore.load(
+        directory,
+        embeddings,
+        index_type=LOCAL_INDEX_TYPE,
+        nprobe=LOCAL_INDEX_NPROBE,
+        quantize=LOCAL_INDEX_QUANTIZE,
+        compact_ratio=LOCAL_INDEX_COMPACT_RATIO,
+        retrain_ratio=LOCAL_INDEX_RETRAIN_RATIO
+    )
+    if LOCAL_INDEX_TYPE == "ivf" and not store.has_ivf:
+        store.build_ivf()
+    return store
+
+def initialize_lexical_index(path: str = LEXICAL_INDEX_PATH):
+    """
+    Open the on-disk BM25 index used for hybrid retrieval, or None when it is disabled
+    """
+    if not HYBRID_SEARCH_ENABLED:
+        return None
+    from src.lexical_index import LexicalIndex
+    return LexicalIndex(path)
+
+def initialize_vector_store(embeddings):
+    """
+    Initialize the configured vector store backend with medical embeddings
+    """
+    if VECTOR_STORE_BACKEND == "local":
+        return initialize_local_vector_store(embeddings)
+    if VECTOR_STORE_BACKEND != "pinecone":
+        raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {VECTOR_STORE_BACKEND}")
+
+    from langchain_community.vectorstores import Pinecone as LangchainPinecone
+    pc = get_pinecone_client()
+
+    # Create index if it doesn't exist
+    _ensure_index(pc)
+
+    # Built from the shared client; from_existing_index would create a second one and list the indexes again
+    index = pc.Index(PINECONE_INDEX_NAME)
+    vector_store = LangchainPinecone(index, embeddings, "text", PINECONE_NAMESPACE)
+    # Lets sync() notice that its manifest describes another backend or index
+    vector_store.identity = pinecone_identity()
+    if not CHUNK_STORE_ENABLED:
+        return vector_store
+    from src.chunk_store import ChunkStore, ChunkStoreVectorStore
+    from src.indexer import BulkIndexer
+    # Chunk text stays local; upserts go through a BulkIndexer that leaves it out of the metadata
+    chunk_store = ChunkStore(CHUNK_STORE_DIR, compact_ratio=CHUNK_STORE_COMPACT_RATIO)
+    indexer = BulkIndexer(embeddings, index, chunk_store=chunk_store)
+    return ChunkStoreVectorStore(vector_store, chunk_store, indexer=indexer)
@@ -0,0 +1,73 @@
+import os
+import pytest
+from langchain_core.documents import Document
+from benchmarks.fakes import FakeEmbeddings
+from src import document_loader
+
+
+class TextFileLoader:
+    """
+    Stands in for PyPDFLoader: each ".pdf" file holds plain text, one page per blank-line-separated block
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            pages = f.read().split("\n\n\n")
+        return [Document(page_content=text, metadata={"source": self.path, "page": page})
+                for page, text in enumerate(pages)]
+
+
+@pytest.fixture
+def text_pdfs(monkeypatch):
+    monkeypatch.setattr(document_loader, "PyPDFLoader", TextFileLoader)
+
+
+@pytest.fixture
+def embeddings():
+    return FakeEmbeddings(dimension=64)
+
+
+def write_pdf(directory, name: str, paragraphs) -> str:
+    path = os.path.join(str(directory), name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(paragraphs))
+    return path
+
+
+def paragraphs(n: int, prefix: str = "Paragraph"):
+    # Each paragraph is long enough to become its own chunk
+    return [f"{prefix} {i}: " + " ".join(f"word{i}x{j}" for j in range(40)) for i in range(n)]
+
+
+def write_text_pdf(directory, name: str, pages) -> str:
+    """
+    Write a real (if minimal) PDF with one page per string, for code that parses outside the test process
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        lines = "".join(f"({line}) Tj 0 -14 Td " for line in text.split("\n"))
+        stream = f"BT /F1 10 Tf 40 800 Td {lines}ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{obj}\nendobj\n".encode("latin-1")
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    data += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+
+    path = os.path.join(str(directory), name)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
@@ -0,0 +1,53 @@
+from langchain_core.documents import Document
+from src import answer_cache
+from src.answer_cache import SemanticAnswerCache, source_key
+
+
+def test_source_key_ignores_order():
+    first = Document(page_content="a", metadata={"chunk_id": "c1"})
+    second = Document(page_content="b")
+    assert source_key([first, second]) == source_key([second, first])
+    assert source_key([first]) != source_key([second])
+
+
+def test_near_identical_question_with_same_context_hits():
+    cache = SemanticAnswerCache(threshold=0.95)
+    sources = frozenset({"c1", "c2"})
+    cache.store([1.0, 0.0, 0.0], sources, "Rest and fluids.", ["a.pdf"], generation_seconds=2.0)
+
+    entry = cache.lookup([0.99, 0.05, 0.0], sources)
+    assert entry["answer"] == "Rest and fluids."
+    assert cache.lookup([0.0, 1.0, 0.0], sources) is None
+    assert cache.lookup([1.0, 0.0, 0.0], frozenset({"c3"})) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["seconds_saved"] == 2.0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SemanticAnswerCache(max_entries=2)
+    sources = frozenset({"c1"})
+    cache.store([1.0, 0.0, 0.0], sources, "x", [], 1.0)
+    cache.store([0.0, 1.0, 0.0], sources, "y", [], 1.0)
+    cache.lookup([1.0, 0.0, 0.0], sources)
+    cache.store([0.0, 0.0, 1.0], sources, "z", [], 1.0)
+
+    assert cache.lookup([1.0, 0.0, 0.0], sources)["answer"] == "x"
+    assert cache.lookup([0.0, 1.0, 0.0], sources) is None
+
+
+def test_entries_expire_and_corpus_change_clears(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "time", lambda: now[0])
+    cache = SemanticAnswerCache(ttl_seconds=60)
+    sources = frozenset({"c1"})
+    cache.set_corpus_version("v1")
+    cache.store([1.0, 0.0], sources, "x", [], 1.0)
+    now[0] += 61
+    assert cache.lookup([1.0, 0.0], sources) is None
+
+    cache.store([1.0, 0.0], sources, "x", [], 1.0)
+    cache.set_corpus_version("v1")
+    assert cache.lookup([1.0, 0.0], sources) is not None
+    cache.set_corpus_version("v2")
+    assert cache.lookup([1.0, 0.0], sources) is None
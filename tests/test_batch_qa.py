@@ -0,0 +1,87 @@
+import json
+from benchmarks.fakes import FakeEmbeddings
+from src.batch_qa import BatchAnswerer, compact_output, completed_ids
+from src.session_store import SessionStore
+
+
+class ScriptedChatbot:
+    """
+    Answers every question, except that the IDs in failing raise an error once each
+    """
+
+    def __init__(self, failing=()):
+        self.embeddings = FakeEmbeddings(dimension=8)
+        self.sessions = SessionStore()
+        self.failing = set(failing)
+        self.asked = []
+
+    def respond(self, question, session_id=None, query_vector=None):
+        self.asked.append(question)
+        item_id = session_id[len("batch-"):]
+        error = None
+        if item_id in self.failing:
+            self.failing.discard(item_id)
+            error = "RuntimeError: rate limited"
+        return {"answer": None if error else f"Answer to {question}", "sources": [], "follow_up_questions": [],
+                "triage": None, "cached": False, "error": error, "timings": {}}
+
+
+def write_records(path, records, tail=""):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records) + tail, encoding="utf-8")
+
+
+def read_records(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_completed_ids_skips_failed_triaged_and_truncated_records(tmp_path):
+    output = tmp_path / "answers.jsonl"
+    write_records(output, [
+        {"id": "1", "error": None, "triage": None},
+        {"id": "2", "error": "RuntimeError: down", "triage": None},
+        {"id": "3", "error": None, "triage": {"rules": ["cough"]}},
+    ], tail='{"id": "4", "error": nu')
+    assert completed_ids(str(output)) == {"1"}
+    assert completed_ids(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_rerun_only_answers_unfinished_ids_and_keeps_one_record_each(tmp_path):
+    output = tmp_path / "answers.jsonl"
+    questions = [{"id": str(i), "question": f"Question {i}"} for i in range(5)]
+    chatbot = ScriptedChatbot(failing={"2"})
+    first = BatchAnswerer(chatbot, concurrency=2, batch_size=2).run(questions, str(output))
+    assert (first["answered"], first["failed"]) == (4, 1)
+
+    # An interrupted write leaves half a record behind
+    with open(output, "a", encoding="utf-8") as f:
+        f.write('{"id": "9", "answ')
+    chatbot.asked = []
+    second = BatchAnswerer(chatbot, concurrency=2, batch_size=2).run(questions, str(output))
+    assert chatbot.asked == ["Question 2"]
+    assert (second["answered"], second["skipped"], second["compacted"]) == (1, 4, 2)
+
+    records = read_records(output)
+    assert sorted(record["id"] for record in records) == ["0", "1", "2", "3", "4"]
+    assert all(record["error"] is None for record in records)
+    assert completed_ids(str(output)) == {"0", "1", "2", "3", "4"}
+
+
+def test_compact_output_keeps_the_last_record_per_id(tmp_path):
+    output = tmp_path / "answers.jsonl"
+    write_records(output, [{"id": "a", "answer": None}, {"id": "b", "answer": "B"}, {"id": "a", "answer": "A"}])
+    assert compact_output(str(output)) == 1
+    assert read_records(output) == [{"id": "a", "answer": "A"}, {"id": "b", "answer": "B"}]
+    assert compact_output(str(output)) == 0
+
+
+def test_failed_batch_embedding_is_logged_and_each_question_still_answered(tmp_path, caplog):
+    class BrokenEmbeddings(FakeEmbeddings):
+        def embed_queries(self, texts):
+            raise RuntimeError("voyage down")
+
+    chatbot = ScriptedChatbot()
+    chatbot.embeddings = BrokenEmbeddings(dimension=8)
+    stats = BatchAnswerer(chatbot).run([{"id": "1", "question": "Q"}], str(tmp_path / "answers.jsonl"))
+    assert stats["answered"] == 1
+    assert "Batched query embedding failed" in caplog.text
+    assert "voyage down" in caplog.text
@@ -0,0 +1,124 @@
+import asyncio
+import pytest
+from benchmarks.fakes import FakeChatModel, synthetic_corpus
+from src.answer_cache import SemanticAnswerCache
+from src.chatbot import ERROR_MESSAGE, MedicalChatbot
+from src.instrumentation import Tracer, get_tracer, set_tracer
+from src.local_vector_store import LocalVectorStore
+from src.session_store import SessionStore
+
+
+class CollectingSink:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, trace):
+        self.traces.append(trace)
+
+
+class BrokenRetriever:
+    def invoke(self, question):
+        raise RuntimeError("index offline")
+
+    async def ainvoke(self, question):
+        raise RuntimeError("index offline")
+
+
+@pytest.fixture
+def sink():
+    previous = get_tracer()
+    sink = CollectingSink()
+    set_tracer(Tracer(sink))
+    yield sink
+    set_tracer(previous)
+
+
+@pytest.fixture
+def chatbot(tmp_path, embeddings):
+    texts = synthetic_corpus(30)
+    store = LocalVectorStore.from_texts(texts, embeddings, directory=str(tmp_path / "index"),
+                                        metadatas=[{"source": f"doc{i % 3}.pdf"} for i in range(30)])
+    chatbot = MedicalChatbot(store, llm=FakeChatModel(answer_tokens=5), session_store=SessionStore(k=5))
+    # Passing None selects the configured defaults, so switch the optional stages off afterwards
+    chatbot.answer_cache = chatbot.reranker = chatbot.context_packer = None
+    return chatbot
+
+
+def test_stream_is_traced_with_nested_spans(chatbot, sink):
+    answer = "".join(chatbot.chat_stream("What are the symptoms of influenza?", session_id="s"))
+    assert "Sources consulted" in answer
+    trace = sink.traces[-1]
+    assert trace["name"] == "chat_stream"
+    assert [span["name"] for span in trace["spans"]] == ["triage", "retrieve", "pack", "generate"]
+    assert trace["counters"]["retrieved_docs"] > 0
+    assert trace["counters"]["completion_tokens"] > 0
+
+
+def test_stream_closed_early_still_exports_its_trace(chatbot, sink):
+    stream = chatbot.chat_stream("What are the symptoms of influenza?", session_id="s")
+    next(stream)
+    stream.close()
+    assert sink.traces[-1]["name"] == "chat_stream"
+    # Nothing leaks into the caller's context
+    with get_tracer().request("outer"):
+        pass
+    assert sink.traces[-1]["name"] == "outer"
+
+
+def test_errors_are_logged_and_recorded_on_the_trace(chatbot, sink, caplog):
+    chatbot.retriever = BrokenRetriever()
+    assert "".join(chatbot.chat_stream("What is influenza?", session_id="s")) == ERROR_MESSAGE
+    assert sink.traces[-1]["attributes"]["error"] == "RuntimeError: index offline"
+    result = chatbot.respond("What is influenza?", session_id="t")
+    assert result["answer"] == ERROR_MESSAGE
+    assert sink.traces[-1]["attributes"]["error"] == "RuntimeError: index offline"
+    assert "Error processing query" in caplog.text
+
+
+def test_respond_stream_and_arespond_share_one_pipeline(chatbot, sink, embeddings):
+    question = "How is type 2 diabetes treated?"
+    vector = embeddings.embed_query(question)
+    result = chatbot.respond(question, session_id="sync", query_vector=vector)
+    streamed = "".join(chatbot.chat_stream(question, session_id="stream", query_vector=vector))
+    async_result = asyncio.run(chatbot.arespond(question, session_id="async", query_vector=vector))
+
+    assert result["answer"] == streamed == async_result["answer"]
+    assert result["sources"] == async_result["sources"]
+    spans = [[span["name"] for span in trace["spans"]] for trace in sink.traces]
+    assert spans[0] == spans[1] == spans[2]
+    counters = [trace["counters"] for trace in sink.traces]
+    assert counters[0]["retrieved_docs"] == counters[1]["retrieved_docs"] == counters[2]["retrieved_docs"]
+    assert result["timings"].keys() == async_result["timings"].keys()
+
+
+def test_answer_cache_hits_and_misses_are_counted(chatbot, sink, embeddings):
+    chatbot.answer_cache = SemanticAnswerCache()
+    question = "What are the symptoms of influenza?"
+    vector = embeddings.embed_query(question)
+    chatbot.respond(question, session_id="first", query_vector=vector)
+    cached = chatbot.respond(question, session_id="second", query_vector=vector)
+
+    assert cached["cached"]
+    assert sink.traces[0]["counters"]["answer_cache_misses"] == 1
+    assert "answer_cache_hits" not in sink.traces[0]["counters"]
+    assert sink.traces[1]["counters"]["answer_cache_hits"] == 1
+    assert sink.traces[1]["counters"]["answer_cache_seconds_saved"] == pytest.approx(
+        chatbot.answer_cache.stats()["seconds_saved"])
+
+
+def test_follow_ups_are_condensed_the_same_way_on_every_path(chatbot, sink):
+    async def follow_up():
+        await chatbot.arespond("What is influenza?", session_id="async")
+        return await chatbot.arespond("How is it treated?", session_id="async")
+
+    for session_id in ("sync", "stream"):
+        chatbot.respond("What is influenza?", session_id=session_id)
+    chatbot.respond("How is it treated?", session_id="sync")
+    "".join(chatbot.chat_stream("How is it treated?", session_id="stream"))
+    asyncio.run(follow_up())
+
+    follow_ups = [sink.traces[2], sink.traces[3], sink.traces[5]]
+    assert [trace["name"] for trace in follow_ups] == ["chat", "chat_stream", "achat"]
+    spans = [[span["name"] for span in trace["spans"]] for trace in follow_ups]
+    assert spans[0] == spans[1] == spans[2]
+    assert spans[0][:3] == ["triage", "condense", "retrieve"]
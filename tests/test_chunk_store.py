@@ -0,0 +1,88 @@
+import os
+from langchain_core.documents import Document
+from src.chunk_store import ChunkStore, ChunkStoreVectorStore
+from src.document_loader import MedicalDocumentLoader
+from src.local_vector_store import LocalVectorStore
+from tests.conftest import paragraphs, write_pdf
+
+
+def chunk(chunk_id: str, text: str, **metadata) -> Document:
+    return Document(page_content=text, metadata={"chunk_id": chunk_id, **metadata})
+
+
+def test_chunks_round_trip_and_unknown_hits_pass_through(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.add_documents([chunk("a", "Fever in infants", source="a.pdf", page=2), chunk("b", "Ünïcode dose: 5 µg")])
+    size = os.path.getsize(store._text_path)
+    store.add_documents([chunk("a", "Fever in infants", source="a.pdf", page=2)])
+    assert os.path.getsize(store._text_path) == size
+
+    found = store.get(["b", "a", "missing"])
+    assert found["b"].page_content == "Ünïcode dose: 5 µg"
+    assert found["a"].metadata["page"] == 2
+    stranger = Document(page_content="from the vector store", metadata={"chunk_id": "zzz"})
+    assert store.hydrate([chunk("a", ""), stranger]) == [found["a"], stranger]
+
+
+def test_compaction_reclaims_deleted_text_and_survives_reopen(tmp_path):
+    store = ChunkStore(str(tmp_path), compact_ratio=0.3)
+    store.add_documents([chunk(f"c{i}", f"chunk text {i} " * 10) for i in range(10)])
+    assert not store.maintain()
+    store.delete([f"c{i}" for i in range(5)])
+    assert store.garbage_ratio() > 0.3
+    assert store.maintain()
+    assert store.garbage_ratio() == 0.0
+    store.add_documents([chunk("new", "added after compaction")])
+    store.close()
+
+    reopened = ChunkStore(str(tmp_path))
+    assert len(reopened) == 6
+    assert reopened.get(["c7"])["c7"].page_content == "chunk text 7 " * 10
+    assert reopened.get(["new"])["new"].page_content == "added after compaction"
+    assert os.path.exists(os.path.join(str(tmp_path), "chunks.1.txt"))
+    assert not os.path.exists(os.path.join(str(tmp_path), "chunks.txt"))
+
+
+def test_crashed_compaction_leaves_a_readable_store(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    store.add_documents([chunk("a", "first"), chunk("b", "second")])
+    store.delete(["a"])
+    store.close()
+    # A compaction that died after writing the next generation but before committing it
+    with open(os.path.join(str(tmp_path), "chunks.1.txt"), "wb") as f:
+        f.write(b"partial")
+
+    reopened = ChunkStore(str(tmp_path))
+    assert reopened.get(["b"])["b"].page_content == "second"
+    assert not os.path.exists(os.path.join(str(tmp_path), "chunks.1.txt"))
+
+
+def test_from_texts_wraps_a_store_with_slim_metadata(tmp_path, embeddings):
+    texts = ["Influenza causes fever.", "Metformin treats diabetes."]
+    metadatas = [{"source": "a.pdf", "page": 1, "section": "Flu"}, {"source": "b.pdf", "page": 4, "section": "DM"}]
+    store = ChunkStoreVectorStore.from_texts(
+        texts, embeddings, metadatas=metadatas, ids=["flu", "dm"], chunk_store=ChunkStore(str(tmp_path / "chunks")),
+        vector_store_cls=LocalVectorStore, directory=str(tmp_path / "index")
+    )
+    assert "section" not in store.vector_store.similarity_search("metformin", k=1)[0].metadata
+    hit = store.similarity_search("metformin", k=1)[0]
+    assert hit.page_content == texts[1]
+    assert hit.metadata["section"] == "DM"
+
+
+def test_sync_compacts_the_chunk_store_after_deletes(tmp_path, text_pdfs, embeddings):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    chunk_store = ChunkStore(str(tmp_path / "chunks"), compact_ratio=0.3)
+    store = ChunkStoreVectorStore(LocalVectorStore(str(tmp_path / "index"), embeddings), chunk_store)
+    loader = MedicalDocumentLoader(str(docs), manifest_path=str(tmp_path / "manifest.sqlite3"), max_workers=1)
+    path = write_pdf(docs, "a.pdf", paragraphs(3))
+    write_pdf(docs, "b.pdf", paragraphs(2, "Other"))
+    loader.sync(store)
+    assert chunk_store.garbage_ratio() == 0.0
+
+    os.remove(path)
+    loader.sync(store)
+    assert len(chunk_store) == 2
+    assert chunk_store.garbage_ratio() == 0.0
+    assert len(store.similarity_search("Other 1", k=5)) == 2
@@ -0,0 +1,66 @@
+from langchain_core.documents import Document
+from src.context_budget import ContextPacker
+from src.text_utils import estimate_tokens
+
+PAGE = " ".join(f"word{i}" for i in range(120))
+
+
+def doc(text: str, chunk_id: str, source: str = "a.pdf", page: int = 1) -> Document:
+    return Document(page_content=text, metadata={"source": source, "page": page, "chunk_id": chunk_id})
+
+
+def test_overlapping_chunks_from_one_page_are_stitched_back_together():
+    # Two splitter chunks sharing 100 characters, retrieved in reverse order
+    first, second = PAGE[:400], PAGE[300:]
+    packed, report = ContextPacker(max_tokens=1000).pack([doc(second, "c2"), doc(first, "c1")])
+    assert [piece.page_content for piece in packed] == [PAGE]
+    assert packed[0].metadata["merged_chunk_ids"] == ["c2", "c1"]
+    assert report["merged"] == 1
+
+
+def test_chunks_from_different_pages_are_not_merged():
+    first, second = PAGE[:400], PAGE[300:]
+    packed, report = ContextPacker(max_tokens=1000).pack([doc(first, "c1", page=1), doc(second, "c2", page=2)])
+    assert [piece.page_content for piece in packed] == [first, second]
+    assert report["merged"] == 0
+
+
+def test_near_duplicates_are_dropped_at_the_threshold():
+    kept = " ".join(f"term{i}" for i in range(12))
+    # 9 of this piece's 10 shingles appear in the kept one: containment 0.9
+    near = kept.replace("term11", "other")
+    packer = ContextPacker(max_tokens=1000, duplicate_threshold=0.9)
+    packed, report = packer.pack([doc(kept, "a", source="a.pdf"), doc(near, "b", source="b.pdf")])
+    assert [piece.metadata["chunk_id"] for piece in packed] == ["a"]
+    assert report["duplicates"] == 1
+
+    packer.duplicate_threshold = 0.91
+    packed, report = packer.pack([doc(kept, "a", source="a.pdf"), doc(near, "b", source="b.pdf")])
+    assert len(packed) == 2 and report["duplicates"] == 0
+
+
+def test_pieces_over_budget_are_skipped_but_smaller_ones_still_fit():
+    large, larger, small = "alpha " * 60, "beta " * 200, "gamma " * 10
+    packer = ContextPacker(max_tokens=120)
+    packed, report = packer.pack([doc(large, "a", source="a.pdf"), doc(larger, "b", source="b.pdf"),
+                                  doc(small, "c", source="c.pdf")])
+    assert [piece.metadata["chunk_id"] for piece in packed] == ["a", "c"]
+    assert report["over_budget"] == 1
+    assert report["tokens_out"] <= 120
+
+
+def test_an_oversized_first_piece_is_trimmed_to_the_budget():
+    packed, report = ContextPacker(max_tokens=50).pack([doc("delta " * 200, "a")])
+    assert len(packed) == 1
+    assert len(packed[0].page_content) == 200
+    assert report["tokens_out"] == estimate_tokens(packed[0].page_content)
+
+
+def test_tokens_saved_is_what_packing_removed():
+    documents = [doc(PAGE[:400], "c1"), doc(PAGE[300:], "c2"), doc("epsilon " * 300, "c3", source="b.pdf")]
+    packed, report = ContextPacker(max_tokens=200).pack(documents)
+    tokens_in = sum(estimate_tokens(d.page_content) for d in documents)
+    tokens_out = sum(estimate_tokens(d.page_content) for d in packed)
+    assert report["tokens_in"] == tokens_in
+    assert report["tokens_out"] == tokens_out
+    assert report["tokens_saved"] == tokens_in - tokens_out > 0
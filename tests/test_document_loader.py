@@ -0,0 +1,54 @@
+from concurrent.futures import ProcessPoolExecutor
+from src import document_loader
+from src.document_loader import MedicalDocumentLoader
+from src.local_vector_store import LocalVectorStore
+from tests.conftest import write_text_pdf
+
+
+def write_corpus(directory, files: int):
+    # Real PDFs: the pool's workers parse them without the test process's TextFileLoader patch
+    for i in range(files):
+        write_text_pdf(directory, f"doc{i}.pdf", [f"File {i} covers influenza.\nFever and cough are common.",
+                                                   f"Second page of file {i}"])
+
+
+def test_pooled_parse_matches_in_process_parse(tmp_path):
+    write_corpus(tmp_path, 4)
+    (tmp_path / "broken.pdf").write_bytes(b"not a pdf")
+    pooled = MedicalDocumentLoader(str(tmp_path), manifest_path=str(tmp_path / "m.sqlite3"), max_workers=2)
+    serial = MedicalDocumentLoader(str(tmp_path), manifest_path=str(tmp_path / "m.sqlite3"), max_workers=1)
+
+    def chunk_ids(loader):
+        return sorted(chunk.metadata["chunk_id"] for chunks in loader.stream_documents() for chunk in chunks)
+
+    assert chunk_ids(pooled) == chunk_ids(serial)
+    assert len(chunk_ids(pooled)) >= 8
+    errors = {report["path"]: report["error"] for report in pooled.parse_report}
+    assert errors.pop(str(tmp_path / "broken.pdf"))
+    assert not any(errors.values())
+
+
+def test_pool_keeps_at_most_max_in_flight_files_outstanding(tmp_path, embeddings, monkeypatch):
+    write_corpus(tmp_path, 6)
+    loader = MedicalDocumentLoader(str(tmp_path), manifest_path=str(tmp_path / "m.sqlite3"),
+                                   max_workers=3, max_in_flight=2)
+    outstanding = []
+    start_methods = []
+
+    class CountingPool(ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            start_methods.append(kwargs["mp_context"].get_start_method())
+            super().__init__(*args, **kwargs)
+
+        def submit(self, fn, *args, **kwargs):
+            # Files handed out so far (this one included) minus those already returned to the caller
+            outstanding.append(len(outstanding) + 1 - len(loader.parse_report))
+            return super().submit(fn, *args, **kwargs)
+
+    monkeypatch.setattr(document_loader, "ProcessPoolExecutor", CountingPool)
+    store = LocalVectorStore(str(tmp_path / "index"), embeddings)
+    stats = loader.sync(store)
+
+    assert stats["added"] == 6 and len(store) == stats["chunks_upserted"]
+    assert len(outstanding) == 6 and max(outstanding) <= 2
+    assert start_methods == [document_loader.PARSE_START_METHOD] and start_methods != ["fork"]
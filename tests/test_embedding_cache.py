@@ -0,0 +1,33 @@
+from benchmarks.fakes import FakeEmbeddings
+from src.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+
+def test_cached_embeddings_only_embed_unseen_texts(tmp_path):
+    embeddings = FakeEmbeddings(dimension=16)
+    cached = CachedEmbeddings(embeddings, EmbeddingCache(str(tmp_path / "cache.sqlite3")))
+
+    first = cached.embed_documents(["a b", "c d", "a b"])
+    assert embeddings.calls == 1
+    assert first[0] == first[2]
+    assert cached.embed_documents(["a  b", "c d"]) == first[:2]
+    assert embeddings.calls == 1
+
+    cached.embed_query("a b")
+    cached.embed_query("a b")
+    assert embeddings.calls == 2
+    assert cached.cache.stats()["hits"] == 3
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=3, touch_batch_size=100)
+    cache.put_many({"a": [1.0], "b": [2.0], "c": [3.0]})
+    cache.get_many(["a"])
+    cache.put_many({"d": [4.0]})
+    assert len(cache) == 3
+    assert set(cache.get_many(["a", "b", "c", "d"])) == {"a", "c", "d"}
+
+    # The running count survives reopening and re-putting known keys
+    cache.put_many({"a": [1.0]})
+    assert len(cache) == 3
+    cache.close()
+    assert len(EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=3)) == 3
@@ -0,0 +1,112 @@
+import functools
+import os
+import pytest
+from langchain_core.documents import Document
+from benchmarks.fakes import FakePineconeIndex
+from src import indexer as indexer_module
+from src.document_loader import MedicalDocumentLoader
+from src.indexer import BulkIndexer, IndexCheckpoint, batch_chunks
+from src.ingestion_manifest import IngestionManifest
+from tests.conftest import paragraphs, write_pdf
+
+
+class IndexVectorStore:
+    """
+    The part of the vector store interface sync() uses next to a BulkIndexer
+    """
+
+    def __init__(self, index):
+        self.index = index
+
+    def delete(self, ids=None):
+        for chunk_id in ids:
+            self.index.vectors.pop(chunk_id, None)
+
+
+class BrokenIndex(FakePineconeIndex):
+    """
+    Fails every upsert that contains a chunk of the given file
+    """
+
+    def __init__(self, broken: str):
+        super().__init__()
+        self.broken = broken
+
+    def upsert(self, vectors, namespace: str = None):
+        if any(metadata["source"].endswith(self.broken) for _, _, metadata in vectors):
+            raise ValueError("upsert rejected")
+        return super().upsert(vectors, namespace=namespace)
+
+
+def test_batches_respect_text_and_token_limits():
+    chunks = [Document(page_content="x" * 400) for _ in range(10)]
+    batches = list(batch_chunks(chunks, max_texts=4, max_tokens=250))
+    assert [len(batch) for batch in batches] == [2, 2, 2, 2, 2]
+    assert sum(batches, []) == chunks
+
+
+def test_checkpoint_survives_reopen_and_forgets_discarded_ids(tmp_path):
+    path = str(tmp_path / "checkpoint.txt")
+    checkpoint = IndexCheckpoint(path)
+    checkpoint.mark(["a", "b", "c"])
+    checkpoint.discard(["b"])
+    checkpoint.close()
+
+    reopened = IndexCheckpoint(path)
+    assert reopened.done == {"a", "c"}
+    reopened.clear()
+    assert IndexCheckpoint(path).done == set()
+
+
+def test_indexer_upserts_text_with_ids(embeddings):
+    index = FakePineconeIndex()
+    chunks = [Document(page_content=f"chunk {i}", metadata={"chunk_id": f"c{i}"}) for i in range(5)]
+    stats = BulkIndexer(embeddings, index, concurrency=2).index_documents(chunks)
+    assert stats["chunks"] == 5
+    assert index.vectors["c3"][1]["text"] == "chunk 3"
+
+
+def test_restored_file_is_indexed_again(tmp_path, text_pdfs, embeddings):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    loader = MedicalDocumentLoader(str(docs), manifest_path=str(tmp_path / "manifest.sqlite3"), max_workers=1)
+    index = FakePineconeIndex()
+    store = IndexVectorStore(index)
+    checkpoint = IndexCheckpoint(str(tmp_path / "checkpoint.txt"))
+    indexer = BulkIndexer(embeddings, index, checkpoint=checkpoint)
+
+    path = write_pdf(docs, "a.pdf", paragraphs(4))
+    write_pdf(docs, "b.pdf", paragraphs(2, "Other"))
+    loader.sync(store, indexer=indexer)
+    assert len(index.vectors) == 6
+    assert checkpoint.done == set()
+
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    os.remove(path)
+    loader.sync(store, indexer=indexer)
+    assert len(index.vectors) == 2
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    stats = loader.sync(store, indexer=indexer)
+    assert stats["chunks_upserted"] == 4
+    assert len(index.vectors) == 6
+
+
+def test_interrupted_sync_keeps_files_already_upserted(tmp_path, text_pdfs, embeddings, monkeypatch):
+    monkeypatch.setattr(indexer_module, "batch_chunks", functools.partial(batch_chunks, max_texts=2))
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    loader = MedicalDocumentLoader(str(docs), manifest_path=str(tmp_path / "manifest.sqlite3"), max_workers=1)
+    index = BrokenIndex("c.pdf")
+    a = write_pdf(docs, "a.pdf", paragraphs(2, "Alpha"))
+    b = write_pdf(docs, "b.pdf", paragraphs(2, "Beta"))
+    c = write_pdf(docs, "c.pdf", paragraphs(2, "Gamma"))
+
+    with pytest.raises(ValueError):
+        loader.sync(IndexVectorStore(index), indexer=BulkIndexer(embeddings, index, concurrency=1))
+
+    manifest = IngestionManifest(loader.manifest_path)
+    assert set(manifest.paths()) == {a, b}
+    manifest.close()
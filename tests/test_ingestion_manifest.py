@@ -0,0 +1,95 @@
+import os
+import shutil
+import pytest
+from src.document_loader import MedicalDocumentLoader
+from src.ingestion_manifest import IngestionManifest, make_chunk_id
+from src.local_vector_store import LocalVectorStore
+from tests.conftest import paragraphs, write_pdf
+
+
+def make_loader(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir(exist_ok=True)
+    return MedicalDocumentLoader(str(docs), manifest_path=str(tmp_path / "manifest.sqlite3"), max_workers=1)
+
+
+def test_chunk_id_ignores_position_but_separates_duplicates():
+    assert make_chunk_id("a.pdf", "h") == make_chunk_id("a.pdf", "h", 0)
+    assert make_chunk_id("a.pdf", "h", 0) != make_chunk_id("a.pdf", "h", 1)
+    assert make_chunk_id("a.pdf", "h") != make_chunk_id("b.pdf", "h")
+
+
+def test_sync_is_incremental(tmp_path, text_pdfs, embeddings):
+    loader = make_loader(tmp_path)
+    store = LocalVectorStore(str(tmp_path / "index"), embeddings)
+    write_pdf(loader.directory_path, "a.pdf", paragraphs(5))
+    write_pdf(loader.directory_path, "b.pdf", paragraphs(3, "Other"))
+
+    first = loader.sync(store)
+    assert first["added"] == 2 and first["chunks_upserted"] == len(store) > 0
+
+    second = loader.sync(store)
+    assert second["unchanged"] == 2 and second["chunks_upserted"] == 0
+
+
+def test_inserting_a_paragraph_only_embeds_the_new_chunk(tmp_path, text_pdfs, embeddings):
+    loader = make_loader(tmp_path)
+    store = LocalVectorStore(str(tmp_path / "index"), embeddings)
+    path = write_pdf(loader.directory_path, "a.pdf", paragraphs(6))
+    loader.sync(store)
+    before = len(store)
+
+    write_pdf(loader.directory_path, "a.pdf", ["Inserted: " + " ".join(["new"] * 40)] + paragraphs(6))
+    os.utime(path, (1, 1))
+    stats = loader.sync(store)
+    assert stats["updated"] == 1
+    assert stats["chunks_upserted"] == 1
+    assert stats["chunks_deleted"] == 0
+    assert len(store) == before + 1
+
+
+def test_removed_file_stays_in_manifest_when_delete_fails(tmp_path, text_pdfs, embeddings):
+    loader = make_loader(tmp_path)
+    store = LocalVectorStore(str(tmp_path / "index"), embeddings)
+    path = write_pdf(loader.directory_path, "a.pdf", paragraphs(3))
+    write_pdf(loader.directory_path, "b.pdf", paragraphs(2, "Other"))
+    loader.sync(store)
+    os.remove(path)
+
+    delete = store.delete
+    store.delete = lambda ids=None, **kwargs: (_ for _ in ()).throw(ConnectionError("index unavailable"))
+    with pytest.raises(ConnectionError):
+        loader.sync(store)
+    manifest = IngestionManifest(loader.manifest_path)
+    assert path in manifest.paths()
+    manifest.close()
+
+    store.delete = delete
+    stats = loader.sync(store)
+    assert stats["removed"] == 1 and stats["chunks_deleted"] == 3
+    assert len(store) == 2
+
+
+def test_sync_refills_a_new_or_recreated_store(tmp_path, text_pdfs, embeddings):
+    loader = make_loader(tmp_path)
+    write_pdf(loader.directory_path, "a.pdf", paragraphs(4))
+    loader.sync(LocalVectorStore(str(tmp_path / "a"), embeddings))
+
+    # Another store (e.g. after switching backends) gets everything embedded into it
+    other = LocalVectorStore(str(tmp_path / "b"), embeddings)
+    stats = loader.sync(other)
+    assert stats["added"] == 1 and len(other) == stats["chunks_upserted"] == 4
+
+    # So does the same directory once deleted and recreated
+    shutil.rmtree(str(tmp_path / "b"))
+    recreated = LocalVectorStore(str(tmp_path / "b"), embeddings)
+    assert loader.sync(recreated)["chunks_upserted"] == 4
+    assert loader.sync(recreated)["unchanged"] == 1
+
+
+def test_reset_forgets_every_file(tmp_path):
+    manifest = IngestionManifest(str(tmp_path / "manifest.sqlite3"))
+    manifest.record_file("a.pdf", "h", 1.0, 10, [("c1", 0, "x")])
+    manifest.set_target("local:one")
+    manifest.reset()
+    assert manifest.paths() == [] and manifest.chunk_ids("a.pdf") == [] and manifest.target() is None
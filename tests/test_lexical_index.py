@@ -0,0 +1,58 @@
+from langchain_core.documents import Document
+from src.hybrid_retriever import HybridRetriever, reciprocal_rank_fusion
+from src.lexical_index import LexicalIndex, tokenize
+from src.local_vector_store import LocalVectorStore
+
+
+def chunk(chunk_id: str, text: str) -> Document:
+    return Document(page_content=text, metadata={"chunk_id": chunk_id})
+
+
+def test_tokenize_keeps_codes_whole_and_drops_stopwords():
+    assert tokenize("What is the ICD code E11.9 for COVID-19?") == [
+        "icd", "code", "e11.9", "e11", "9", "covid-19", "covid", "19"
+    ]
+
+
+def test_bm25_ranks_rare_term_matches_first(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+    index.add_documents([
+        chunk("a", "Metformin is first-line therapy for type 2 diabetes."),
+        chunk("b", "Diabetes is managed with diet and exercise."),
+        chunk("c", "Hypertension is treated with lifestyle changes."),
+    ])
+    results = index.search("metformin diabetes", k=3)
+    assert [doc.metadata["chunk_id"] for doc, _ in results] == ["a", "b"]
+    assert results[0][1] > results[1][1] > 0
+
+
+def test_replacing_and_deleting_chunks_keeps_totals_right(tmp_path):
+    path = str(tmp_path / "lexical.sqlite3")
+    index = LexicalIndex(path)
+    index.add_documents([chunk("a", "warfarin interactions"), chunk("b", "amoxicillin dosing")])
+    index.add_documents([chunk("a", "insulin titration")])
+    assert index.search("warfarin") == []
+    assert [doc.page_content for doc, _ in index.search("insulin")] == ["insulin titration"]
+
+    index.delete(["b"])
+    index.close()
+    reopened = LexicalIndex(path)
+    assert len(reopened) == 1
+    assert reopened.search("amoxicillin") == []
+
+
+def test_rrf_lifts_chunks_found_by_both_rankings():
+    dense = [chunk("a", "A"), chunk("b", "B"), chunk("c", "C")]
+    lexical = [chunk("c", "C"), chunk("d", "D")]
+    fused = reciprocal_rank_fusion([dense, lexical], k=3)
+    assert [doc.metadata["chunk_id"] for doc in fused] == ["c", "a", "b"]
+
+
+def test_hybrid_retriever_finds_exact_terms_missed_by_vectors(tmp_path, embeddings):
+    texts = ["Influenza causes fever and cough.", "Dosage of levothyroxine is 1.6 mcg/kg."]
+    vector_store = LocalVectorStore.from_texts(texts, embeddings, directory=str(tmp_path / "index"),
+                                               ids=["flu", "thyroid"])
+    index = LexicalIndex(str(tmp_path / "lexical.sqlite3"))
+    index.add_documents([chunk("flu", texts[0]), chunk("thyroid", texts[1])])
+    retriever = HybridRetriever(vector_store=vector_store, lexical_index=index, k=1, fetch_k=2)
+    assert [doc.metadata["chunk_id"] for doc in retriever.invoke("levothyroxine")] == ["thyroid"]
@@ -0,0 +1,91 @@
+import os
+import pytest
+from src.local_vector_store import LocalVectorStore
+
+
+def corpus(n: int):
+    return [f"topic{i} " + " ".join(f"term{i}x{j}" for j in range(8)) for i in range(n)]
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_search_finds_the_matching_row(tmp_path, embeddings, quantize):
+    texts = corpus(30)
+    store = LocalVectorStore.from_texts(texts, embeddings, directory=str(tmp_path), quantize=quantize,
+                                        ids=[f"c{i}" for i in range(30)])
+    results = store.similarity_search_with_score(texts[7], k=3)
+    assert results[0][0].page_content == texts[7]
+    assert results[0][0].metadata["chunk_id"] == "c7"
+    assert results[0][1] == pytest.approx(1.0, abs=1e-5)
+    assert len(results) == 3
+
+
+def test_reopened_store_keeps_rows_and_deletes(tmp_path, embeddings):
+    texts = corpus(5)
+    store = LocalVectorStore.from_texts(texts, embeddings, directory=str(tmp_path), ids=[f"c{i}" for i in range(5)])
+    store.delete(["c2"])
+
+    reopened = LocalVectorStore(str(tmp_path), embeddings)
+    assert len(reopened) == 4
+    assert "c2" not in {doc.metadata["chunk_id"] for doc in reopened.similarity_search(texts[2], k=5)}
+
+
+def test_quantized_search_skips_dead_near_duplicates(tmp_path, embeddings):
+    store = LocalVectorStore(str(tmp_path), embeddings, quantize=True)
+    duplicates = [f"chest pain radiating to the arm case {i}" for i in range(20)]
+    store.add_texts(duplicates, ids=[f"dup{i}" for i in range(20)])
+    store.add_texts(["chest pain at rest", "headache with nausea"], ids=["live0", "live1"])
+    store.delete([f"dup{i}" for i in range(20)])
+
+    results = store.similarity_search("chest pain radiating to the arm", k=2)
+    assert [doc.metadata["chunk_id"] for doc in results] == ["live0", "live1"]
+
+
+def test_quantized_search_applies_the_filter_before_the_shortlist(tmp_path, embeddings):
+    store = LocalVectorStore(str(tmp_path), embeddings, quantize=True)
+    texts = corpus(20)
+    store.add_texts(texts, metadatas=[{"source": "a.pdf" if i < 19 else "b.pdf"} for i in range(20)])
+    results = store.similarity_search(texts[0], k=1, filter={"source": "b.pdf"})
+    assert [doc.page_content for doc in results] == [texts[19]]
+
+
+def test_maintain_compacts_and_retrains(tmp_path, embeddings):
+    texts = corpus(40)
+    store = LocalVectorStore(str(tmp_path), embeddings, index_type="ivf", nprobe=40, compact_ratio=0.2,
+                             retrain_ratio=0.2)
+    store.add_texts(texts[:20], ids=[f"c{i}" for i in range(20)])
+    assert store.maintain() == {"compacted": False, "retrained": True}
+    assert store.maintain() == {"compacted": False, "retrained": False}
+
+    store.delete([f"c{i}" for i in range(10)])
+    store.add_texts(texts[20:], ids=[f"c{i}" for i in range(20, 40)])
+    assert store.maintain() == {"compacted": True, "retrained": True}
+    assert len(store) == 30
+    assert store.similarity_search(texts[25], k=1)[0].metadata["chunk_id"] == "c25"
+
+    reopened = LocalVectorStore(str(tmp_path), embeddings, index_type="ivf")
+    assert len(reopened) == 30
+    assert reopened.has_ivf
+
+
+def test_crashed_compaction_leaves_a_readable_store(tmp_path, embeddings, monkeypatch):
+    texts = corpus(6)
+    store = LocalVectorStore.from_texts(texts, embeddings, directory=str(tmp_path), ids=[f"c{i}" for i in range(6)])
+    store.delete(["c0", "c1", "c2"])
+
+    def crash(source, destination):
+        raise OSError("killed before the generation switch")
+
+    # The next generation is fully written but never committed
+    monkeypatch.setattr("src.local_vector_store.os.replace", crash)
+    with pytest.raises(OSError):
+        store.compact()
+    monkeypatch.undo()
+
+    reopened = LocalVectorStore(str(tmp_path), embeddings)
+    assert len(reopened) == 3
+    assert reopened.similarity_search(texts[4], k=1)[0].metadata["chunk_id"] == "c4"
+    assert not os.path.exists(os.path.join(str(tmp_path), "vectors.1.f32"))
+
+    reopened.compact()
+    assert sorted(os.listdir(str(tmp_path))) == ["generation", "records.1.jsonl", "store.id", "vectors.1.f32"]
+    assert len(LocalVectorStore(str(tmp_path), embeddings)) == 3
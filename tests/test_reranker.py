@@ -0,0 +1,62 @@
+import time
+from langchain_core.documents import Document
+from src.reranker import LexicalOverlapScorer, Reranker
+
+
+class FixedScorer:
+    """
+    Scores each text by the number it holds, optionally taking a while per batch
+    """
+
+    def __init__(self, seconds_per_batch: float = 0.0):
+        self.seconds_per_batch = seconds_per_batch
+        self.batches = 0
+
+    def score(self, query, texts):
+        self.batches += 1
+        time.sleep(self.seconds_per_batch)
+        return [float(text) for text in texts]
+
+
+def docs(*scores):
+    return [Document(page_content=str(score), metadata={"chunk_id": f"c{i}"}) for i, score in enumerate(scores)]
+
+
+def kept(documents):
+    return [doc.metadata["chunk_id"] for doc in documents]
+
+
+def test_only_candidates_above_the_threshold_are_kept_best_first():
+    reranked, report = Reranker(FixedScorer(), threshold=0.5, max_k=5, min_k=0).rerank(
+        "q", docs(0.2, 0.9, 0.5, 0.1, 0.7))
+    assert kept(reranked) == ["c1", "c4", "c2"]
+    assert (report["candidates"], report["scored"], report["kept"]) == (5, 5, 3)
+
+
+def test_max_k_caps_the_result():
+    reranked, _ = Reranker(FixedScorer(), threshold=0.0, max_k=2, min_k=0).rerank("q", docs(0.4, 0.8, 0.6))
+    assert kept(reranked) == ["c1", "c2"]
+
+
+def test_min_k_backfills_with_the_best_of_the_rest():
+    reranked, report = Reranker(FixedScorer(), threshold=0.95, max_k=5, min_k=2).rerank(
+        "q", docs(0.3, 0.9, 0.6, 0.1))
+    assert kept(reranked) == ["c1", "c2"]
+    assert report["kept"] == 2
+
+
+def test_scoring_stops_once_the_latency_budget_is_spent():
+    scorer = FixedScorer(seconds_per_batch=0.05)
+    reranker = Reranker(scorer, threshold=0.5, max_k=5, min_k=3, batch_size=2, latency_budget=0.01)
+    reranked, report = reranker.rerank("q", docs(0.1, 0.9, 0.8, 0.7, 0.6, 0.95))
+    # The first batch is always scored; the rest are only used, unscored and in order, to reach min_k
+    assert scorer.batches == 1
+    assert report["scored"] == 2
+    assert kept(reranked) == ["c1", "c0", "c2"]
+
+
+def test_lexical_scorer_rewards_adjacent_query_terms():
+    together, apart = LexicalOverlapScorer().score(
+        "chest pain", ["Chest pain on exertion.", "Pain in the leg; chest is clear."])
+    assert together == 1.0
+    assert 0 < apart < together
@@ -0,0 +1,61 @@
+import pytest
+from src import retry
+from src.retry import RateLimiter, call_with_retries, is_transient_error
+
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(retry.time, "sleep", lambda seconds: None)
+
+
+def flaky(errors):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+    return fn, calls
+
+
+def test_transient_errors_are_retried():
+    fn, calls = flaky([HTTPError(429), HTTPError(503), ConnectionError("reset"), TimeoutError()])
+    assert call_with_retries(fn, max_retries=5) == "ok"
+    assert len(calls) == 5
+
+
+@pytest.mark.parametrize("error", [HTTPError(401), HTTPError(400), ValueError("dimension mismatch")])
+def test_permanent_errors_are_raised_at_once(error):
+    fn, calls = flaky([error])
+    with pytest.raises(type(error)):
+        call_with_retries(fn, max_retries=5)
+    assert len(calls) == 1
+
+
+def test_retries_are_bounded():
+    fn, calls = flaky([HTTPError(500)] * 10)
+    with pytest.raises(HTTPError):
+        call_with_retries(fn, max_retries=2)
+    assert len(calls) == 3
+
+
+def test_error_classification():
+    assert is_transient_error(Exception("429 Resource exhausted"))
+    assert not is_transient_error(Exception("Invalid API key"))
+
+
+def test_rate_limiter_spaces_calls(monkeypatch):
+    slept = []
+    monkeypatch.setattr(retry.time, "sleep", slept.append)
+    monkeypatch.setattr(retry.time, "monotonic", lambda: 100.0)
+    limiter = RateLimiter(rate_per_minute=60)
+    for _ in range(3):
+        limiter.acquire()
+    assert slept == [1.0, 2.0]
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+from benchmarks.fakes import FakeChatModel, synthetic_corpus
+from src import chatbot as chatbot_module
+from src.chatbot import MedicalChatbot
+from src.local_vector_store import LocalVectorStore
+from src.session_store import LLMSummarizer, SQLiteSessionStore, extractive_summary
+
+
+def test_old_turns_fold_into_the_summary_and_survive_reopen(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    store = SQLiteSessionStore(path, history_tokens=60, summary_tokens=200)
+    memory = store.get("s")
+    for i in range(4):
+        memory.save_context({"question": f"Question {i} " + "word " * 20}, {"answer": f"Answer {i} " + "word " * 20})
+    messages = memory.chat_memory.messages
+    assert messages[0].type == "system"
+    assert "Question 0" in messages[0].content
+    assert messages[-1].content.startswith("Answer 3")
+    store.close()
+
+    reopened = SQLiteSessionStore(path, history_tokens=60, summary_tokens=200)
+    assert [message.content for message in reopened.get("s").chat_memory.messages] == \
+        [message.content for message in messages]
+
+
+def test_idle_sessions_are_pruned(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.session_store.time.time", lambda: now[0])
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), ttl_seconds=60, prune_interval=3600)
+    store.get("old").save_context({"question": "q"}, {"answer": "a"})
+    now[0] += 50
+    store.get("recent").save_context({"question": "q"}, {"answer": "a"})
+    now[0] += 20
+
+    assert store.prune() == 1
+    assert len(store) == 1
+    assert store.get("old").chat_memory.messages == []
+    assert len(store.get("recent").chat_memory.messages) == 2
+
+
+def test_extractive_summary_stays_within_budget():
+    summary = extractive_summary("", [(f"question {i}", "answer " * 30) for i in range(20)], max_tokens=100)
+    assert "question 19" in summary
+    assert "question 0" not in summary
+
+
+def test_llm_summarizer_builds_its_model_on_first_use():
+    built = []
+
+    def factory():
+        built.append(True)
+        return FakeChatModel(answer_tokens=3)
+
+    summarizer = LLMSummarizer(factory=factory)
+    assert built == []
+    assert summarizer("", [("q", "a")], max_tokens=50)
+    assert built == [True]
+
+
+def test_chatbot_keeps_the_llm_lazy_with_an_llm_summarizer(tmp_path, embeddings, monkeypatch):
+    monkeypatch.setattr(chatbot_module, "SESSION_SUMMARIZER", "llm")
+    monkeypatch.setattr(chatbot_module, "SESSION_STORE_PATH", str(tmp_path / "sessions.sqlite3"))
+    store = LocalVectorStore(str(tmp_path / "index"), embeddings)
+    chatbot = MedicalChatbot(store)
+    assert chatbot._llm is None
+    assert isinstance(chatbot.sessions.summarizer, LLMSummarizer)
+
+
+def test_arespond_summarizes_off_the_event_loop(tmp_path, embeddings):
+    threads = []
+
+    def summarizer(summary, turns, max_tokens):
+        threads.append(threading.current_thread())
+        return extractive_summary(summary, turns, max_tokens)
+
+    store = LocalVectorStore.from_texts(synthetic_corpus(20), embeddings, directory=str(tmp_path / "index"))
+    sessions = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), history_tokens=1, summarizer=summarizer)
+    chatbot = MedicalChatbot(store, llm=FakeChatModel(answer_tokens=5), session_store=sessions)
+    chatbot.answer_cache = chatbot.reranker = chatbot.triage_engine = None
+
+    async def conversation():
+        await chatbot.arespond("What are the symptoms of influenza?", session_id="s")
+        await chatbot.arespond("And how is it treated?", session_id="s")
+
+    asyncio.run(conversation())
+    assert threads
+    assert threading.main_thread() not in threads
@@ -0,0 +1,77 @@
+import json
+import pytest
+from benchmarks.fakes import FakeChatModel
+from src.batch_qa import completed_ids
+from src.chatbot import CLARIFICATION_PREFIX, MedicalChatbot
+from src.config import TRIAGE_RULES_PATH
+from src.local_vector_store import LocalVectorStore
+from src.session_store import SessionStore
+from src.triage import TermMatcher, TriageEngine
+
+
+@pytest.fixture
+def engine():
+    return TriageEngine.from_file(TRIAGE_RULES_PATH)
+
+
+def test_matcher_finds_whole_words_only():
+    matcher = TermMatcher(["pain", "chest pain", "ache"])
+    found = sorted((start, matcher.terms[index]) for start, index in matcher.find("chest pain in spain, headache"))
+    assert found == [(0, "chest pain"), (6, "pain")]
+
+
+@pytest.mark.parametrize("query", [
+    "What is the treatment for migraine?",
+    "how do I treat a sore throat",
+    "ICD code for chest pain",
+    "Which antibiotics are used for a productive cough?",
+])
+def test_informational_questions_are_not_triaged(engine, query):
+    assert engine.triage(query) is None
+
+
+def test_personal_reports_fire_every_matching_rule_once(engine):
+    triage = engine.triage("I've had a cough and chest pain since Monday, my cough is worse at night")
+    assert triage["rules"] == ["pain", "cough"]
+    assert triage["terms"] == ["pain", "cough"]
+    assert len(triage["questions"]) == len(set(triage["questions"]))
+
+
+def test_rules_file_without_cues_triages_every_mention():
+    engine = TriageEngine([{"id": "fever", "terms": ["fever"], "questions": ["How high?"]}])
+    assert engine.triage("fever in children")["rules"] == ["fever"]
+    with pytest.raises(ValueError):
+        TriageEngine([{"id": "empty", "terms": [], "questions": ["?"]}])
+
+
+@pytest.fixture
+def vector_store(tmp_path, embeddings):
+    return LocalVectorStore.from_texts(["Coughs are usually viral."], embeddings, directory=str(tmp_path / "index"))
+
+
+def test_chatbot_clarifies_once_then_answers(vector_store):
+    chatbot = MedicalChatbot(vector_store, llm=FakeChatModel(answer_tokens=3), session_store=SessionStore())
+    first = chatbot.respond("I have a cough", session_id="s")
+    assert first["answer"].startswith(CLARIFICATION_PREFIX)
+    assert first["triage"]["rules"] == ["cough"]
+    second = chatbot.respond("A dry cough, for two weeks", session_id="s")
+    assert second["triage"] is None
+    assert not second["answer"].startswith(CLARIFICATION_PREFIX)
+
+
+def test_triage_can_be_switched_off(vector_store):
+    chatbot = MedicalChatbot(vector_store, llm=FakeChatModel(answer_tokens=3), session_store=SessionStore(),
+                             triage=False)
+    assert chatbot.triage_engine is None
+    assert chatbot.respond("I have a cough", session_id="s")["triage"] is None
+
+
+def test_batch_resume_redoes_triaged_records(tmp_path):
+    output = tmp_path / "answers.jsonl"
+    records = [
+        {"id": "1", "error": None, "triage": None},
+        {"id": "2", "error": None, "triage": {"rules": ["cough"]}},
+        {"id": "3", "error": "RuntimeError: down", "triage": None},
+    ]
+    output.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+    assert completed_ids(str(output)) == {"1"}
@@ -0,0 +1,36 @@
+import subprocess
+import sys
+import pinecone
+from src import vector_store
+
+
+def test_delete_index_does_not_import_the_stores():
+    modules = subprocess.run(
+        [sys.executable, "-c", "import sys, delete_index; print(' '.join(sys.modules))"],
+        capture_output=True, text=True, check=True
+    ).stdout.split()
+    for module in ("src.chunk_store", "src.indexer", "src.lexical_index", "src.local_vector_store", "numpy"):
+        assert module not in modules
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    def Index(self, name):
+        self.calls.append(("Index", name))
+        return pinecone.Index(api_key="test", host="https://test.svc.pinecone.io")
+
+    def list_indexes(self):
+        raise AssertionError("the index is known to exist")
+
+
+def test_pinecone_store_is_built_from_the_shared_client(monkeypatch, embeddings):
+    client = FakeClient()
+    monkeypatch.setattr(vector_store, "VECTOR_STORE_BACKEND", "pinecone")
+    monkeypatch.setattr(vector_store, "CHUNK_STORE_ENABLED", False)
+    monkeypatch.setattr(vector_store, "get_pinecone_client", lambda: client)
+    monkeypatch.setattr(vector_store, "_ensure_index", lambda pc: None)
+    store = vector_store.initialize_vector_store(embeddings)
+    assert client.calls == [("Index", vector_store.PINECONE_INDEX_NAME)]
+    assert store.embeddings is embeddings